@@ -0,0 +1,2 @@
+"""Benchmarks for pyiso4 (run them from the root of the repository, e.g., ``python -m benchmarks.prefix_tree``)
+"""
@@ -0,0 +1,125 @@
+"""Benchmark the abbreviation pipeline, and compare the results of two runs.
+
+Usage (from the root of the repository)::
+
+    python -m benchmarks run -o before.json
+    # ... change things ...
+    python -m benchmarks run -o after.json
+    python -m benchmarks compare before.json after.json --threshold 0.1
+
+``compare`` exits with a non-zero status if a metric got worse by more than ``threshold`` (relative).
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import pyiso4
+from pyiso4.ltwa import Abbreviate
+
+from benchmarks import corpus, pipeline
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> None:
+    abbreviate = Abbreviate.create(args.ltwa, args.stopwords)
+
+    tests_titles = corpus.read_titles(args.titles)
+    synthetic_titles = corpus.synthetic_titles(args.ltwa, args.synthetic)
+
+    metrics: pipeline.Metrics = {}
+    metrics.update(pipeline.measure_startup(args.ltwa, args.stopwords, args.repeat))
+
+    for prefix, titles in [('tests_', tests_titles), ('synthetic_', synthetic_titles)]:
+        metrics.update(pipeline.measure_titles(abbreviate, titles, args.repeat, prefix))
+        metrics.update(pipeline.measure_stages(abbreviate, titles, args.repeat, prefix))
+
+    long_titles = corpus.long_titles(synthetic_titles)
+    metrics.update(pipeline.measure_automaton(args.ltwa, args.stopwords, synthetic_titles, long_titles, args.repeat))
+    metrics.update(pipeline.measure_memory(args.ltwa, args.stopwords, synthetic_titles))
+
+    result = {
+        'pyiso4': pyiso4.__version__,
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'titles': {'tests': len(tests_titles), 'synthetic': len(synthetic_titles), 'long': len(long_titles)},
+        'metrics': metrics
+    }
+
+    for name, metric in metrics.items():
+        print('{:<32} {:>14.6g} {}'.format(name, metric['value'], metric['unit']), file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+def compare(args: argparse.Namespace) -> int:
+    with open(args.before) as f:
+        before: Dict[str, Any] = json.load(f)['metrics']
+    with open(args.after) as f:
+        after: Dict[str, Any] = json.load(f)['metrics']
+
+    regressions: List[str] = []
+
+    print('{:<32} {:>14} {:>14} {:>9}'.format('metric', 'before', 'after', 'change'))
+    for name, metric in after.items():
+        if name not in before:
+            continue
+
+        old, new = before[name]['value'], metric['value']
+        change = (new - old) / old if old != 0 else .0
+        worse = change > args.threshold if metric['better'] == 'lower' else change < -args.threshold
+        if worse:
+            regressions.append(name)
+
+        print('{:<32} {:>14.6g} {:>14.6g} {:>+8.1f}%{}'.format(name, old, new, change * 100, ' !' if worse else ''))
+
+    if regressions:
+        print('{} regression(s) beyond {:.0f}%: {}'.format(
+            len(regressions), args.threshold * 100, ', '.join(regressions)))
+        return 1
+
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('-o', '--output', help='JSON file for the results')
+    run_parser.add_argument('-t', '--titles', default='tests/tests.tsv')
+    run_parser.add_argument('-l', '--ltwa', default='pyiso4/LTWA_20210702.csv')
+    run_parser.add_argument('-s', '--stopwords', default='pyiso4/stopwords.txt')
+    run_parser.add_argument('-n', '--synthetic', help='Number of synthetic titles', type=int, default=2000)
+    run_parser.add_argument('-r', '--repeat', type=int, default=3)
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two runs')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', help='Tolerated (relative) slowdown', type=float, default=.1)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run(args)
+        return 0
+    else:
+        return compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Titles used by the benchmarks"""
+
+import random
+from typing import List
+
+from pyiso4.ltwa import read_ltwa
+
+# words that are not in the LTWA (or are stopwords, articles, etc)
+EXTRA_WORDS = [
+    'of', 'the', 'and', 'for', 'in', 'de', 'la', 'des', 'für', '&', 'Part', 'Series', 'A', 'B', 'II',
+    'Smith', 'Leuven', 'Nanotubes', 'Geneva', 'DNA', 'CO2'
+]
+
+
+def read_titles(path: str) -> List[str]:
+    """Read the titles of a TSV file (first column)"""
+
+    with open(path) as f:
+        return [line.split('\t')[0].strip() for line in f.readlines() if line.strip()]
+
+
+def synthetic_titles(ltwa_file: str, n: int, seed: int = 42) -> List[str]:
+    """Generate ``n`` random titles made of LTWA words (plus a few others)"""
+
+    r = random.Random(seed)
+    words = [p.pattern.strip('-') for p in read_ltwa(ltwa_file) if len(p.pattern) > 2]
+
+    titles = []
+    for _ in range(n):
+        title = []
+        for _ in range(r.randint(2, 8)):
+            if r.random() < .3:
+                title.append(r.choice(EXTRA_WORDS))
+            else:
+                word = r.choice(words) + r.choice(['', '', '', 's', 'es', 'al', 'ic'])
+                title.append(word.capitalize() if r.random() < .7 else word)
+
+        titles.append(' '.join(title))
+
+    return titles
+
+
+def long_titles(titles: List[str], n: int = 8) -> List[str]:
+    """Join the titles ``n`` by ``n`` (e.g., to mimic the titles of conference proceedings)"""
+
+    return [' '.join(titles[i:i + n]) for i in range(0, len(titles), n)]
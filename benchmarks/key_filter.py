@@ -0,0 +1,69 @@
+"""Key filters (see ``Abbreviate.use_key_filters()``): share of the index searches that they skip, and latency of
+``Abbreviate._search_matches()`` with and without them, for the words of synthetic titles (which are mostly in
+the LTWA), and for made-up names (which mostly are not).
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+from pyiso4.instrument import CallStats
+from pyiso4.ltwa import Abbreviate, Pattern
+from pyiso4.normalize_string import BOUNDARY
+
+from benchmarks import corpus
+
+SYLLABLES = ['ka', 'na', 'mu', 'ra', 'zh', 'ang', 'wi', 'ley', 'ky', 'oto', 'sch', 'berg', 'ov', 'ic', 'ski', 'ng',
+             'uy', 'en', 'tan', 'ho', 'ij', 'me', 'gen', 'lj', 'ub', 'dna', 'x', 'q']
+
+
+def names(n: int, seed: int = 42) -> List[str]:
+    """Generate ``n`` made-up names (and acronyms), made of 1 to 4 syllables"""
+
+    r = random.Random(seed)
+    return [''.join(r.choice(SYLLABLES) for _ in range(r.randint(1, 4))) for _ in range(n)]
+
+
+def measure(name: str, abbreviate: Abbreviate, words: List[str], repeat: int) -> None:
+    stats = CallStats('')
+    for word in words:
+        abbreviate._search_matches(word, None, stats)
+
+    timings = []
+    for enabled in [False, True] * repeat:  # (alternately, so that both see the same noise)
+        abbreviate.use_key_filters(enabled)
+        start = time.perf_counter()
+        for word in words:
+            abbreviate._search_matches(word)
+        timings.append(time.perf_counter() - start)
+
+    print('{:<16} {:>10} {:>10} {:>16.2f} {:>16.2f}'.format(
+        name, stats.filter_checks, stats.filtered,
+        min(timings[::2]) / len(words) * 1e6, min(timings[1::2]) / len(words) * 1e6))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-l', '--ltwa', default='pyiso4/LTWA_20210702.csv')
+    parser.add_argument('-n', '--number', type=int, default=2000)
+    parser.add_argument('-r', '--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    abbreviate = Abbreviate.create(args.ltwa)
+    start = time.perf_counter()
+    abbreviate.use_key_filters(False)
+    abbreviate.use_key_filters()
+    print('built in {:.3f} s'.format(time.perf_counter() - start))
+
+    titles_words = [
+        word for title in corpus.synthetic_titles(args.ltwa, args.number)
+        for word in BOUNDARY.split(Pattern.normalize(title)) if word]
+
+    print('{:<16} {:>10} {:>10} {:>16} {:>16}'.format('words', 'checks', 'skipped', 'without (µs)', 'with (µs)'))
+    measure('synthetic titles', abbreviate, titles_words, args.repeat)
+    measure('names', abbreviate, names(args.number), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
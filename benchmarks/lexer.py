@@ -0,0 +1,48 @@
+"""Micro-benchmark of the lexer: time to tokenize the words of the LTWA and the titles of ``tests/tests.tsv``,
+with ``Lexer`` and with the previous implementation (``ReferenceLexer``, in ``tests/reference_lexer.py``), which
+gives the same tokens.
+"""
+
+import argparse
+import time
+from typing import Callable, Collection, Iterable, List
+
+from pyiso4.lexer import Lexer, Token
+from pyiso4.ltwa import read_stopwords
+from pyiso4.normalize_string import normalize, Level
+
+from tests.reference_lexer import ReferenceLexer, inputs
+
+
+def measure(name: str, lexer: Callable[[str, Collection[str]], Iterable[Token]], inps: List[str],
+            stopwords: Collection[str], repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for inp in inps:
+            for _ in lexer(inp, stopwords):
+                pass
+        timings.append(time.perf_counter() - start)
+
+    print('{:<16} {:>14.2f}'.format(name, min(timings) / len(inps) * 1e6))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-t', '--titles', default='tests/tests.tsv')
+    parser.add_argument('-l', '--ltwa', default='pyiso4/LTWA_20210702.csv')
+    parser.add_argument('-s', '--stopwords', default='pyiso4/stopwords.txt')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    inps = [normalize(inp, Level.SOFT) for inp in inputs(args.ltwa, args.titles)]
+    stopwords = read_stopwords(args.stopwords)
+
+    print('{} inputs'.format(len(inps)))
+    print('{:<16} {:>14}'.format('lexer', 'time (µs)'))
+    measure('ReferenceLexer', lambda inp, s: ReferenceLexer(inp, s).tokenize(), inps, stopwords, args.repeat)
+    measure('Lexer', lambda inp, s: Lexer(inp, s).tokenize(), inps, frozenset(stopwords), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
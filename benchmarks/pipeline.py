@@ -0,0 +1,216 @@
+"""Measure the abbreviation pipeline: startup, latency, throughput, memory and time spent in each stage
+"""
+
+import gc
+import resource
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from pyiso4.lexer import Lexer, TokenType
+from pyiso4.ltwa import Abbreviate, read_ltwa, read_stopwords
+from pyiso4.normalize_string import normalize, Level, NormalizedString
+
+# name -> {'value': ..., 'unit': ..., 'better': 'lower' or 'higher'}
+Metrics = Dict[str, Dict[str, Any]]
+
+
+def _metric(value: float, unit: str = 's', better: str = 'lower') -> Dict[str, Any]:
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def _best_of(repeat: int, func: Callable[[], Any]) -> float:
+    """Best wall time (in seconds) over ``repeat`` executions of ``func``"""
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def measure_startup(ltwa_file: str, stopwords: str, repeat: int) -> Metrics:
+    """Time to create an object, and to abbreviate a first title with a lazy one (see ``pyiso4.lazy``)"""
+
+    def first_title() -> None:
+        Abbreviate.create(ltwa_file, stopwords, lazy=True)('Journal of the American Chemical Society')
+
+    return {
+        'create': _metric(_best_of(repeat, lambda: Abbreviate.create(ltwa_file, stopwords))),
+        'create_lazy': _metric(_best_of(repeat, lambda: Abbreviate.create(ltwa_file, stopwords, lazy=True))),
+        'lazy_first_title': _metric(_best_of(repeat, first_title)),
+    }
+
+
+def measure_titles(abbreviate: Abbreviate, titles: List[str], repeat: int, prefix: str) -> Metrics:
+    """Latency percentiles and throughput"""
+
+    latencies = []
+    for _ in range(repeat):
+        for title in titles:
+            start = time.perf_counter()
+            abbreviate(title)
+            latencies.append(time.perf_counter() - start)
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    throughput = len(titles) / _best_of(repeat, lambda: [abbreviate(title) for title in titles])
+
+    return {
+        prefix + 'latency_p50': _metric(quantiles[49]),
+        prefix + 'latency_p90': _metric(quantiles[89]),
+        prefix + 'latency_p99': _metric(quantiles[98]),
+        prefix + 'throughput': _metric(throughput, 'titles/s', 'higher'),
+    }
+
+
+def measure_stages(abbreviate: Abbreviate, titles: List[str], repeat: int, prefix: str) -> Metrics:
+    """Time spent in each stage of the pipeline, which are replayed one after the other
+    (the inputs of a given stage are prepared beforehand), and in the whole lookup of the patterns of each word
+    (search and match, see ``Abbreviate._best_pattern()``)"""
+
+    # prepare inputs
+    normalized = [NormalizedString(title) for title in titles]
+
+    sentences = []
+    for title in normalized:
+        for token in Lexer(title.soft, abbreviate._stopwords).tokenize():
+            if token.type in [TokenType.WORD, TokenType.PART]:
+                sentences.append((title.normal[title.offsets[token.position]:], title.soft[token.position:]))
+
+    # as in Abbreviate._search_best(), the suffixes of a word are only searched if no pattern starts it
+    ltwa_prefix, ltwa_suffix = abbreviate._indexes
+    prefix_filter, suffix_filter = abbreviate._key_filters(abbreviate._indexes)
+    candidates = [
+        (sentence, list(ltwa_prefix.search_longest_first(sentence))
+            if prefix_filter is None or prefix_filter.may_match(sentence) else [])
+        for sentence, _ in sentences
+    ]
+    words = [
+        Abbreviate._word(sentence) for sentence, results in candidates if not any(p.match(sentence) for p in results)]
+
+    found = []
+    for sentence, guide in sentences:
+        best = abbreviate._best_pattern(sentence)
+        if best is not None and best.replacement != '-' and len(guide) >= len(best.replacement):
+            found.append((best.replacement, guide))
+
+    # measure
+    def run_normalize() -> None:
+        for title in titles:
+            NormalizedString(title)
+
+    def run_tokenize() -> None:
+        for title in normalized:
+            list(Lexer(title.soft, abbreviate._stopwords).tokenize())
+
+    def run_search() -> None:
+        # (the suffixes that match are kept by _search_suffixes(), so it includes their matching)
+        for sentence, _ in sentences:
+            if prefix_filter is None or prefix_filter.may_match(sentence):
+                list(ltwa_prefix.search_longest_first(sentence))
+        for word in words:
+            Abbreviate._search_suffixes(ltwa_suffix, word, key_filter=suffix_filter)
+
+    def run_match() -> None:
+        for sentence, results in candidates:
+            [p for p in results if p.match(sentence)]
+
+    def run_lookup() -> None:
+        for sentence, _ in sentences:
+            abbreviate._best_pattern(sentence)
+
+    def run_capitalization() -> None:
+        for replacement, guide in found:
+            Abbreviate.match_capitalization_and_diacritic(replacement, guide)
+
+    stages = [
+        ('normalize', run_normalize),
+        ('tokenize', run_tokenize),
+        ('search', run_search),
+        ('match', run_match),
+        ('lookup', run_lookup),
+        ('capitalization', run_capitalization),
+    ]
+
+    metrics = dict(
+        (prefix + 'stage_' + name, _metric(_best_of(repeat, func))) for name, func in stages)
+
+    metrics[prefix + 'candidates'] = _metric(sum(len(r) for _, r in candidates), 'patterns')  # (of ltwa_prefix)
+    return metrics
+
+
+def measure_memory(ltwa_file: str, stopwords: str, titles: List[str]) -> Metrics:
+    """Memory used by the patterns and by the tokens of ``titles``,
+    peak of memory allocated by Python while creating the object and abbreviating ``titles``
+    (plus the maximum resident set size of the process so far)"""
+
+    gc.collect()
+    tracemalloc.start()
+
+    patterns = list(read_ltwa(ltwa_file))
+    memory_patterns, _ = tracemalloc.get_traced_memory()
+    del patterns
+
+    stopwords_set = frozenset(read_stopwords(stopwords))  # (as in Abbreviate, not converted for each title)
+    normalized = [normalize(title, Level.SOFT) for title in titles]
+    before, _ = tracemalloc.get_traced_memory()
+    tokens = [token for title in normalized for token in Lexer(title, stopwords_set).tokenize()]
+    memory_tokens = (tracemalloc.get_traced_memory()[0] - before) / len(tokens)
+    del tokens, normalized
+
+    gc.collect()
+    if hasattr(tracemalloc, 'reset_peak'):  # Python >= 3.9
+        tracemalloc.reset_peak()
+    abbreviate = Abbreviate.create(ltwa_file, stopwords)
+    _, peak_create = tracemalloc.get_traced_memory()
+    if hasattr(tracemalloc, 'reset_peak'):  # Python >= 3.9
+        tracemalloc.reset_peak()
+    for title in titles:
+        abbreviate(title)
+    _, peak_run = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'memory_patterns': _metric(memory_patterns / 2 ** 20, 'MiB'),
+        'memory_per_token': _metric(memory_tokens, 'B'),
+        'memory_peak_create': _metric(peak_create / 2 ** 20, 'MiB'),
+        'memory_peak_run': _metric(peak_run / 2 ** 20, 'MiB'),
+        'memory_max_rss': _metric(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10, 'MiB'),
+    }
+
+
+def measure_automaton(
+        ltwa_file: str, stopwords: str, titles: List[str], long_titles: List[str], repeat: int) -> Metrics:
+    """Build time and memory of the automaton (see ``Abbreviate.use_automaton()``), throughput with the automaton,
+    and throughput of both engines for ``long_titles``"""
+
+    abbreviate = Abbreviate.create(ltwa_file, stopwords)
+
+    def throughput(data: List[str]) -> float:
+        return len(data) / _best_of(repeat, lambda: [abbreviate(title) for title in data])
+
+    metrics = {
+        'index_long_throughput': _metric(throughput(long_titles), 'titles/s', 'higher')
+    }
+
+    start = time.perf_counter()
+    abbreviate.use_automaton()
+    metrics['automaton_build'] = _metric(time.perf_counter() - start)
+
+    # (tracing slows the build down a lot, hence another one)
+    other = Abbreviate(abbreviate.ltwa_prefix, abbreviate.ltwa_suffix, abbreviate.stopwords)
+    gc.collect()
+    tracemalloc.start()
+    other.use_automaton()
+    metrics['automaton_memory'] = _metric(tracemalloc.get_traced_memory()[0] / 2 ** 20, 'MiB')
+    tracemalloc.stop()
+    del other
+
+    metrics['automaton_throughput'] = _metric(throughput(titles), 'titles/s', 'higher')
+    metrics['automaton_long_throughput'] = _metric(throughput(long_titles), 'titles/s', 'higher')
+
+    return metrics
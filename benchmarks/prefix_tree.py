@@ -0,0 +1,83 @@
+"""Compare ``PrefixTree`` and ``Trie``: number of candidates returned by ``search()`` (and accepted by
+``Pattern.match()``) and lookup latency, for the lookups performed while abbreviating the titles of
+``tests/tests.tsv``.
+Note that ``PrefixTree`` may return the same candidate twice (wildcard at the end of the word).
+"""
+
+import argparse
+import time
+from typing import Any, Callable, List
+
+from pyiso4.lexer import Lexer, TokenType
+from pyiso4.ltwa import Pattern, read_ltwa, read_stopwords
+from pyiso4.normalize_string import normalize, Level
+from pyiso4.prefix_tree import PrefixTree, Trie
+
+
+def lookups(titles_file: str, stopwords: List[str]) -> List[str]:
+    """Get the (normalized) strings that ``Abbreviate`` searches in the prefix tree"""
+
+    queries = []
+    with open(titles_file) as f:
+        for line in f.readlines():
+            title = line.split('\t')[0].strip()
+            title_normalized = Pattern.normalize(title)
+            for token in Lexer(normalize(title, Level.SOFT), stopwords).tokenize():
+                if token.type in [TokenType.WORD, TokenType.PART]:
+                    queries.append(title_normalized[token.position:])
+
+    return queries
+
+
+def measure(name: str, search: Callable[[str], List[Any]], queries: List[str], repeat: int) -> None:
+    candidates = 0
+    accepted = 0
+    for query in queries:
+        results = search(query)
+        candidates += len(results)
+        accepted += sum(1 for p in results if p.match(query))
+
+    search_timings = []
+    match_timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            search(query)
+        search_timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for query in queries:
+            [p for p in search(query) if p.match(query)]
+        match_timings.append(time.perf_counter() - start)
+
+    print('{:<12} {:>10} {:>10} {:>14.2f} {:>14.2f}'.format(
+        name, candidates, accepted,
+        min(search_timings) / len(queries) * 1e6, min(match_timings) / len(queries) * 1e6))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-t', '--titles', default='tests/tests.tsv')
+    parser.add_argument('-l', '--ltwa', default='pyiso4/LTWA_20210702.csv')
+    parser.add_argument('-s', '--stopwords', default='pyiso4/stopwords.txt')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    prefix_tree = PrefixTree()
+    trie = Trie()
+    for pattern in read_ltwa(args.ltwa):
+        if not pattern.start_with_dash:
+            prefix_tree.insert(pattern.to_key(), pattern)
+            trie.insert(pattern.to_key(), pattern)
+
+    queries = lookups(args.titles, read_stopwords(args.stopwords))
+
+    print('{} lookups'.format(len(queries)))
+    print('{:<12} {:>10} {:>10} {:>14} {:>14}'.format(
+        'index', 'candidates', 'accepted', 'search (µs)', '+ match (µs)'))
+    measure('PrefixTree', prefix_tree.search, queries, args.repeat)
+    measure('Trie', trie.search, queries, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
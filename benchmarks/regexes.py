@@ -0,0 +1,57 @@
+"""Regexes (see ``Abbreviate.use_regexes()``): latency of ``Abbreviate._search_best()`` for the words of synthetic
+titles, without them, with them while they are compiled (first pass), and with them once they are all compiled.
+"""
+
+import argparse
+import re
+import time
+from typing import Callable, List
+
+from pyiso4.ltwa import Abbreviate
+from pyiso4.normalize_string import NormalizedString
+
+from benchmarks import corpus
+
+
+def timing(function: Callable[[], None], repeat: int = 1) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-l', '--ltwa', default='pyiso4/LTWA_20210702.csv')
+    parser.add_argument('-n', '--number', type=int, default=2000)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    abbreviate = Abbreviate.create(args.ltwa)
+
+    # each word of the titles, with what follows it
+    sentences: List[str] = []
+    for title in corpus.synthetic_titles(args.ltwa, args.number):
+        normalized = NormalizedString(title).normal
+        sentences.extend(normalized[m.end():] for m in re.finditer(r'(^|\s)', normalized))
+
+    def run() -> None:
+        for sentence in sentences:
+            abbreviate._search_best(sentence)
+
+    without = timing(run, args.repeat)
+    abbreviate.use_regexes(cache_size=len(sentences))
+    first = timing(run)
+    warm = timing(run, args.repeat)
+
+    print('{} words, {} regexes'.format(len(sentences), abbreviate.cache_stats()['regex'].size))
+    print('{:<16} {:>16} {:>16} {:>16}'.format('', 'without (µs)', 'first (µs)', 'with (µs)'))
+    print('{:<16} {:>16.2f} {:>16.2f} {:>16.2f}'.format(
+        'synthetic titles', *(t / len(sentences) * 1e6 for t in (without, first, warm))))
+
+
+if __name__ == '__main__':
+    main()
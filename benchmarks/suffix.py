@@ -0,0 +1,71 @@
+"""Lookup of the patterns that start with a dash (e.g., ``-logie``): number of candidates and matches, and latency of
+``Abbreviate._search_suffixes()`` (a walk of the reversed word in the suffix index) compared to checking every
+suffix pattern, for compound words made of a random word and a suffix of the LTWA, and for the words of
+``tests/tests.tsv`` (which mostly do not end with a suffix).
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from pyiso4.ltwa import Abbreviate, Pattern, read_ltwa
+from pyiso4.normalize_string import BOUNDARY
+
+from benchmarks import corpus
+
+
+def compound_words(ltwa_file: str, n: int, seed: int = 42) -> List[str]:
+    """Generate ``n`` (normalized) words ending with a suffix of the LTWA, possibly followed by an inflection"""
+
+    r = random.Random(seed)
+    patterns = list(read_ltwa(ltwa_file))
+    stems = [p.to_key() for p in patterns if not p.start_with_dash and BOUNDARY.search(p.to_key()) is None]
+    suffixes = [p.to_key() for p in patterns if p.start_with_dash and not p.end_with_dash]
+
+    return [r.choice(stems) + r.choice(suffixes) + r.choice(['', '', 's', 'en']) for _ in range(n)]
+
+
+def measure(name: str, search: Callable[[str], List[Pattern]], words: List[str], repeat: int) -> None:
+    matches = sum(len(search(word)) for word in words)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for word in words:
+            search(word)
+        timings.append(time.perf_counter() - start)
+
+    print('{:<12} {:>10} {:>14.2f}'.format(name, matches, min(timings) / len(words) * 1e6))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-t', '--titles', default='tests/tests.tsv')
+    parser.add_argument('-l', '--ltwa', default='pyiso4/LTWA_20210702.csv')
+    parser.add_argument('-n', '--number', type=int, default=5000)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    abbreviate = Abbreviate.create(args.ltwa)
+    suffix_patterns = [p for _, p in abbreviate.ltwa_suffix.items()]
+
+    def search(word: str) -> List[Pattern]:
+        return Abbreviate._search_suffixes(abbreviate.ltwa_suffix, word)
+
+    def scan(word: str) -> List[Pattern]:
+        return sorted(
+            (p for p in suffix_patterns if p.match_suffix(word) >= 0), key=lambda p: len(p.pattern), reverse=True)
+
+    titles_words = [
+        word for title in corpus.read_titles(args.titles) for word in BOUNDARY.split(Pattern.normalize(title)) if word]
+
+    for name, words in [('compound words', compound_words(args.ltwa, args.number)), ('words of titles', titles_words)]:
+        print('{} ({})'.format(name, len(words)))
+        print('{:<12} {:>10} {:>14}'.format('lookup', 'matches', 'time (µs)'))
+        measure('index', search, words, args.repeat)
+        measure('scan', scan, words, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
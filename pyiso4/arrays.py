@@ -0,0 +1,76 @@
+"""Apply a function to the unique values of a column, see ``Abbreviate.abbreviate_array()``.
+
+A column is either a pandas ``Series``, an Arrow (chunked) array or a plain sequence.
+Neither pandas nor pyarrow are dependencies: they are only used when the column comes from them.
+"""
+
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# takes a list of (unique) values, and returns the list of results
+Function = Callable[[List[str]], List[str]]
+
+
+def _is_instance(obj: Any, module: str, names: List[str]) -> bool:
+    """Check if ``obj`` is an instance of one of the classes ``names`` of ``module``,
+    without importing ``module`` (if it was not imported, ``obj`` cannot come from it)"""
+
+    mod = sys.modules.get(module)
+    return mod is not None and isinstance(obj, tuple(getattr(mod, name) for name in names))
+
+
+def apply_unique(values: Any, func: Function) -> Any:
+    """Call ``func`` once with the unique values of ``values`` (nulls excluded), and scatter its results back into
+    a column of the same kind (and length), where nulls are preserved:
+
+    + a ``pyarrow.Array`` (or ``ChunkedArray``) of strings gives an array of the same type,
+    + a ``pandas.Series`` gives a series with the same index and name (and string dtype, if any),
+    + anything else gives a list (where nulls are ``None``).
+    """
+
+    if _is_instance(values, 'pyarrow', ['Array', 'ChunkedArray']):
+        return _apply_arrow(values, func)
+    elif _is_instance(values, 'pandas', ['Series']):
+        return _apply_pandas(values, func)
+    else:
+        return _apply_sequence(values, func)
+
+
+def _apply_arrow(values: Any, func: Function) -> Any:
+    import pyarrow
+    import pyarrow.compute
+
+    unique = pyarrow.compute.unique(values).drop_null()
+    results = pyarrow.array(func(unique.to_pylist()), type=values.type)
+
+    # nulls are not in `unique`, so that their index is null, and so is the value taken for them
+    return pyarrow.compute.take(results, pyarrow.compute.index_in(values, value_set=unique))
+
+
+def _apply_pandas(values: Any, func: Function) -> Any:
+    import numpy
+    import pandas
+
+    codes, unique = pandas.factorize(values)  # nulls have code -1
+
+    results = numpy.empty(len(unique) + 1, dtype=object)
+    results[:-1] = func(list(unique))
+    column = results[codes]
+
+    # keep the nulls as they were (None, NaN, NA, ...)
+    nulls = codes < 0
+    column[nulls] = values.to_numpy(dtype=object)[nulls]
+
+    return pandas.Series(
+        column,
+        index=values.index,
+        name=values.name,
+        dtype=values.dtype if isinstance(values.dtype, pandas.StringDtype) else object)
+
+
+def _apply_sequence(values: Iterable[Optional[str]], func: Function) -> List[Optional[str]]:
+    values = list(values)
+    unique = list(dict.fromkeys(v for v in values if v is not None))
+    results: Dict[str, str] = dict(zip(unique, func(unique)))
+
+    return [None if v is None else results[v] for v in values]
@@ -0,0 +1,91 @@
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Tuple
+
+
+class Automaton:
+    """Aho–Corasick automaton, which finds all the occurrences of a set of keys in a text in a single pass.
+
+    Built once from ``(key, object)`` pairs: multiple objects may have the same key,
+    in which case they are reported in the order in which they were given.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]  # transitions of each state
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        self._outputs: Dict[int, List[Any]] = {}  # objects of the states that are the end of a key
+
+        for key, obj in items:
+            if key == '':
+                raise ValueError('empty key for {!r}'.format(obj))
+
+            state = 0
+            for c in key:
+                next_state = self._goto[state].get(c)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][c] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._depth.append(self._depth[state] + 1)
+
+                state = next_state
+
+            self._outputs.setdefault(state, []).append(obj)
+
+        # state itself if it is the end of a key, otherwise the closest one in the failure chain (or 0)
+        self._emit: List[int] = [0] * len(self._goto)
+        for state in self._outputs:
+            self._emit[state] = state
+
+        # next state in the failure chain that is the end of a key (or 0)
+        self._link: List[int] = [0] * len(self._goto)
+
+        # failure links, breadth-first
+        queue: Deque[int] = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, child in self._goto[state].items():
+                queue.append(child)
+
+                fail = self._fail[state]
+                while True:
+                    next_state = self._goto[fail].get(c)
+                    if next_state is not None or fail == 0:
+                        break
+                    fail = self._fail[fail]
+
+                fail = next_state if next_state is not None else 0
+                self._fail[child] = fail
+                self._link[child] = self._emit[fail]
+                if child not in self._outputs:
+                    self._emit[child] = self._emit[fail]
+
+    def __len__(self) -> int:
+        """Number of states"""
+
+        return len(self._goto)
+
+    def scan(self, text: str) -> Iterator[Tuple[int, int, List[Any]]]:
+        """Yield ``(start, end, objects)`` for each occurrence of a key in ``text``
+        (``text[start:end]`` being the key), by increasing ``end`` and, for a given ``end``, decreasing length.
+        """
+
+        goto, fail, emit, link, depth, outputs = \
+            self._goto, self._fail, self._emit, self._link, self._depth, self._outputs
+
+        state = 0
+        for end, c in enumerate(text, 1):
+            while True:
+                next_state = goto[state].get(c)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+
+            output = emit[state]
+            while output != 0:
+                yield end - depth[output], end, outputs[output]
+                output = link[output]
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, NamedTuple, Tuple
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else .0
+
+
+# returned by `LRUCache.get()` when the key is not in the cache
+MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe cache that keeps (at most) the ``maxsize`` last recently used values.
+    If ``maxsize`` is 0, nothing is kept.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __reduce__(self) -> Tuple[type, Tuple[int]]:
+        # the content (and the lock) is not copied
+        return self.__class__, (self.maxsize,)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        """Get the value for ``key``, or ``MISSING``"""
+
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return MISSING
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._data), self.maxsize)
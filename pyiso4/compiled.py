@@ -0,0 +1,149 @@
+import gc
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import tempfile
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+import pyiso4
+
+# Bump this each time the content of the payload changes
+FORMAT_VERSION = 6
+
+MAGIC = b'PYISO4IX'
+
+Path = Union[str, pathlib.Path]
+
+
+class IndexFormatError(Exception):
+    pass
+
+
+# errors raised when reading a file that is not a (complete) compiled index
+READ_ERRORS = (OSError, EOFError, ValueError, pickle.UnpicklingError, IndexFormatError)
+
+
+def checksum(path: Optional[Path]) -> Optional[str]:
+    """Get the SHA-256 digest of a (source) file, or ``None`` if there is no file
+    """
+
+    if path is None:
+        return None
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+@contextmanager
+def no_gc() -> Iterator[None]:
+    """Disable the garbage collector for a while. Since (un)pickling or building an index creates a lot of objects
+    that are never freed, the collection passes triggered along the way are pure overhead.
+    """
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+@contextmanager
+def replace_file(path: Path) -> Iterator[BinaryIO]:
+    """Open a temporary file (in the directory of ``path``) for writing, and move it onto ``path`` once it is
+    complete. Thus, other processes either read the previous file or the new one, never a partial one.
+    """
+
+    path = pathlib.Path(path)
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def write(path: Path, payload: Any, sources: Dict[str, Optional[str]]) -> None:
+    """Write a compiled index.
+
+    The file starts with ``MAGIC``, followed by the size of a JSON header (4 bytes, big endian),
+    the header itself (format version and checksum of the sources), and the pickled ``payload``.
+    """
+
+    header = json.dumps({
+        'version': FORMAT_VERSION,
+        'pyiso4': pyiso4.__version__,
+        'sources': sources
+    }).encode()
+
+    with no_gc():
+        data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+    with replace_file(path) as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, 'big'))
+        f.write(header)
+        f.write(data)
+
+
+def parse_header(f: Any, magic: bytes = MAGIC, version: int = FORMAT_VERSION) -> Dict[str, Any]:
+    """Read ``magic`` and the JSON header from a binary file, and check that the format is ``version``.
+    The file is left positioned right after the header.
+    """
+
+    if f.read(len(magic)) != magic:
+        raise IndexFormatError('{} is not a compiled index'.format(f.name))
+
+    size = int.from_bytes(f.read(4), 'big')
+    header: Dict[str, Any] = json.loads(f.read(size))
+
+    if header.get('version') != version:
+        raise IndexFormatError('{} uses format version {}, expected {}'.format(
+            f.name, header.get('version'), version))
+
+    return header
+
+
+def read_header(path: Path) -> Dict[str, Any]:
+    """Read the header of a compiled index, without loading the payload
+    """
+
+    with open(path, 'rb') as f:
+        return parse_header(f)
+
+
+def read(path: Path) -> Tuple[Dict[str, Any], Any]:
+    """Read a compiled index, and return its header and payload.
+
+    Note: the payload is a pickle, so only load files that you trust.
+    """
+
+    with open(path, 'rb') as f:
+        header = parse_header(f)
+        data = f.read()
+
+    with no_gc():
+        return header, pickle.loads(data)
+
+
+def is_up_to_date(path: Path, sources: Dict[str, Optional[str]]) -> bool:
+    """Check that a compiled index exists, has the right format, and was compiled from ``sources``
+    (a dictionary of checksums, see ``checksum()``)
+    """
+
+    try:
+        header = read_header(path)
+    except READ_ERRORS:
+        return False
+
+    return bool(header.get('sources') == sources)
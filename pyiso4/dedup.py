@@ -0,0 +1,265 @@
+"""Index of journal titles, to find the known journals that a title (or abbreviation) stands for, and to detect
+near-duplicates, see ``JournalIndex``.
+"""
+
+import hashlib
+import pathlib
+import sqlite3
+import zlib
+from collections import deque
+from itertools import combinations
+from typing import Deque, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from pyiso4.ltwa import Abbreviate
+from pyiso4.normalize_string import normalize, Level
+
+# for MinHash: a prime larger than the hashes (which are 32 bits), and parameters of the hash functions
+# (``(a * h + b) % _PRIME``, always the same, so that the blocks stored in a database stay valid)
+_PRIME = (1 << 61) - 1
+_MAX_HASHES = 256
+
+
+def _coefficient(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), 'big') % (_PRIME - 1) + 1
+
+
+_COEFFICIENTS = [(_coefficient('a{}'.format(i)), _coefficient('b{}'.format(i))) for i in range(_MAX_HASHES)]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parameters (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS journals (id INTEGER PRIMARY KEY, title TEXT NOT NULL, key TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS journals_key ON journals (key);
+CREATE TABLE IF NOT EXISTS blocks (block INTEGER NOT NULL, key TEXT NOT NULL, PRIMARY KEY (block, key)) WITHOUT ROWID;
+"""
+
+
+class Journal(NamedTuple):
+    id: int
+    title: str
+    key: str
+
+
+def shingles(key: str) -> FrozenSet[str]:
+    """Trigrams of a key (padded with spaces, so that short words have some)"""
+
+    padded = ' {} '.format(key)
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(key1: str, key2: str) -> float:
+    """Jaccard similarity of the trigrams of two keys (1 if they are the same)"""
+
+    if key1 == key2:
+        return 1.
+
+    shingles1, shingles2 = shingles(key1), shingles(key2)
+    return len(shingles1 & shingles2) / len(shingles1 | shingles2)
+
+
+class JournalIndex:
+    """Index of journal titles, stored in a SQLite database (in memory by default, or in the file ``path``).
+
+    Each title gets a canonical key: the words of its abbreviation (given by ``abbreviate``), normalized with
+    ``Level.HARD``, so that a title and its abbreviation have the same key, whatever their case, diacritics and
+    punctuation (see ``key()``).
+    Keys are also put in ``bands`` blocks, using MinHash (``rows`` hashes per band) over their trigrams, so that
+    similar keys are likely to share at least one block (locality-sensitive hashing).
+    Then, near-duplicates are only looked for in the blocks, instead of comparing all the pairs of titles.
+
+    The default (8 bands of 4 rows) gives a probability of 50% to share a block to keys with a similarity
+    of about 0.55, and of 99% for a similarity of 0.85.
+    An existing database can only be opened with the same ``bands`` and ``rows``.
+    """
+
+    def __init__(self,
+                 abbreviate: Abbreviate,
+                 path: Union[str, pathlib.Path] = ':memory:',
+                 bands: int = 8,
+                 rows: int = 4,
+                 remove_part: bool = True,
+                 langs: Optional[List[str]] = None):
+        if bands * rows > _MAX_HASHES:
+            raise ValueError('at most {} hashes (bands * rows)'.format(_MAX_HASHES))
+
+        self.abbreviate = abbreviate
+        self.remove_part = remove_part
+        self.langs = langs
+        self.bands = bands
+        self.rows = rows
+        self._hashes: Dict[str, Tuple[int, ...]] = {}  # hashes of each shingle (keys are in [a-z ], so at most 27^3)
+
+        self.connection = sqlite3.connect(str(path))
+        self.connection.executescript(SCHEMA)
+
+        parameters = dict(self.connection.execute('SELECT name, value FROM parameters'))
+        expected = {'bands': str(bands), 'rows': str(rows)}
+        if not parameters:
+            with self.connection:
+                self.connection.executemany('INSERT INTO parameters VALUES (?, ?)', expected.items())
+        elif parameters != expected:
+            raise ValueError('index was created with {}, not {}'.format(parameters, expected))
+
+    def __enter__(self) -> 'JournalIndex':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return int(self.connection.execute('SELECT COUNT(*) FROM journals').fetchone()[0])
+
+    @staticmethod
+    def hard_key(text: str) -> str:
+        """Normalize ``text`` with ``Level.HARD``, with single spaces between words"""
+
+        return ' '.join(normalize(text, Level.HARD).split())
+
+    def key(self, title: str) -> str:
+        """Canonical key of a title (or of an abbreviation): its abbreviation, normalized with ``Level.HARD``"""
+
+        return self.hard_key(self.abbreviate(title, self.remove_part, self.langs))
+
+    def blocks(self, key: str) -> List[int]:
+        """Blocks of a key: the MinHash of each band, combined with the number of the band
+        (an empty key has no block)
+        """
+
+        hashes = []
+        for shingle in shingles(key):
+            shingle_hashes = self._hashes.get(shingle)
+            if shingle_hashes is None:
+                h = zlib.crc32(shingle.encode())
+                shingle_hashes = self._hashes[shingle] = tuple(
+                    (a * h + b) % _PRIME for a, b in _COEFFICIENTS[:self.bands * self.rows])
+            hashes.append(shingle_hashes)
+
+        if not hashes:
+            return []
+
+        signature = list(map(min, zip(*hashes)))
+
+        # (the same in every process, and SQLite integers are signed 64 bits)
+        return [
+            band << 32 | zlib.crc32(repr(signature[band * self.rows:(band + 1) * self.rows]).encode())
+            for band in range(self.bands)
+        ]
+
+    def _insert(self, titles_and_keys: Iterable[Tuple[str, str]]) -> int:
+        count = 0
+        blocks: Dict[str, List[int]] = {}  # (only computed once per key)
+        with self.connection:
+            for title, key in titles_and_keys:
+                self.connection.execute('INSERT INTO journals (title, key) VALUES (?, ?)', (title, key))
+                if key not in blocks:
+                    blocks[key] = self.blocks(key)
+                    self.connection.executemany(
+                        'INSERT OR IGNORE INTO blocks VALUES (?, ?)', ((block, key) for block in blocks[key]))
+                count += 1
+
+        return count
+
+    def add(self, title: str) -> None:
+        self._insert([(title, self.key(title))])
+
+    def add_many(self, titles: Iterable[str], workers: int = 1, chunksize: int = 256) -> int:
+        """Add ``titles`` (abbreviated with ``workers`` processes, see ``Abbreviate.iter_abbreviate_many()``)
+        in a single transaction, and return their number.
+        Only the titles that are being abbreviated are kept, so ``titles`` can be as long as needed.
+        """
+
+        waiting: Deque[str] = deque()  # titles given to the abbreviation, of which the result did not come back yet
+
+        def consumed() -> Iterator[str]:
+            for title in titles:
+                waiting.append(title)
+                yield title
+
+        abbreviations = self.abbreviate.iter_abbreviate_many(
+            consumed(), self.remove_part, self.langs, workers, chunksize)
+        return self._insert((waiting.popleft(), self.hard_key(abbreviation)) for abbreviation in abbreviations)
+
+    def add_file(self, path: Union[str, pathlib.Path], workers: int = 1, chunksize: int = 256) -> int:
+        """Add the titles of a file (one per line, empty lines are skipped), see ``add_many()``"""
+
+        with open(path) as f:
+            return self.add_many((line.strip() for line in f if line.strip()), workers, chunksize)
+
+    def _journals(self, keys: Iterable[str]) -> List[Journal]:
+        keys = list(dict.fromkeys(keys))
+        return [
+            Journal(*row) for row in self.connection.execute(
+                'SELECT id, title, key FROM journals WHERE key IN ({}) ORDER BY id'.format(', '.join('?' * len(keys))),
+                keys)
+        ]
+
+    def lookup(self, title: str) -> List[Journal]:
+        """Get the known journals that have the same key as ``title`` (or abbreviation)"""
+
+        # (an abbreviation should give itself when it is abbreviated, but it is also checked as is)
+        return self._journals([self.key(title), self.hard_key(title)])
+
+    def similar(self, title: str, threshold: float = .8) -> List[Tuple[Journal, float]]:
+        """Get the known journals of which the key has a similarity (see ``similarity()``) of at least ``threshold``
+        with the one of ``title``, and that share a block with it, most similar first
+        """
+
+        key = self.key(title)
+        blocks = self.blocks(key)
+        keys = [row[0] for row in self.connection.execute(
+            'SELECT DISTINCT key FROM blocks WHERE block IN ({})'.format(', '.join('?' * len(blocks))), blocks)]
+
+        similarities = dict((other, similarity(key, other)) for other in keys)
+        results = [
+            (journal, similarities[journal.key])
+            for journal in self._journals(k for k, s in similarities.items() if s >= threshold)
+        ]
+
+        return sorted(results, key=lambda r: -r[1])
+
+    def duplicates(self, threshold: float = .8, max_block_size: int = 1000) -> Iterator[Tuple[str, str, float]]:
+        """Yield the pairs of different keys that share a block and have a similarity of at least ``threshold``
+        (each pair once), and then the keys of which there are more than one journal (with a similarity of 1),
+        see ``lookup()`` to get the journals.
+
+        Only the keys in a same block are compared. The blocks that contain more than ``max_block_size`` keys
+        are skipped, so that this does not become quadratic.
+        """
+
+        seen: Set[Tuple[str, str]] = set()
+        cursor = self.connection.execute('SELECT block, key FROM blocks ORDER BY block')
+
+        block: Optional[int] = None
+        keys: List[str] = []
+        for current, key in cursor:
+            if current != block:
+                yield from self._block_duplicates(keys, threshold, max_block_size, seen)
+                block, keys = current, []
+            keys.append(key)
+
+        yield from self._block_duplicates(keys, threshold, max_block_size, seen)
+
+        for key, in self.connection.execute('SELECT key FROM journals GROUP BY key HAVING COUNT(*) > 1'):
+            yield key, key, 1.
+
+    @staticmethod
+    def _block_duplicates(
+            keys: List[str],
+            threshold: float,
+            max_block_size: int,
+            seen: Set[Tuple[str, str]]) -> Iterator[Tuple[str, str, float]]:
+        if len(keys) < 2 or len(keys) > max_block_size:
+            return
+
+        key_shingles = dict((key, shingles(key)) for key in keys)
+        for key1, key2 in combinations(sorted(keys), 2):
+            if (key1, key2) in seen:
+                continue
+
+            shingles1, shingles2 = key_shingles[key1], key_shingles[key2]
+            value = len(shingles1 & shingles2) / len(shingles1 | shingles2)
+            if value >= threshold:
+                seen.add((key1, key2))
+                yield key1, key2, value
@@ -0,0 +1,98 @@
+"""Opt-in instrumentation of ``Abbreviate``: see ``Abbreviate.add_observer()``.
+"""
+
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+# stages of `Abbreviate.abbreviate_title()`
+STAGES = ['normalize', 'tokenize', 'search', 'match', 'capitalization']
+
+
+class CallStats:
+    """What happened during one call to an ``Abbreviate`` object.
+    Timings are in seconds, and ``total`` includes the time that is not part of any stage.
+    """
+
+    def __init__(self, title: str, langs: Optional[List[str]] = None):
+        self.title = title
+        self.langs = langs
+
+        self.timings: Dict[str, float] = dict((stage, .0) for stage in STAGES)
+        self.total = .0
+
+        self.tokens = 0  # number of tokens returned by the lexer
+        self.lookups = 0  # number of words looked for in the LTWA
+        self.candidates = 0  # patterns read from the indexes (until the best one is found)
+        self.accepted = 0  # ... and accepted by `Pattern.match()`
+        self.title_cache_hit = False
+        self.word_cache_hits = 0
+        self.word_table_hits = 0  # words found in the word table (see `Abbreviate.build_word_table()`)
+        self.filter_checks = 0  # index searches checked by the key filters (see `Abbreviate.use_key_filters()`)
+        self.filtered = 0  # ... and skipped, since no key could match
+        self.patterns: List[Any] = []  # pattern chosen for each word (if any)
+
+    def __repr__(self) -> str:
+        return 'CallStats({!r}, {:.1f} µs, {} tokens, {}/{} candidates)'.format(
+            self.title, self.total * 1e6, self.tokens, self.accepted, self.candidates)
+
+
+# anything that can be called with the `CallStats` of each call
+Observer = Callable[[CallStats], None]
+
+
+class StatsAggregator:
+    """Observer that sums the stats of all calls (thread-safe)"""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.total = .0
+        self.timings: Dict[str, float] = dict((stage, .0) for stage in STAGES)
+        self.tokens = 0
+        self.lookups = 0
+        self.candidates = 0
+        self.accepted = 0
+        self.title_cache_hits = 0
+        self.word_cache_hits = 0
+        self.word_table_hits = 0
+        self.filter_checks = 0
+        self.filtered = 0
+
+    def __call__(self, stats: CallStats) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total += stats.total
+            for stage, timing in stats.timings.items():
+                self.timings[stage] += timing
+            self.tokens += stats.tokens
+            self.lookups += stats.lookups
+            self.candidates += stats.candidates
+            self.accepted += stats.accepted
+            self.title_cache_hits += stats.title_cache_hit
+            self.word_cache_hits += stats.word_cache_hits
+            self.word_table_hits += stats.word_table_hits
+            self.filter_checks += stats.filter_checks
+            self.filtered += stats.filtered
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals, plus the mean time per call"""
+
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'total': self.total,
+                'mean': self.total / self.calls if self.calls > 0 else .0,
+                'timings': dict(self.timings),
+                'tokens': self.tokens,
+                'lookups': self.lookups,
+                'candidates': self.candidates,
+                'accepted': self.accepted,
+                'title_cache_hits': self.title_cache_hits,
+                'word_cache_hits': self.word_cache_hits,
+                'word_table_hits': self.word_table_hits,
+                'filter_checks': self.filter_checks,
+                'filtered': self.filtered,
+            }
@@ -0,0 +1,151 @@
+"""Lazy loading of the LTWA, for short-lived processes that only abbreviate a few titles.
+
+The lines of the CSV file are split into shards, by the first character of the key (for the prefix index)
+or by the last one (for the suffix index, where keys are reversed).
+The patterns of a shard are only parsed, and put in a ``Trie``, the first time a search reaches this shard.
+Thus, the time and memory needed scale with the vocabulary actually used.
+"""
+
+import pathlib
+from threading import Lock
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pyiso4.ltwa import Pattern, key_heads
+from pyiso4.prefix_tree import Trie
+
+# a shard contains the lines that are not parsed yet, and the patterns that had to be parsed to be sharded
+Entry = Union[str, Pattern]
+Shards = Dict[str, List[Entry]]
+
+# the first character of the key is the first character of the line for these
+_NOT_SHARDABLE = '-(\t'
+
+
+def read_shards(ltwa_file: Union[str, pathlib.Path]) -> Tuple[Shards, Shards]:
+    """Split the lines of a LTWA CSV file (the first line is a header) into the shards of the prefix and suffix
+    indexes. Lines are only parsed when the first character of their key is not the first character of the line
+    (e.g., if it is not ASCII).
+    """
+
+    prefix: Shards = {}
+    suffix: Shards = {}
+
+    with open(ltwa_file) as f:
+        next(f, None)
+        for line in f:
+            if line == '\n':
+                continue
+
+            c = line[0]
+            if c.isascii() and not c.isspace() and c not in _NOT_SHARDABLE:
+                prefix.setdefault(c.lower(), []).append(line)
+            else:
+                pattern = Pattern.from_line(line)
+                key = pattern.to_key()
+                if pattern.start_with_dash:
+                    suffix.setdefault(key[-1:], []).append(pattern)
+                else:
+                    prefix.setdefault(key[:1], []).append(pattern)
+
+    return prefix, suffix
+
+
+class LazyIndex:
+    """Index that parses the patterns of a shard the first time that a search reaches it (see ``read_shards()``).
+    If ``langs`` is given, only the patterns in one of these languages (or ``mul``) are kept.
+    Searches can be performed concurrently.
+    """
+
+    def __init__(self, shards: Shards, suffix: bool = False, langs: Optional[List[str]] = None):
+        self.suffix = suffix
+        self.langs = langs
+
+        self._shards = shards
+        self._tries: Dict[str, Trie] = {}
+        self._heads: Dict[str, FrozenSet[str]] = {}  # heads of the keys of each loaded shard, see `heads()`
+        self._lock = Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    @property
+    def loaded_shards(self) -> List[str]:
+        return sorted(self._tries)
+
+    def _load(self, shard: str) -> Trie:
+        trie = Trie()
+        for entry in self._shards[shard]:
+            pattern = Pattern.from_line(entry) if isinstance(entry, str) else entry
+            if self.langs is not None and not pattern.match_languages(self.langs):
+                continue
+
+            key = pattern.to_key()
+            trie.insert(key[::-1] if self.suffix else key, pattern)
+
+        return trie
+
+    def _trie(self, shard: str) -> Optional[Trie]:
+        trie = self._tries.get(shard)
+        if trie is None and shard in self._shards:
+            with self._lock:
+                trie = self._tries.get(shard)
+                if trie is None:
+                    trie = self._load(shard)
+                    self._heads[shard] = key_heads(trie.keys()) if not self.suffix else frozenset()
+                    self._tries[shard] = trie
+
+        return trie
+
+    def search(self, word: str, langs: Optional[Iterable[str]] = None) -> List[Pattern]:
+        """Same as ``Trie.search()``"""
+
+        results = []
+
+        empty = self._trie('')  # (patterns with an empty key match any word)
+        if empty is not None:
+            results.extend(empty.search(word, langs))
+
+        trie = self._trie(word[:1]) if word != '' else None
+        if trie is not None:
+            results.extend(trie.search(word, langs))
+
+        return results
+
+    def search_longest_first(self, word: str, langs: Optional[Iterable[str]] = None) -> Iterator[Pattern]:
+        """Same as ``Trie.search_longest_first()``"""
+
+        trie = self._trie(word[:1]) if word != '' else None
+        if trie is not None:
+            yield from trie.search_longest_first(word, langs)
+
+        empty = self._trie('')
+        if empty is not None:
+            yield from empty.search_longest_first(word, langs)
+
+    def heads(self, word: str) -> FrozenSet[str]:
+        """Get the first word of the keys that contain a boundary (see ``Abbreviate._window()``), among the keys
+        that start like ``word``. Only the shard of ``word`` is loaded (which searching ``word`` does anyway).
+        """
+
+        self._trie(word[:1])
+        return self._heads.get(word[:1], frozenset())
+
+    def items(self) -> Iterator[Tuple[str, Pattern]]:
+        """Iterate over all the ``(key, pattern)``, which loads all the shards"""
+
+        for shard in sorted(self._shards):
+            trie = self._trie(shard)
+            assert trie is not None
+            yield from trie.items()
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over the key of each pattern (see ``items()``)"""
+
+        for key, _ in self.items():
+            yield key
@@ -1,4 +1,4 @@
-from typing import List, Iterable, Optional
+from typing import Collection, Iterable, Optional
 from enum import Enum, unique
 from unicodedata import normalize
 import re
@@ -19,22 +19,36 @@ class TokenType(Enum):
 
 SPACES = ' ', '\t', '\n'
 
+# a word is anything between spaces
+WORD = re.compile(r'[^ \t\n]+')
+
 DOT = '.'
 
-PARTS = ['series', 'serie', 'part', 'section', 'série']
-PARTS_ABBRV = ['ser', 'sect', 'sec']
+# (the words are looked up in sets, so that the lexer does not go through lists for each of them)
+PARTS = frozenset(['series', 'serie', 'part', 'section', 'série'])
+PARTS_ABBRV = frozenset(['ser', 'sect', 'sec'])
+
+ARTICLES = frozenset([
+    'a', 'an', 'the', 'der', 'die', 'das', 'den', 'dem', 'des', 'le', 'la', 'les', 'el', 'il', 'lo', 'los',
+    'de', 'het', 'els', 'ses', 'es', 'gli', 'een'])
 
-ARTICLES = ['a', 'an', 'the', 'der', 'die', 'das', 'den', 'dem', 'des', 'le', 'la', 'les', 'el', 'il', 'lo', 'los',
-            'de', 'het', 'els', 'ses', 'es', 'gli', 'een']
+# French "l'" and "d'", and Italian "dell'" and "nell'", at the beginning of a word
+ELIDED_ARTICLES = frozenset(["l'", "d'", 'l’', 'd’'])
+ELIDED_ARTICLES_IT = frozenset(["dell'", "nell'", 'dell’', 'nell’'])
 
 # common abbreviation are only accepted with the correct capitalization
-COMMON_ABBRV = ['St', 'Mr', 'Ms', 'Mrs', 'Mx', 'Dr', 'Prof', 'vs']
+COMMON_ABBRV = frozenset(['St', 'Mr', 'Ms', 'Mrs', 'Mx', 'Dr', 'Prof', 'vs'])
 
 # single (uppercase) letter, or roman letters
 IS_ORDINAL = re.compile(r'[A-Z]|[IVXivx]+')
 
 
 class Token:
+    """Token of a title. Tokens are never modified once created (so they can be shared)"""
+
+    # one is created for each word of each title, so no `__dict__`
+    __slots__ = ('type', 'value', 'position')
+
     def __init__(self, typ: TokenType, value: str, position: int = -1):
         self.type = typ
         self.value = value
@@ -45,34 +59,35 @@ class Token:
             self.type, self.value, '' if self.position < 0 else ', {}'.format(self.position))
 
 
+# the same token ends every title
+EOS_TOKEN = Token(TokenType.EOS, '\0')
+
+
 class Lexer:
-    def __init__(self, inp: str, stopwords: List[str]) -> None:
-        self.input = normalize('NFC', inp)
+    """Split a title into tokens.
+    ``stopwords`` is preferably a ``frozenset`` (as given by ``Abbreviate``), otherwise a set is made of it.
+    """
+
+    def __init__(self, inp: str, stopwords: Collection[str]) -> None:
+        self.input = inp if inp.isascii() else normalize('NFC', inp)
         self.pos = 0
         self.count = -1
         self.start_word = 0
         self.current_word: Optional[str] = None
-        self.stopwords = stopwords
+        self.stopwords = stopwords if isinstance(stopwords, (set, frozenset)) else frozenset(stopwords)
 
         self.next()
 
-    def _skip_space(self) -> None:
-        while self.pos < len(self.input) and self.input[self.pos] in SPACES:
-            self.pos += 1
-
     def next(self) -> None:
         """Get the next word"""
 
-        self._skip_space()
-        beg = self.pos
-        while self.pos < len(self.input) and self.input[self.pos] not in SPACES:
-            self.pos += 1
-
-        if beg != self.pos:
-            self.current_word = self.input[beg:self.pos]
-            self.start_word = beg
+        match = WORD.search(self.input, self.pos)
+        if match is not None:
+            self.current_word = match.group()
+            self.start_word, self.pos = match.span()
         else:
             self.current_word = None
+            self.pos = len(self.input)
 
         self.count += 1
 
@@ -97,11 +112,15 @@ class Lexer:
             lower_word = self.current_word.lower()
 
             # remove symbols at the end
+            end = len(lower_word)
+            while end > 0 and not lower_word[end - 1].isalnum():
+                end -= 1
+
             end_symbols = ''
-            while len(lower_word) > 0 and not lower_word[-1].isalnum():
-                end_symbols = lower_word[-1] + end_symbols
-                lower_word = lower_word[:-1]
-                word = word[:-1]
+            if end < len(lower_word):
+                end_symbols = lower_word[end:]
+                word = word[:max(0, len(word) - len(end_symbols))]
+                lower_word = lower_word[:end]
 
             # if word ends with quote, put it back (plural possessive in english)
             if len(end_symbols) > 0 and end_symbols[0] == "'":
@@ -132,25 +151,27 @@ class Lexer:
                     yield Token(TokenType.PART, word, self.start_word)
                     was_part = self.count
                 # check if ordinal (preceded by PART)
-                elif IS_ORDINAL.match(word) and self.count == was_part + 1:
+                elif self.count == was_part + 1 and IS_ORDINAL.match(word):
                     yield Token(TokenType.ORDINAL, word, self.start_word)
                 # check if article (after ordinal, so "a" is detected as ordinal if preceded by PART)
                 elif lower_word in ARTICLES:
                     yield Token(TokenType.ARTICLE, word, self.start_word)
                 # check if French "l'" or "d'"
-                elif lower_word[0:2] in ["l'", "d'", 'l’', 'd’']:
+                elif lower_word[0:2] in ELIDED_ARTICLES:
                     yield Token(TokenType.ARTICLE, word[0:2], self.start_word)
                     yield from yield_hyphenated(word[2:], self.start_word + 2)  # the rest is assumed to be a word
                 # check if Italian "dell'" or "nell'"
-                elif lower_word[0:5] in ["dell'", "nell'", 'dell’', 'nell’']:
+                elif lower_word[0:5] in ELIDED_ARTICLES_IT:
                     yield Token(TokenType.ARTICLE, word[0:5], self.start_word)
                     yield from yield_hyphenated(word[5:], self.start_word + 5)  # the rest is assumed to be a word
                 # check if stopword
                 elif lower_word in self.stopwords:
                     yield Token(TokenType.STOPWORD, word, self.start_word)
                 # otherwise ...
-                else:
+                elif '-' in word:
                     yield from yield_hyphenated(word, self.start_word)
+                else:
+                    yield Token(TokenType.WORD, word, self.start_word)
 
             # yield the remaining symbols, if any
             if len(end_symbols) > 0:
@@ -158,4 +179,4 @@ class Lexer:
 
             self.next()
 
-        yield Token(TokenType.EOS, '\0')
+        yield EOS_TOKEN
@@ -1,24 +1,54 @@
-from typing import List, Tuple, Optional, Union
-from unidecode import unidecode
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, Iterator, List, Tuple, Optional, Union, \
+    TYPE_CHECKING
+from typing import Pattern as Regex
+from collections import Counter, deque
+import bisect
+import functools
+import itertools
 import re
+import time
 import pathlib
 
-from pyiso4.prefix_tree import PrefixTree
+from pyiso4 import compiled
+from pyiso4.arrays import apply_unique
+from pyiso4.automaton import Automaton
+from pyiso4.cache import CacheStats, LRUCache, MISSING
+from pyiso4.instrument import CallStats, Observer
+from pyiso4.prefix_tree import KeyFilter, SearchIndex, Trie, languages_mask
 from pyiso4.lexer import Lexer, Token, TokenType
-from pyiso4.normalize_string import normalize, Level, BOUNDARY, number_of_ligatures
+from pyiso4.normalize_string import normalize, Level, BOUNDARY, NormalizedString, transliterate_char
+
+if TYPE_CHECKING:  # (processes are only needed with several workers, and importing them takes a while)
+    from concurrent.futures import Executor, Future
+
+
+# a single tuple for each combination of languages
+_langs_tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
 
 
 class Pattern:
-    INFLECTION = re.compile(r'^([iaesn\'’]{1,3})')
+    INFLECTION_CHARS = frozenset("iaesn'’")  # (the characters of `INFLECTION`)
+    INFLECTION = re.compile(r'([iaesn\'’]{1,3})')  # no `^`, so that it works with `match(s, pos)`
+    MIN_STEM_LENGTH = 4  # what comes before a pattern starting with a dash, see `match_suffix()`
 
-    def __init__(self, pattern: str, replacement: str, langs: List[str] = ['mul']):
+    # there are a lot of them, so no `__dict__`
+    __slots__ = ('pattern', 'replacement', '_langs', 'langs_mask', 'start_with_dash', 'end_with_dash')
+
+    def __init__(self, pattern: str, replacement: str, langs: Iterable[str] = ('mul', )):
         self.pattern = pattern
         self.replacement = replacement
-        self.langs = langs
+
+        langs = tuple(langs)
+        self._langs = _langs_tuples.setdefault(langs, langs)
+        self.langs_mask = languages_mask(langs, add=True)
 
         self.start_with_dash = pattern[0] == '-'
         self.end_with_dash = pattern[-1] == '-'
 
+    @property
+    def langs(self) -> List[str]:
+        return list(self._langs)
+
     @staticmethod
     def normalize(inp: str) -> str:
         """Normalization for the patterns (and keys): unidecode + lowering
@@ -55,116 +85,955 @@ class Pattern:
         else:
             return self.pattern
 
-    def match(self, sentence: str, langs: Optional[List[str]] = None) -> bool:
-        """Check if the pattern matches the begining of ``sentence``.
+    def match_languages(self, langs: Iterable[str]) -> bool:
+        """Check if the pattern is in one of ``langs`` (or works with any language, i.e., ``mul``)"""
+
+        return self.langs_mask & (languages_mask(langs) | 1) != 0
+
+    def match(self, sentence: str, langs: Optional[List[str]] = None, position: int = 0) -> bool:
+        """Check if the pattern matches the begining of ``sentence[position:]`` (without copying it).
         Assume that it has been normalized.
         """
 
         # check if similar languages (if provided)
-        if langs is not None:
-            similar_lang = False
-            for language in self.langs:
-                if language == 'mul':
-                    similar_lang = True
-                    break  # works with any language
-                if language in langs:
-                    similar_lang = True
-                    break  # good
-
-            if not similar_lang:
-                return False
+        if langs is not None and not self.match_languages(langs):
+            return False
+
+        # a pattern starting with a dash matches the end of the word
+        if self.start_with_dash:
+            boundary = BOUNDARY.search(sentence, position)
+            return self.match_suffix(sentence[position:boundary.start() if boundary is not None else None]) >= 0
+
+        length = len(sentence) - position
 
         # if there is a starting or ending dash, the pattern cannot be larger than the word
         if self.start_with_dash or self.end_with_dash:
-            if len(self.pattern) > (len(sentence) + 1):
+            if len(self.pattern) > (length + 1):
                 return False
         # if there is no dash, the lengths should be, at most, the same
         else:
-            if len(self.pattern) > len(sentence):
+            if len(self.pattern) > length:
                 return False
 
         pattern = self.pattern
-        if self.start_with_dash:
-            pattern = str(reversed(pattern))
-            sentence = str(reversed(sentence))
-
         final_pos = 0
         for i, c in enumerate(pattern):
             final_pos = i
             if c == '-' and i == len(pattern) - 1:  # ok, good
                 return True
-            elif c != sentence[i].lower():
+            elif c != sentence[position + i].lower():
                 return False
 
         # now, does this ends well?
-        inflection = Pattern.INFLECTION.match(sentence[final_pos + 1:])
+        inflection = Pattern.INFLECTION.match(sentence, position + final_pos + 1)
         if inflection is not None:
-            final_pos += inflection.span()[1]
+            final_pos += len(inflection.group())
 
-        if final_pos == len(sentence) - 1:  # nothing else, so that's a match
+        if final_pos == length - 1:  # nothing else, so that's a match
             return True
         else:  # if that's a boundary, then its a match
-            return BOUNDARY.match(sentence[final_pos + 1:]) is not None
+            return BOUNDARY.match(sentence, position + final_pos + 1) is not None
+
+    def match_suffix(self, word: str) -> int:
+        """For a pattern starting with a dash (e.g., ``-logie``), get the position in ``word`` (a single normalized
+        word) where the pattern starts, if the word ends with it (possibly followed by an inflection, as in
+        ``match()``) and if at least ``MIN_STEM_LENGTH`` characters come before it (e.g., ``psycho`` in
+        ``psychologies``, but not ``ba`` in ``baton``, which is not a compound word). Otherwise, return -1.
+        Patterns that end with a dash as well (e.g., ``-graph-``) are not supported, so they never match.
+        """
+
+        if not self.start_with_dash or self.end_with_dash:
+            return -1
+
+        key_length = len(self.pattern) - 1
+        end = len(word)
+        for _ in range(4):  # no inflection, or an inflection of 1 to 3 characters
+            start = end - key_length
+            if start < Pattern.MIN_STEM_LENGTH:
+                return -1
+            if word.startswith(self.pattern[1:], start):
+                return start
+            if word[end - 1] not in Pattern.INFLECTION_CHARS:
+                return -1
+            end -= 1
+
+        return -1
 
     def __repr__(self) -> str:
         return 'Pattern({}, {})'.format(self.pattern, self.replacement)
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Pattern):
+            return NotImplemented
+
+        return (self.pattern, self.replacement, self._langs) == (other.pattern, other.replacement, other._langs)
+
+    def __hash__(self) -> int:
+        return hash((self.pattern, self.replacement, self._langs))
+
+    def __reduce__(self) -> Tuple[type, Tuple[str, str, Tuple[str, ...]]]:
+        # the dashes and the mask are recomputed (the bits of the languages may differ from one process to another)
+        return self.__class__, (self.pattern, self.replacement, self._langs)
+
 
 _here = pathlib.Path(__file__).parent
 
+# `Abbreviate` object of a worker process (see `Abbreviate.iter_abbreviate_many()`)
+_worker_abbreviate: Optional['Abbreviate'] = None
+
+
+# inflections added to each key of the LTWA to get the words of the word table, see `Abbreviate.build_word_table()`
+WORD_TABLE_INFLECTIONS = ('', 's', 'es', 'e', 'en')
+
+# entry of the word table for a word: the patterns that match its beginning (in the order of
+# `Abbreviate._search_matches()`), and the ones that match its end (used if none of the former is in `langs`)
+WordEntry = Tuple[Tuple[Pattern, ...], Tuple[Pattern, ...]]
+
+# the inflections used to build a word table, and its entries
+WordTable = Tuple[Tuple[str, ...], Dict[str, WordEntry]]
+
+# the indexes for which key filters were built, and the filters of their keys, see `Abbreviate.use_key_filters()`
+KeyFilters = Tuple[Tuple[SearchIndex, SearchIndex], KeyFilter, KeyFilter]
+
+# the prefix index for which regexes are compiled, and the cache of these regexes, see `Abbreviate.use_regexes()`
+Regexes = Tuple[SearchIndex, LRUCache]
+
+# what follows the key of a pattern without dash in a match (see `Pattern.match()`): an inflection, then the end of
+# the sentence or a boundary (no inflection character is a boundary, so backtracking never changes the result)
+_KEY_END = r'(?:{})?(?:\Z|{})'.format(Pattern.INFLECTION.pattern.replace('(', '(?:', 1), BOUNDARY.pattern)
+
+
+def key_heads(keys: Iterable[str]) -> FrozenSet[str]:
+    """Get the first word of the keys that contain a boundary (e.g., ``united`` for ``united kingdom``)"""
+
+    heads = set()
+    for key in keys:
+        boundary = BOUNDARY.search(key)
+        if boundary is not None:
+            heads.add(key[:boundary.start()])
+
+    return frozenset(heads)
+
+
+def _init_worker(abbreviate: 'Abbreviate') -> None:
+    global _worker_abbreviate
+    _worker_abbreviate = abbreviate
+
+
+class AbbreviationError(Exception):
+    """Raised by ``Abbreviate.iter_abbreviate_many()`` when a title cannot be abbreviated"""
+
+    def __init__(self, title: str, error: str):
+        super().__init__(title, error)
+        self.title = title
+        self.error = error
+
+    def __str__(self) -> str:
+        return 'cannot abbreviate {!r}: {}'.format(self.title, self.error)
+
+
+def _abbreviate_or_error(abbreviate: 'Abbreviate',
+                         title: str,
+                         remove_part: bool,
+                         langs: Optional[List[str]]) -> Union[str, AbbreviationError]:
+    try:
+        return abbreviate(title, remove_part, langs)
+    except Exception as e:
+        # (returned rather than raised, so that workers go on with the rest of their chunk)
+        error = AbbreviationError(title, repr(e))
+        error.__cause__ = e
+        return error
+
+
+def _abbreviate_chunk(titles: List[str],
+                      remove_part: bool,
+                      langs: Optional[List[str]]) -> List[Union[str, AbbreviationError]]:
+    assert _worker_abbreviate is not None
+    return [_abbreviate_or_error(_worker_abbreviate, title, remove_part, langs) for title in titles]
+
+
+def read_ltwa(ltwa_file: Union[str, pathlib.Path]) -> Iterator[Pattern]:
+    """Read the patterns of a LTWA CSV file (the first line is a header)"""
+
+    with open(ltwa_file) as f:
+        first_line = True
+        for line in f.readlines():
+            if first_line:
+                first_line = False
+                continue
+            if line == '\n':
+                continue
+
+            yield Pattern.from_line(line)
+
+
+def diff_ltwa(old_file: Union[str, pathlib.Path],
+              new_file: Union[str, pathlib.Path],
+              langs: Optional[List[str]] = None) -> Tuple[List[Pattern], List[Pattern]]:
+    """Get the patterns that were added to and removed from the LTWA CSV file ``old_file`` to get ``new_file``
+    (a modified pattern is removed, then added again).
+    If ``langs`` is given, only the patterns in one of these languages (or ``mul``) are considered.
+    """
+
+    def patterns(path: Union[str, pathlib.Path]) -> 'Counter[Pattern]':
+        return Counter(p for p in read_ltwa(path) if langs is None or p.match_languages(langs))
+
+    old, new = patterns(old_file), patterns(new_file)
+    return list((new - old).elements()), list((old - new).elements())
+
+
+def abbreviation_key(abbreviation: str) -> str:
+    """Normalize an abbreviation (see ``Pattern.normalize()``), without the final period,
+    so that ``Polym.``, ``polym`` and ``POLYM.`` give the same key
+    """
+
+    return Pattern.normalize(abbreviation.strip()).rstrip('.')
+
+
+def read_stopwords(stopwords: Optional[Union[str, pathlib.Path]]) -> List[str]:
+    """Read a newline-separated list of stopwords"""
+
+    stopwds = []
+    if stopwords is not None:
+        with open(stopwords) as f:
+            stopwds = [w.strip() for w in f.readlines()]
+
+    return stopwds
+
 
 class Abbreviate:
-    def __init__(self, ltwa_prefix: PrefixTree, ltwa_suffix: PrefixTree, stopwords: List[str]):
-        self.ltwa_prefix = ltwa_prefix
-        self.ltwa_suffix = ltwa_suffix
+    """Abbreviate titles using the LTWA.
+
+    Once created, an object is never modified by abbreviating titles: everything that depends on a given title
+    (lexer, tokens, etc.) is local to the call.
+    Thus, a single object can be used concurrently by multiple threads (the caches, if any, are protected by a lock)
+    or from ``asyncio`` (see ``abbreviate_many_async()``).
+    The patterns can be changed with ``update()``, which replaces the indexes at once, so that the other threads
+    either use the previous indexes or the new ones.
+    """
+
+    def __init__(self,
+                 ltwa_prefix: SearchIndex,
+                 ltwa_suffix: SearchIndex,
+                 stopwords: List[str],
+                 word_table: Optional[WordTable] = None,
+                 key_filters: bool = False):
+        # both indexes are replaced together, see `update()`
+        self._indexes: Tuple[SearchIndex, SearchIndex] = (ltwa_prefix, ltwa_suffix)
+        self._word_table = word_table  # see `build_word_table()`
+        self._filters = self._build_filters(self._indexes) if key_filters else None  # see `use_key_filters()`
+        self._regexes: Optional[Regexes] = None  # see `use_regexes()`
+        self._generation = 0  # incremented by each update, and part of the keys of the caches
 
         self.stopwords = stopwords
+        self._stopwords = frozenset(stopwords)  # (for the lexer)
+
+        # caches are disabled by default, see `set_cache()`
+        self.title_cache = LRUCache(0)
+        self.word_cache = LRUCache(0)
+        self._heads: Optional[Tuple[int, FrozenSet[str]]] = None  # (generation, heads)
+        self._reverse: Optional[Tuple[int, Dict[str, List[Pattern]]]] = None  # (generation, index), see `expand()`
+
+        # instrumentation is disabled if there is no observer, see `add_observer()`
+        self._observers: Tuple[Observer, ...] = ()
+
+        # matching engine, see `use_automaton()`
+        self.automaton: Optional[Automaton] = None
+
+    @property
+    def ltwa_prefix(self) -> SearchIndex:
+        return self._indexes[0]
+
+    @property
+    def ltwa_suffix(self) -> SearchIndex:
+        return self._indexes[1]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # observers stay in this process (they are not saved, nor sent to workers)
+        state = self.__dict__.copy()
+        state['_observers'] = ()
+        state['_reverse'] = None  # (rebuilt when needed)
+        return state
+
+    def add_observer(self, observer: Observer) -> None:
+        """Call ``observer`` with the ``CallStats`` (timings and counters) of each subsequent call.
+        See, e.g., ``pyiso4.instrument.StatsAggregator``.
+        Observers are not pickled, so they do not see the titles abbreviated by worker processes.
+        """
+
+        self._observers = self._observers + (observer, )
+
+    def remove_observer(self, observer: Observer) -> None:
+        self._observers = tuple(o for o in self._observers if o != observer)
+
+    def use_automaton(self, enabled: bool = True) -> None:
+        """Find the patterns by scanning each (normalized) title once with an automaton containing all the keys
+        (which is built now), instead of searching the indexes for each word. The results are the same, but
+        the time no longer grows with the square of the length of the title.
+        Building the automaton takes about a second, so this is worth it for large batches of titles.
+        The word cache is not used by the automaton.
+        """
+
+        if not enabled:
+            self.automaton = None
+        elif self.automaton is None:
+            self.automaton = self._build_automaton(self._indexes)
+
+    @staticmethod
+    def _build_automaton(indexes: Tuple[SearchIndex, SearchIndex]) -> Automaton:
+        with compiled.no_gc():
+            return Automaton(
+                (pattern.to_key(), pattern) for _, pattern in itertools.chain(indexes[0].items(), indexes[1].items()))
+
+    def use_key_filters(self, enabled: bool = True) -> None:
+        """Before searching a word in an index, check that one of its keys may start it (see ``KeyFilter``), so that
+        the words that are not in the LTWA (names, places, acronyms, etc.) are rejected without walking the indexes.
+        The filters take about 0.15 second to build (again after each ``update()``), and 4 MiB, which is more than
+        what they save on most batches (the indexes already stop at the first character that no key has), so they
+        are only built when enabled; then, they are saved in compiled indexes.
+        Lazy and memory-mapped objects should not use them, since building them loads all the patterns.
+        The results are the same with or without them.
+        """
+
+        if not enabled:
+            self._filters = None
+        elif self._filters is None:
+            self._filters = self._build_filters(self._indexes)
+
+    @staticmethod
+    def _build_filters(indexes: Tuple[SearchIndex, SearchIndex]) -> KeyFilters:
+        return indexes, KeyFilter(indexes[0].keys()), KeyFilter(indexes[1].keys())
+
+    def _key_filters(self, indexes: Tuple[SearchIndex, SearchIndex]) -> Tuple[Optional[KeyFilter], Optional[KeyFilter]]:
+        """Get the filters of ``indexes``, if any (during an update, they may be the ones of other indexes)"""
+
+        filters = self._filters
+        if filters is None or filters[0] is not indexes:
+            return None, None
+
+        return filters[1], filters[2]
+
+    def use_regexes(self, enabled: bool = True, cache_size: int = 16384) -> None:
+        """Match the candidates of a word with a single regex, instead of calling ``Pattern.match()`` for each of them.
+        The regex of a word has one alternative per candidate (the patterns of the nodes of its path in the prefix
+        index, see ``Trie.path()``), best first, so that the first alternative that matches gives the best pattern.
+        Regexes are compiled when first needed (about 0.5 ms and 1.5 KiB each), and the last ``cache_size`` of them
+        are kept until the indexes change. Matching is then about a quarter faster, so this is only worth it for large
+        batches of titles sharing most of their words.
+        It only works with a ``Trie`` as prefix index (i.e., not with lazy or memory-mapped objects, until updated).
+        The results are the same with or without regexes.
+        """
+
+        if not enabled:
+            self._regexes = None
+        elif self._regexes is None or self._regexes[1].maxsize != cache_size:
+            self._regexes = (self._indexes[0], LRUCache(cache_size))
+
+    def set_cache(self, title_cache_size: int = 4096, word_cache_size: int = 16384) -> None:
+        """Cache the result of the last ``title_cache_size`` titles (for a given ``remove_part`` and ``langs``)
+        and the patterns matching the last ``word_cache_size`` words (for a given ``langs``).
+        Use 0 to disable a cache.
+        """
+
+        self.title_cache = LRUCache(title_cache_size)
+        self.word_cache = LRUCache(word_cache_size)
+
+    def clear_cache(self) -> None:
+        self.title_cache.clear()
+        self.word_cache.clear()
+
+    def cache_stats(self) -> Dict[str, CacheStats]:
+        """Get the hits, misses and evictions of the caches"""
+
+        stats = {'title': self.title_cache.stats(), 'word': self.word_cache.stats()}
+        if self._regexes is not None:
+            stats['regex'] = self._regexes[1].stats()
+
+        return stats
+
+    def _window(self, sentence: str) -> str:
+        """Get the beginning of ``sentence`` on which the result of ``_best_pattern()`` depends.
+        This is the first word (and the boundary that follows), unless a pattern containing a boundary
+        (e.g., ``united kingdom``) starts with that word.
+        """
+
+        boundary = BOUNDARY.search(sentence)
+        if boundary is None:
+            return sentence
+
+        if sentence[:boundary.start()] in self._heads_of(sentence[:boundary.start()]):
+            return sentence
+
+        return sentence[:boundary.start() + 1]
+
+    def _heads_of(self, word: str) -> FrozenSet[str]:
+        """Get the first word of the keys that contain a boundary (e.g., ``united`` for ``united kingdom``), at least
+        for the keys that start like ``word``. Other indexes than ``Trie`` give them without loading all the patterns
+        (see ``LazyIndex.heads()`` and ``MappedIndex.heads()``).
+        """
+
+        ltwa_prefix = self.ltwa_prefix
+        if not isinstance(ltwa_prefix, Trie):
+            heads = getattr(ltwa_prefix, 'heads', None)
+            if heads is not None:
+                return heads(word)  # type: ignore
+
+        generation = self._generation
+        if self._heads is None or self._heads[0] != generation:
+            self._heads = (generation, key_heads(ltwa_prefix.keys()))
+
+        return self._heads[1]
+
+    def build_word_table(self, inflections: Iterable[str] = WORD_TABLE_INFLECTIONS, words: Iterable[str] = ()) -> int:
+        """Precompute the patterns of each word made of a key of the LTWA followed by one of ``inflections``
+        (which should be allowed by ``Pattern.INFLECTION``), and of ``words`` (e.g., the words of a sample of titles),
+        so that finding the patterns of these words takes a single lookup in a table, whatever ``langs``.
+        Other words are still searched in the indexes. So are the words that start a key containing a boundary
+        (e.g., ``united`` for ``united kingdom``), since their patterns depend on what follows them.
+
+        The table is saved in compiled indexes (see ``save()``), and kept up to date by ``update()``.
+        With the default inflections, it takes about 10 seconds to build, and 30 MiB.
+        Return the number of words in the table.
+        """
+
+        inflections = tuple(inflections)
+        indexes = self._indexes
+        keys = dict.fromkeys(key for key in indexes[0].keys() if BOUNDARY.search(key) is None)
+
+        table = self._fill_word_table(
+            {},
+            indexes,
+            itertools.chain(
+                (key + inflection for key in keys for inflection in inflections),
+                (Pattern.normalize(word) for word in words)))
+
+        self._word_table = (inflections, table)
+        return len(table)
+
+    def drop_word_table(self) -> None:
+        """Remove the word table (see ``build_word_table()``)"""
+
+        self._word_table = None
+
+    @staticmethod
+    def _fill_word_table(table: Dict[str, WordEntry],
+                         indexes: Tuple[SearchIndex, SearchIndex],
+                         words: Iterable[str]) -> Dict[str, WordEntry]:
+        """Put the entry of each word of ``words`` in ``table``"""
+
+        heads = key_heads(indexes[0].keys())
+        entries: Dict[WordEntry, WordEntry] = {}  # (identical entries are shared)
+
+        for word in words:
+            if word != '' and word not in heads and BOUNDARY.search(word) is None:
+                entry = Abbreviate._word_entry(indexes, word)
+                table[word] = entries.setdefault(entry, entry)
+
+        return table
+
+    @staticmethod
+    def _word_entry(indexes: Tuple[SearchIndex, SearchIndex], word: str) -> WordEntry:
+        ltwa_prefix, ltwa_suffix = indexes
+        prefix = sorted(
+            (p for p in ltwa_prefix.search(word) if p.match(word)),
+            key=lambda p: (100 if p.end_with_dash else 0) + len(p.pattern),
+            reverse=True)
+
+        return tuple(prefix), tuple(Abbreviate._search_suffixes(ltwa_suffix, word))
+
+    @staticmethod
+    def _best_from_word_entry(entry: WordEntry, langs: Optional[List[str]] = None) -> Optional[Pattern]:
+        """Get the pattern that ``_search_matches()`` puts first for the word of ``entry`` (if any)"""
+
+        prefix, suffix = entry
+        if langs is None:
+            patterns = prefix or suffix
+            return patterns[0] if patterns else None
+
+        mask = languages_mask(langs) | 1
+        for patterns in entry:
+            for pattern in patterns:
+                if pattern.langs_mask & mask:
+                    return pattern
+
+        return None
+
+    @staticmethod
+    def _updated_word_table(word_table: WordTable,
+                            indexes: Tuple[SearchIndex, SearchIndex],
+                            changed: List[Pattern]) -> WordTable:
+        """Get a copy of ``word_table`` for the new ``indexes``, where the entries of the words that may be matched
+        by the ``changed`` patterns are computed again (and the words of the new keys are added)
+        """
+
+        inflections, table = word_table
+        prefix_keys = tuple(p.to_key() for p in changed if not p.start_with_dash)
+        suffix_keys = [p.to_key() for p in changed if p.start_with_dash]
+
+        heads = key_heads(indexes[0].keys())
+        table = dict((word, entry) for word, entry in table.items() if word not in heads)
+
+        words = [word for word in table if word.startswith(prefix_keys) or any(k in word for k in suffix_keys)]
+        words.extend(
+            key + inflection for key in prefix_keys if BOUNDARY.search(key) is None for inflection in inflections)
+
+        return inflections, Abbreviate._fill_word_table(table, indexes, words)
+
+    def _reverse_index(self) -> Dict[str, List[Pattern]]:
+        generation = self._generation
+        reverse = self._reverse
+        if reverse is None or reverse[0] != generation:
+            index: Dict[str, List[Pattern]] = {}
+            for ltwa in self._indexes:
+                for _, pattern in ltwa.items():
+                    if pattern.replacement != '-':
+                        index.setdefault(abbreviation_key(pattern.replacement), []).append(pattern)
+
+            reverse = self._reverse = (generation, index)
+
+        return reverse[1]
+
+    def abbreviate_word(self, word: str, langs: Optional[List[str]] = None) -> str:
+        """Get the abbreviation of a single ``word``, as given by the LTWA (thus, without matching its
+        capitalization), or ``word`` itself if it is not abbreviated. Contrary to ``abbreviate_title()``,
+        single words are abbreviated.
+        """
+
+        pattern = self._best_pattern(Pattern.normalize(word), langs)
+        if pattern is not None and pattern.replacement != '-':
+            if pattern.start_with_dash:
+                kept = self._suffix_start(pattern, word)
+                return word[:kept] + pattern.replacement.lstrip('-') if kept >= 0 else word
+
+            return pattern.replacement
+
+        return word
+
+    def expand(self, abbreviation: str, langs: Optional[List[str]] = None) -> List[Pattern]:
+        """Get the patterns that are abbreviated into ``abbreviation`` (e.g., ``Polym.``), i.e., the words that it may
+        stand for. Case, diacritics and the final period are ignored (see ``abbreviation_key()``).
+        If ``langs`` is given, only the patterns in one of these languages (or ``mul``) are returned.
+
+        The reverse index is built the first time (and after each ``update()``), which loads all the patterns.
+        """
+
+        patterns = self._reverse_index().get(abbreviation_key(abbreviation), [])
+        if langs is not None:
+            patterns = [pattern for pattern in patterns if pattern.match_languages(langs)]
+
+        return list(patterns)
 
     @classmethod
     def create(cls,
                ltwa_file: Union[str, pathlib.Path] = _here / 'LTWA_20210702.csv',
                stopwords: Union[str, pathlib.Path] = _here / 'stopwords.txt',
+               cache_file: Optional[Union[str, pathlib.Path]] = None,
+               langs: Optional[List[str]] = None,
+               lazy: bool = False
                ) -> 'Abbreviate':
-        """Create an object from the LTWA CSV file and a newline-separated list of stopwords"""
+        """Create an object from the LTWA CSV file and a newline-separated list of stopwords.
+        If ``langs`` is given, only the patterns in one of these languages (or ``mul``) are kept.
 
-        ltwa_prefix = PrefixTree()
-        ltwa_suffix = PrefixTree()
+        If ``cache_file`` is given, the object is loaded from this compiled index if it was compiled
+        from the same files (and languages). Otherwise (or if it cannot be read), the index is (re)compiled into
+        ``cache_file``, which is replaced at once, so that concurrent processes never read a partial file.
 
-        # get LTWA
-        with open(ltwa_file) as f:
-            first_line = True
-            for line in f.readlines():
-                if first_line:
-                    first_line = False
-                    continue
-                if line == '\n':
-                    continue
-                pattern = Pattern.from_line(line)
-                key = pattern.to_key()
-                if pattern.start_with_dash:
-                    ltwa_suffix.insert(key[::-1], pattern)
-                else:
-                    ltwa_prefix.insert(key, pattern)
+        If ``lazy``, patterns are only parsed when a title needs them (see ``pyiso4.lazy``), which is faster
+        when only a few titles are abbreviated. It cannot be used with ``cache_file``.
+        """
+
+        if lazy:
+            if cache_file is not None:
+                raise ValueError('a lazy object cannot be loaded from (or saved to) a compiled index')
+
+            from pyiso4.lazy import LazyIndex, read_shards  # avoid circular import
+
+            prefix_shards, suffix_shards = read_shards(ltwa_file)
+            return cls(
+                LazyIndex(prefix_shards, langs=langs),
+                LazyIndex(suffix_shards, suffix=True, langs=langs),
+                read_stopwords(stopwords))
+
+        if cache_file is not None:
+            sources = cls._sources(ltwa_file, stopwords, langs)
+            if compiled.is_up_to_date(cache_file, sources):
+                try:
+                    return cls.load(cache_file)
+                except compiled.READ_ERRORS:
+                    pass  # (rebuilt below)
+
+            obj = cls.create(ltwa_file, stopwords, langs=langs)
+            obj.save(cache_file, sources)
+            return obj
+
+        ltwa_prefix = Trie()
+        ltwa_suffix = Trie()
+
+        for pattern in read_ltwa(ltwa_file):
+            if langs is not None and not pattern.match_languages(langs):
+                continue
+
+            key = pattern.to_key()
+            if pattern.start_with_dash:
+                ltwa_suffix.insert(key[::-1], pattern)
+            else:
+                ltwa_prefix.insert(key, pattern)
+
+        return cls(ltwa_prefix, ltwa_suffix, read_stopwords(stopwords))
+
+    @staticmethod
+    def _sources(
+            ltwa_file: Union[str, pathlib.Path],
+            stopwords: Optional[Union[str, pathlib.Path]],
+            langs: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        sources = {'ltwa': compiled.checksum(ltwa_file), 'stopwords': compiled.checksum(stopwords)}
+        if langs is not None:
+            sources['langs'] = ' '.join(sorted(langs))
+
+        return sources
+
+    @classmethod
+    def compile(cls,
+                output: Union[str, pathlib.Path],
+                ltwa_file: Union[str, pathlib.Path] = _here / 'LTWA_20210702.csv',
+                stopwords: Union[str, pathlib.Path] = _here / 'stopwords.txt',
+                langs: Optional[List[str]] = None,
+                word_table: bool = False
+                ) -> 'Abbreviate':
+        """Create an object from the LTWA CSV file and the list of stopwords (see ``create()``),
+        and save it as a compiled index in ``output``, with a word table if ``word_table``
+        (see ``build_word_table()``)
+        """
+
+        obj = cls.create(ltwa_file, stopwords, langs=langs)
+        if word_table:
+            obj.build_word_table()
+
+        obj.save(output, cls._sources(ltwa_file, stopwords, langs))
+        return obj
+
+    def save(self, path: Union[str, pathlib.Path], sources: Optional[Dict[str, Optional[str]]] = None) -> None:
+        """Save as a compiled index, which can be reloaded by ``load()``.
+        ``sources`` contains the checksums of the files that were used to create the object, if any.
+        """
+
+        indexes = self._indexes
+        prefix_filter, suffix_filter = self._key_filters(indexes)
+        # (the filters are faster to load than to build)
+        filters = (prefix_filter, suffix_filter) if prefix_filter is not None else None
+        compiled.write(path, (*indexes, self.stopwords, self._word_table, filters), sources or {})
+
+    @classmethod
+    def load(cls, path: Union[str, pathlib.Path]) -> 'Abbreviate':
+        """Load a compiled index (see ``compile()`` and ``save()``).
+        Since it is a pickle, only load files that you trust.
+        """
+
+        _, (ltwa_prefix, ltwa_suffix, stopwords, word_table, filters) = compiled.read(path)
+        obj = cls(ltwa_prefix, ltwa_suffix, stopwords, word_table)
+        if filters is not None:
+            obj._filters = (obj._indexes, *filters)
+
+        return obj
+
+    @classmethod
+    def load_mapped(cls, path: Union[str, pathlib.Path]) -> 'Abbreviate':
+        """Use a memory-mapped LTWA (see ``pyiso4.mmap_store``), which is shared by all the processes that
+        load the same file.
+        """
+
+        from pyiso4.mmap_store import MappedLTWA  # avoid circular import
+
+        ltwa = MappedLTWA(path)
+        return cls(ltwa.prefix, ltwa.suffix, ltwa.stopwords)
+
+    @staticmethod
+    def _as_trie(index: SearchIndex) -> Trie:
+        if isinstance(index, Trie):
+            return index
+
+        trie = Trie()
+        for key, pattern in index.items():
+            trie.insert(key, pattern)
+
+        return trie
+
+    def update(self, added: Iterable[Pattern] = (), removed: Iterable[Pattern] = ()) -> None:
+        """Remove the patterns of ``removed`` (``KeyError`` is raised if one of them is not found),
+        then add the ones of ``added``. To replace a pattern, remove the old one and add the new one in the same call.
+        For a given key, added patterns come after the existing ones.
 
-        # get stopwords
-        stopwds = []
-        if stopwords is not None:
-            with open(stopwords) as f:
-                stopwds = [w.strip() for w in f.readlines()]
+        The indexes are not modified: they are replaced at once by updated copies (which share most of their nodes
+        with them), then the caches are cleared. Thus, any concurrent call uses either the previous patterns or the
+        new ones, never a mix of both for a given word. Updates themselves must not be concurrent.
+        Other indexes than ``Trie`` (e.g., memory-mapped ones) are converted first.
+        """
+
+        added, removed = list(added), list(removed)
+
+        inserted: Tuple[List[Tuple[str, Pattern]], ...] = ([], [])
+        for pattern in added:
+            key = pattern.to_key()
+            if pattern.start_with_dash:
+                inserted[1].append((key[::-1], pattern))
+            else:
+                inserted[0].append((key, pattern))
+
+        deleted: Tuple[List[Tuple[str, Pattern]], ...] = ([], [])
+        for pattern in removed:
+            key = pattern.to_key()
+            if pattern.start_with_dash:
+                deleted[1].append((key[::-1], pattern))
+            else:
+                deleted[0].append((key, pattern))
+
+        ltwa_prefix, ltwa_suffix = self._indexes
+        indexes: Tuple[SearchIndex, SearchIndex] = (
+            self._as_trie(ltwa_prefix).updated(inserted[0], deleted[0]),
+            self._as_trie(ltwa_suffix).updated(inserted[1], deleted[1]))
+
+        automaton = self._build_automaton(indexes) if self.automaton is not None else None
+        filters = self._build_filters(indexes) if self._filters is not None else None
+        regexes = self._regexes
+        if regexes is not None:
+            regexes = (indexes[0], LRUCache(regexes[1].maxsize))
+
+        word_table = self._word_table
+        if word_table is not None:
+            word_table = self._updated_word_table(word_table, indexes, added + removed)
+
+        # swap, and only then change the generation, so that results obtained with the previous patterns
+        # are never cached with the new generation
+        self._indexes = indexes
+        self._word_table = word_table
+        if filters is not None:
+            self._filters = filters
+        if regexes is not None:
+            self._regexes = regexes
+        if automaton is not None:
+            self.automaton = automaton
+        self._generation += 1
+        self.clear_cache()
+
+    def update_from_ltwa(self,
+                         old_file: Union[str, pathlib.Path],
+                         new_file: Union[str, pathlib.Path],
+                         langs: Optional[List[str]] = None) -> Tuple[List[Pattern], List[Pattern]]:
+        """Apply the changes between two versions of the LTWA CSV file (see ``diff_ltwa()`` and ``update()``),
+        and return the patterns that were added and removed
+        """
+
+        added, removed = diff_ltwa(old_file, new_file, langs)
+        self.update(added, removed)
+        return added, removed
+
+    def _best_pattern(self,
+                      sentence: str,
+                      langs: Optional[List[str]] = None,
+                      stats: Optional[CallStats] = None) -> Optional[Pattern]:
+        """Get the pattern to abbreviate the beginning of ``sentence`` with (the first one of ``_search_matches()``),
+        from the word table, the word cache, or the indexes (see ``_search_best()``)
+        """
+
+        # most words are in the word table (if any)
+        word_table = self._word_table
+        if word_table is not None:
+            entry = word_table[1].get(self._word(sentence))
+            if entry is not None:
+                if stats is not None:
+                    stats.word_table_hits += 1
+
+                return self._best_from_word_entry(entry, langs)
 
-        return cls(ltwa_prefix, ltwa_suffix, stopwds)
+        if self.word_cache.maxsize > 0:
+            generation = self._generation  # (read before the indexes, so that results are never newer)
+            sentence = self._window(sentence)
+            key = (generation, sentence, tuple(langs) if langs is not None else None)
+            best = self.word_cache.get(key)
+            if best is MISSING:
+                best = self._search_best(sentence, langs, stats)
+                self.word_cache.put(key, best)
+            elif stats is not None:
+                stats.word_cache_hits += 1
 
-    def _potential_matches(self,
-                           sentence: str,
-                           langs: Optional[List[str]] = None) -> List[Pattern]:
-        # look into prefix
-        results = self.ltwa_prefix.search(sentence)
+            return best  # type: ignore
 
-        # look into suffixes
-        results += self.ltwa_suffix.search(str(reversed(sentence)))
+        return self._search_best(sentence, langs, stats)
+
+    def _search_best(self,
+                     sentence: str,
+                     langs: Optional[List[str]] = None,
+                     stats: Optional[CallStats] = None) -> Optional[Pattern]:
+        """Same as the first pattern of ``_search_matches()`` (if any), without matching all the candidates
+        (see ``_match_candidates()`` and ``_match_regex()``)
+        """
+
+        indexes = self._indexes
+        ltwa_prefix, ltwa_suffix = indexes
+        prefix_filter, suffix_filter = self._key_filters(indexes)
+
+        best = None
+        if prefix_filter is not None and not prefix_filter.may_match(sentence):
+            if stats is not None:
+                stats.filter_checks += 1
+                stats.filtered += 1
+        else:
+            if stats is not None and prefix_filter is not None:
+                stats.filter_checks += 1
+
+            regexes = self._regexes
+            if regexes is not None and regexes[0] is ltwa_prefix and isinstance(ltwa_prefix, Trie):
+                best = self._match_regex(ltwa_prefix, regexes[1], sentence, langs, stats)
+            else:
+                best = self._match_candidates(ltwa_prefix, sentence, langs, stats)
+
+        # if no pattern starts with the word, look for the ones that end it
+        if best is None:
+            suffixes = self._search_suffixes(ltwa_suffix, self._word(sentence), langs, stats, suffix_filter)
+            if suffixes:
+                best = suffixes[0]
+
+        return best
+
+    @staticmethod
+    def _match_candidates(ltwa_prefix: SearchIndex,
+                          sentence: str,
+                          langs: Optional[List[str]] = None,
+                          stats: Optional[CallStats] = None) -> Optional[Pattern]:
+        """Get the best pattern of ``ltwa_prefix`` that matches the beginning of ``sentence``.
+
+        Candidates come longest key first (see ``Trie.search_longest_first()``), and any pattern that ends with a dash
+        comes before the ones that do not: thus, the first of the former that matches is the best one, and only
+        the first of the latter that matches is kept, in case none of the former does.
+        """
+
+        if stats is not None:
+            start = time.perf_counter()
+
+        candidates = ltwa_prefix.search_longest_first(sentence, langs)
+
+        if stats is not None:
+            searched = time.perf_counter()
+            stats.timings['search'] += searched - start
+
+        best = None
+        first = None  # first pattern without an ending dash that matches
+        for pattern in candidates:
+            if stats is not None:
+                stats.candidates += 1
+
+            if pattern.end_with_dash:
+                if pattern.match(sentence):
+                    best = pattern
+                    break
+            elif first is None and pattern.match(sentence):
+                first = pattern
+        else:
+            best = first
+
+        if stats is not None:
+            stats.timings['match'] += time.perf_counter() - searched
+            stats.accepted += (first is not None) + (best is not None and best is not first)
+
+        return best
+
+    @staticmethod
+    def _match_regex(ltwa_prefix: Trie,
+                     regexes: LRUCache,
+                     sentence: str,
+                     langs: Optional[List[str]] = None,
+                     stats: Optional[CallStats] = None) -> Optional[Pattern]:
+        """Same as ``_match_candidates()``, with a single regex for all the candidates (see ``use_regexes()``).
+        The candidates only depend on the last node of the path of ``sentence`` (and on ``langs``), so that is
+        the key of its regex in ``regexes``.
+        """
+
+        if stats is not None:
+            start = time.perf_counter()
+
+        nodes = ltwa_prefix.path(sentence, langs)
+        if not nodes:
+            if stats is not None:
+                stats.timings['search'] += time.perf_counter() - start
+            return None
+
+        key = (nodes[-1], tuple(langs) if langs is not None else None)
+        compiled_regex = regexes.get(key)
+        if compiled_regex is MISSING:
+            compiled_regex = Abbreviate._compile_regex(ltwa_prefix.search_longest_first(sentence, langs))
+            regexes.put(key, compiled_regex)
+
+        regex, patterns = compiled_regex
+        if stats is not None:
+            searched = time.perf_counter()
+            stats.timings['search'] += searched - start
+            stats.candidates += len(patterns)
+
+        match = regex.match(sentence)
+
+        if stats is not None:
+            stats.timings['match'] += time.perf_counter() - searched
+            stats.accepted += match is not None
+
+        return patterns[match.lastindex - 1] if match is not None and match.lastindex is not None else None
+
+    @staticmethod
+    def _compile_regex(candidates: Iterable[Pattern]) -> Tuple[Regex[str], Tuple[Pattern, ...]]:
+        """Compile the regex that matches the beginning of a sentence if one of ``candidates`` (for which the key is
+        a prefix of this sentence) matches it, and get the candidates in the order of the groups of the regex.
+
+        Groups come in the order of ``_search_matches()``, so that the first one that matches (and thus
+        ``lastindex``, since groups are not nested) is the best pattern. The patterns that end with a dash come
+        first, and the ones that do not share the end of their alternatives (see ``_KEY_END``).
+        """
+
+        patterns = tuple(sorted(
+            candidates, key=lambda p: (100 if p.end_with_dash else 0) + len(p.pattern), reverse=True))
+
+        with_dash = ['({})'.format(re.escape(p.to_key())) for p in patterns if p.end_with_dash]
+        without_dash = ['({})'.format(re.escape(p.to_key())) for p in patterns if not p.end_with_dash]
+        if without_dash:
+            with_dash.append('(?:{}){}'.format('|'.join(without_dash), _KEY_END))
+
+        return re.compile('|'.join(with_dash)), patterns
+
+    def _search_matches(self,
+                        sentence: str,
+                        langs: Optional[List[str]] = None,
+                        stats: Optional[CallStats] = None) -> List[Pattern]:
+        if stats is not None:
+            start = time.perf_counter()
+
+        indexes = self._indexes
+        ltwa_prefix, ltwa_suffix = indexes
+        prefix_filter, suffix_filter = self._key_filters(indexes)
+
+        # look into prefix (languages are filtered by the index), unless no key starts the sentence
+        if prefix_filter is not None and not prefix_filter.may_match(sentence):
+            results = []
+            if stats is not None:
+                stats.filter_checks += 1
+                stats.filtered += 1
+        else:
+            results = ltwa_prefix.search(sentence, langs)
+            if stats is not None and prefix_filter is not None:
+                stats.filter_checks += 1
+
+        if stats is not None:
+            searched = time.perf_counter()
+            stats.timings['search'] += searched - start
+            stats.candidates += len(results)
 
         # remove everything that does not match
-        results = list(filter(lambda p: p.match(sentence, langs), results))
+        results = list(filter(lambda p: p.match(sentence), results))
+
+        if stats is not None:
+            stats.timings['match'] += time.perf_counter() - searched
+            stats.accepted += len(results)
+
+        # if no pattern starts with the word, look for the ones that end it
+        if not results:
+            return self._search_suffixes(ltwa_suffix, self._word(sentence), langs, stats, suffix_filter)
 
         # return longer matches first, with ending dashes if possible
         return sorted(
@@ -173,15 +1042,124 @@ class Abbreviate:
             reverse=True)
 
     @staticmethod
-    def match_capitalization_and_diacritic(abbrv: str, original: str) -> str:
-        """Matches the capitalization and diacritics of the `original` word, as long as they are similar
+    def _word(sentence: str, position: int = 0) -> str:
+        """Get the word that starts at ``position`` in ``sentence``"""
+
+        boundary = BOUNDARY.search(sentence, position)
+        return sentence[position:boundary.start() if boundary is not None else None]
+
+    @staticmethod
+    def _search_suffixes(ltwa_suffix: SearchIndex,
+                         word: str,
+                         langs: Optional[List[str]] = None,
+                         stats: Optional[CallStats] = None,
+                         key_filter: Optional[KeyFilter] = None) -> List[Pattern]:
+        """Get the patterns starting with a dash that match the end of ``word`` (see ``Pattern.match_suffix()``),
+        longer first. The keys of ``ltwa_suffix`` are reversed, so searching the reversed word gives the patterns
+        that end it in a single walk (and one more walk without each of the last 3 characters that may be an
+        inflection). The walks that ``key_filter`` (of the keys of ``ltwa_suffix``) rejects are skipped.
+        """
+
+        if stats is not None:
+            start = time.perf_counter()
+
+        reversed_word = word[::-1]
+        results: List[Pattern] = []
+        for i in range(min(3, len(word) - 1) + 1):
+            if i > 0 and reversed_word[i - 1] not in Pattern.INFLECTION_CHARS:
+                break
+
+            if key_filter is not None:
+                if stats is not None:
+                    stats.filter_checks += 1
+                if not key_filter.may_match(reversed_word, i):
+                    if stats is not None:
+                        stats.filtered += 1
+                    continue
+
+            results += ltwa_suffix.search(reversed_word[i:], langs)
+
+        if stats is not None:
+            searched = time.perf_counter()
+            stats.timings['search'] += searched - start
+            stats.candidates += len(results)
+
+        if not results:  # (most words)
+            return results
+
+        results = [p for p in dict.fromkeys(results) if p.match_suffix(word) >= 0]
+
+        if stats is not None:
+            stats.timings['match'] += time.perf_counter() - searched
+            stats.accepted += len(results)
+
+        return sorted(results, key=lambda p: len(p.pattern), reverse=True)
+
+    @staticmethod
+    def _scan(automaton: Automaton,
+              title_normalized: str,
+              stats: Optional[CallStats] = None) -> Dict[int, List[Pattern]]:
+        """Find all the patterns for which the key is a prefix of ``title_normalized[position:]``,
+        for any position, with ``automaton`` (see ``use_automaton()``).
+        """
+
+        if stats is not None:
+            start = time.perf_counter()
+
+        matches: Dict[int, List[Pattern]] = {}
+        for position, _, patterns in automaton.scan(title_normalized):
+            for pattern in patterns:
+                if not pattern.start_with_dash:
+                    matches.setdefault(position, []).append(pattern)
+
+        if stats is not None:
+            stats.timings['search'] += time.perf_counter() - start
+
+        return matches
+
+    @staticmethod
+    def _best_match(candidates: List[Pattern],
+                    title_normalized: str,
+                    position: int,
+                    langs: Optional[List[str]] = None,
+                    stats: Optional[CallStats] = None) -> Optional[Pattern]:
+        """Get the pattern that ``_search_matches()`` would put first, among the ``candidates`` found at
+        ``position`` by ``_scan()``
+        """
+
+        if stats is not None:
+            start = time.perf_counter()
+            stats.candidates += len(candidates)
+
+        best = None
+        best_score = -1
+        for pattern in candidates:
+            if pattern.match(title_normalized, langs, position):
+                if stats is not None:
+                    stats.accepted += 1
+
+                # longer matches first, with ending dashes if possible (and the first one if equal)
+                score = (100 if pattern.end_with_dash else 0) + len(pattern.pattern)
+                if score > best_score:
+                    best, best_score = pattern, score
+
+        if stats is not None:
+            stats.timings['match'] += time.perf_counter() - start
+
+        return best
+
+    @staticmethod
+    def match_capitalization_and_diacritic(abbrv: str, original: str, position: int = 0) -> str:
+        """Matches the capitalization and diacritics of the `original` word (which starts at ``position``),
+        as long as they are similar. The characters of the abbreviation that go past the end of ``original``
+        (e.g., the period of ``stress.`` at the end of a title) are kept as they are.
         """
 
         normalized_abbrv = list(normalize(abbrv, Level.SOFT))
-        for i, c in enumerate(normalized_abbrv):
-            unided = unidecode(original[i])
-            if unidecode(c) in [unided.lower(), unided.upper()]:
-                normalized_abbrv[i] = original[i]
+        for i, c in enumerate(normalized_abbrv[:len(original) - position]):
+            unided = transliterate_char(original[position + i])
+            if transliterate_char(c) in [unided.lower(), unided.upper()]:
+                normalized_abbrv[i] = original[position + i]
 
         return ''.join(normalized_abbrv)
 
@@ -189,26 +1167,121 @@ class Abbreviate:
                    sentence: str,
                    fallback: str,
                    guide: str,
-                   langs: Optional[List[str]] = None) -> Tuple[str, int]:
+                   langs: Optional[List[str]] = None,
+                   stats: Optional[CallStats] = None) -> Tuple[str, int]:
         """Abbreviate the beginning of ``sentence`` by looking for an appropriate pattern.
         If not found, use ``fallback``. If found, matches the capitalization given by ``guide``.
         Also returns the length of the sentence that was replaced.
         """
 
-        patterns = self._potential_matches(sentence, langs)
-        if len(patterns) > 0:
-            pattern = patterns[0]
+        pattern = self._best_pattern(sentence, langs, stats)
+        if stats is not None:
+            stats.lookups += 1
+
+        return Abbreviate._replace(pattern, fallback, guide, 0, stats)
+
+    @staticmethod
+    def _replace(pattern: Optional[Pattern],
+                 fallback: str,
+                 guide: str,
+                 position: int = 0,
+                 stats: Optional[CallStats] = None) -> Tuple[str, int]:
+        """Get the abbreviation given by ``pattern`` (if any), capitalized as ``guide[position:]``,
+        and the length of the sentence that it replaces (see ``abbreviate()``)
+        """
+
+        if pattern is not None:
+            if stats is not None:
+                stats.patterns.append(pattern)
+
             if pattern.replacement != '-':
-                return Abbreviate.match_capitalization_and_diacritic(pattern.replacement, guide), len(pattern.pattern)
+                if stats is not None:
+                    start = time.perf_counter()
+
+                if pattern.start_with_dash:
+                    # the beginning of the word (``fallback``) is kept, and its end is replaced
+                    kept = Abbreviate._suffix_start(pattern, fallback)
+                    if kept < 0:
+                        return fallback, len(fallback)
+
+                    abbrv = fallback[:kept] + Abbreviate.match_capitalization_and_diacritic(
+                        pattern.replacement.lstrip('-'), guide, position + kept)
+                    length = len(fallback)
+                else:
+                    abbrv = Abbreviate.match_capitalization_and_diacritic(pattern.replacement, guide, position)
+                    length = len(pattern.pattern)
+
+                if stats is not None:
+                    stats.timings['capitalization'] += time.perf_counter() - start
+
+                return abbrv, length
             else:
                 return fallback, len(fallback)
 
         return fallback, len(fallback)
 
+    @staticmethod
+    def _suffix_start(pattern: Pattern, word: str) -> int:
+        """Get the position in ``word`` (not normalized) where ``pattern`` (which starts with a dash) matches,
+        or -1 if it does not
+        """
+
+        normalized_word = NormalizedString(word)
+        start = pattern.match_suffix(normalized_word.normal)
+        if start < 0:
+            return -1
+
+        return bisect.bisect_left(normalized_word.offsets, start)
+
     def __call__(self,
                  title: str,
                  remove_part: bool = True,
                  langs: Optional[List[str]] = None) -> str:
+        """Abbreviate a title (see ``abbreviate_title()``), or get it from the cache
+        """
+
+        if self._observers:
+            return self._observed_call(title, remove_part, langs)
+
+        if self.title_cache.maxsize > 0:
+            key = (self._generation, title, remove_part, tuple(langs) if langs is not None else None)
+            result = self.title_cache.get(key)
+            if result is MISSING:
+                result = self.abbreviate_title(title, remove_part, langs)
+                self.title_cache.put(key, result)
+
+            return result  # type: ignore
+
+        return self.abbreviate_title(title, remove_part, langs)
+
+    def _observed_call(self, title: str, remove_part: bool, langs: Optional[List[str]]) -> str:
+        """Same as ``__call__()``, but collect stats and send them to the observers"""
+
+        stats = CallStats(title, langs)
+        start = time.perf_counter()
+
+        if self.title_cache.maxsize > 0:
+            key = (self._generation, title, remove_part, tuple(langs) if langs is not None else None)
+            result = self.title_cache.get(key)
+            if result is MISSING:
+                result = self.abbreviate_title(title, remove_part, langs, stats)
+                self.title_cache.put(key, result)
+            else:
+                stats.title_cache_hit = True
+        else:
+            result = self.abbreviate_title(title, remove_part, langs, stats)
+
+        stats.total = time.perf_counter() - start
+        for observer in self._observers:
+            observer(stats)
+
+        return str(result)
+
+    def abbreviate_title(self,
+                         title: str,
+                         remove_part: bool = True,
+                         langs: Optional[List[str]] = None,
+                         stats: Optional[CallStats] = None) -> str:
         """Abbreviate a title according to the rules of Section 7 in the ISSN manual
         (https://www.issn.org/understanding-the-issn/assignment-rules/issn-manual/)
 
@@ -224,15 +1297,27 @@ class Abbreviate:
         result = ''
         is_first = True
 
-        title_soft_normalized = normalize(title, Level.SOFT)
-        title_normalized = Pattern.normalize(title)
+        if stats is not None:
+            start = time.perf_counter()
+
+        normalized_title = NormalizedString(title)
+        title_soft_normalized = normalized_title.soft
+        title_normalized = normalized_title.normal
+        offsets = normalized_title.offsets
+
+        if stats is not None:
+            normalized = time.perf_counter()
+            stats.timings['normalize'] += normalized - start
 
-        lexer = Lexer(title_soft_normalized, self.stopwords)
+        lexer = Lexer(title_soft_normalized, self._stopwords)
         tokens: List[Token] = []
         prev_article = None
 
         # filter tokens
         for token in lexer.tokenize():
+            if stats is not None:
+                stats.tokens += 1
+
             # Remove all articles, as per Section 7.1.7
             if token.type == TokenType.ARTICLE:
                 prev_article = token
@@ -243,7 +1328,9 @@ class Abbreviate:
 
             elif token.type == TokenType.SYMBOLS:
                 # Omit comma, replace point by comma, as per Section 7.1.6 (also remove ellipsis)
-                token.value = token.value.replace(',', '').replace('.', ',').replace(',,,', '')
+                # (a new token is created, so that tokens are never modified)
+                token = Token(
+                    token.type, token.value.replace(',', '').replace('.', ',').replace(',,,', ''), token.position)
 
                 # remove & and + when they are used as "and", as per Section 7.1.10
                 if token.value == '&':
@@ -265,6 +1352,9 @@ class Abbreviate:
 
             is_first = False
 
+        if stats is not None:
+            stats.timings['tokenize'] += time.perf_counter() - normalized
+
         # do not abbreviate title which consists of one word (as per Section 7.1.1)
         if len(tokens) == 1:
             result = tokens[0].value
@@ -279,7 +1369,12 @@ class Abbreviate:
             is_hyphenated = False
             no_space = False
             next_position = 0
-            ligatures_shift = 0
+
+            # with the automaton, the title is scanned once and for all
+            automaton = self.automaton
+            matches = self._scan(automaton, title_normalized, stats) if automaton is not None else None
+            indexes = self._indexes
+            _, suffix_filter = self._key_filters(indexes)
 
             for token in tokens:
                 abbrv = token.value
@@ -288,11 +1383,30 @@ class Abbreviate:
                     is_hyphenated = True
                 elif token.type in [TokenType.WORD, TokenType.PART]:
                     if token.position >= next_position:
-                        abbrv, len_ = self.abbreviate(
-                            title_normalized[token.position + ligatures_shift:],
-                            token.value,
-                            title_soft_normalized[token.position:],
-                            langs)
+                        if matches is not None:
+                            if stats is not None:
+                                stats.lookups += 1
+
+                            position = offsets[token.position]
+                            best = self._best_match(matches.get(position, []), title_normalized, position, langs, stats)
+                            if best is None:
+                                suffixes = self._search_suffixes(
+                                    indexes[1], self._word(title_normalized, position), langs, stats, suffix_filter)
+                                best = suffixes[0] if suffixes else None
+
+                            abbrv, len_ = self._replace(
+                                best,
+                                token.value,
+                                title_soft_normalized,
+                                token.position,
+                                stats)
+                        else:
+                            abbrv, len_ = self.abbreviate(
+                                title_normalized[offsets[token.position]:],
+                                token.value,
+                                title_soft_normalized[token.position:],
+                                langs,
+                                stats)
                         next_position = token.position + len_
                     else:
                         abbrv = ''
@@ -305,9 +1419,97 @@ class Abbreviate:
                     else '',
                     abbrv)
 
-                ligatures_shift += number_of_ligatures(token.value)
                 no_space = False
                 if token.type != TokenType.HYPHEN:
                     is_hyphenated = False
 
         return result
+
+    def iter_abbreviate_many(self,
+                             titles: Iterable[str],
+                             remove_part: bool = True,
+                             langs: Optional[List[str]] = None,
+                             workers: int = 1,
+                             chunksize: int = 256,
+                             on_error: Optional[Callable[[AbbreviationError], str]] = None) -> Iterator[str]:
+        """Abbreviate ``titles`` (see ``__call__()``), and yield the results in the same order.
+
+        If ``workers > 1``, titles are abbreviated by a pool of ``workers`` processes, which receive this object
+        once (when they start), then chunks of ``chunksize`` titles.
+        Only a few chunks are processed at a given time, so ``titles`` can be as long as needed.
+
+        If a title cannot be abbreviated, an ``AbbreviationError`` (which gives the title) is raised, unless
+        ``on_error`` is given: then, the result of ``on_error(error)`` is yielded instead, and the batch goes on.
+        """
+
+        def result(abbreviation: Union[str, AbbreviationError]) -> str:
+            if isinstance(abbreviation, AbbreviationError):
+                if on_error is None:
+                    raise abbreviation
+                return on_error(abbreviation)
+
+            return abbreviation
+
+        if workers <= 1:
+            for title in titles:
+                yield result(_abbreviate_or_error(self, title, remove_part, langs))
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        titles = iter(titles)
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self,)) as executor:
+            pending: Deque['Future[List[Union[str, AbbreviationError]]]'] = deque()
+            while True:
+                chunk = list(itertools.islice(titles, chunksize))
+                if chunk:
+                    pending.append(executor.submit(_abbreviate_chunk, chunk, remove_part, langs))
+
+                # keep two chunks per worker in flight
+                if len(pending) > 0 and (not chunk or len(pending) >= 2 * workers):
+                    for abbreviation in pending.popleft().result():
+                        yield result(abbreviation)
+
+                if not chunk and len(pending) == 0:
+                    break
+
+    def abbreviate_many(self,
+                        titles: Iterable[str],
+                        remove_part: bool = True,
+                        langs: Optional[List[str]] = None,
+                        workers: int = 1,
+                        chunksize: int = 256,
+                        on_error: Optional[Callable[[AbbreviationError], str]] = None) -> List[str]:
+        """Abbreviate ``titles``, and return the results in the same order (see ``iter_abbreviate_many()``)
+        """
+
+        return list(self.iter_abbreviate_many(titles, remove_part, langs, workers, chunksize, on_error))
+
+    def abbreviate_array(self,
+                         values: Any,
+                         remove_part: bool = True,
+                         langs: Optional[List[str]] = None,
+                         workers: int = 1,
+                         chunksize: int = 256) -> Any:
+        """Abbreviate a column of titles: a pandas ``Series``, an Arrow (chunked) array of strings, or a sequence.
+        Each distinct title is abbreviated once (see ``abbreviate_many()``), and the results are returned in a column
+        of the same kind and length, with nulls preserved (see ``pyiso4.arrays.apply_unique()``).
+        """
+
+        return apply_unique(
+            values, lambda titles: self.abbreviate_many(titles, remove_part, langs, workers, chunksize))
+
+    async def abbreviate_many_async(self,
+                                    titles: Iterable[str],
+                                    remove_part: bool = True,
+                                    langs: Optional[List[str]] = None,
+                                    executor: Optional['Executor'] = None) -> List[str]:
+        """Abbreviate ``titles`` in ``executor`` (the default executor of the loop if ``None``),
+        without blocking the event loop
+        """
+
+        import asyncio  # (only needed here, and importing it takes a while)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, functools.partial(self.abbreviate_many, list(titles), remove_part, langs))
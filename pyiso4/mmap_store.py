@@ -0,0 +1,363 @@
+"""Read-only LTWA stored in a flat file, which is memory-mapped.
+
+Since the file is mapped read-only, all the processes that open the same file share the same physical pages.
+Patterns are only turned into Python objects when they are returned by a search (and only the last ones are kept).
+
+Layout of the file (all the arrays use the native byte order, and start on an 8-bytes boundary):
+
++ ``MAGIC``, then the size of a JSON header (4 bytes, big endian) and the header itself
+  (format version, number of entries, languages, stopwords, heads of the keys, and offset of each section);
++ a string table (UTF-8), referenced by the ``(offset, length)`` columns;
++ one array per column of the entries: offset and length of the pattern, replacement and key, and
+  the bitmask of the languages (``mask_size`` bytes per entry, bit ``i`` corresponding to ``langs[i]``);
++ the ids of the prefix entries, sorted by key, and of the suffix entries, sorted by reversed key.
+"""
+
+import array
+import io
+import itertools
+import json
+import mmap
+import pathlib
+import sys
+from typing import Any, BinaryIO, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pyiso4 import compiled
+from pyiso4.cache import LRUCache, MISSING
+from pyiso4.ltwa import Pattern, key_heads, read_ltwa, read_stopwords
+
+FORMAT_VERSION = 2
+
+MAGIC = b'PYISO4MM'
+
+Path = Union[str, pathlib.Path]
+
+# name and typecode of the columns
+COLUMNS = [
+    ('pattern_offset', 'I'),
+    ('pattern_length', 'H'),
+    ('replacement_offset', 'I'),
+    ('replacement_length', 'H'),
+    ('key_offset', 'I'),
+    ('key_length', 'H'),
+]
+
+
+def _align(f: BinaryIO) -> int:
+    """Pad the file so that the next section starts on a 8-bytes boundary, and return its position"""
+
+    position = f.tell()
+    if position % 8 != 0:
+        f.write(b'\0' * (8 - position % 8))
+        position = f.tell()
+
+    return position
+
+
+def write(path: Path, patterns: Iterable[Pattern], stopwords: List[str],
+          sources: Optional[Dict[str, Optional[str]]] = None) -> None:
+    """Write ``patterns`` (and ``stopwords``) in a file that can be opened by ``MappedLTWA``
+    """
+
+    patterns = list(patterns)
+
+    # languages
+    langs: List[str] = []
+    lang_bits: Dict[str, int] = {}
+    for pattern in patterns:
+        for language in pattern.langs:
+            if language not in lang_bits:
+                lang_bits[language] = len(langs)
+                langs.append(language)
+
+    mask_size = max(1, (len(langs) + 7) // 8)
+
+    # string table and columns
+    strings = bytearray()
+    offsets: Dict[bytes, int] = {}
+
+    def add_string(s: str) -> int:
+        encoded = s.encode()
+        if encoded not in offsets:
+            offsets[encoded] = len(strings)
+            strings.extend(encoded)
+        return offsets[encoded]
+
+    columns = {name: array.array(typecode) for name, typecode in COLUMNS}
+    masks = bytearray()
+    prefix_keys = []
+    suffix_keys = []
+
+    for i, pattern in enumerate(patterns):
+        key = pattern.to_key()
+        if pattern.start_with_dash:
+            key = key[::-1]
+            suffix_keys.append((key.encode(), i))
+        else:
+            prefix_keys.append((key.encode(), i))
+
+        columns['pattern_offset'].append(add_string(pattern.pattern))
+        columns['pattern_length'].append(len(pattern.pattern.encode()))
+        columns['replacement_offset'].append(add_string(pattern.replacement))
+        columns['replacement_length'].append(len(pattern.replacement.encode()))
+        columns['key_offset'].append(add_string(key))
+        columns['key_length'].append(len(key.encode()))
+
+        mask = 0
+        for language in pattern.langs:
+            mask |= 1 << lang_bits[language]
+        masks.extend(mask.to_bytes(mask_size, 'little'))
+
+    # sorted by key, then by order of insertion (so that the order is the same as with `Trie`)
+    prefix_ids = array.array('I', (i for _, i in sorted(prefix_keys)))
+    suffix_ids = array.array('I', (i for _, i in sorted(suffix_keys)))
+
+    # write sections, then header
+    sections: Dict[str, int] = {}
+    body_file = io.BytesIO()
+    sections['strings'] = _align(body_file)
+    body_file.write(strings)
+    for name, _ in COLUMNS:
+        sections[name] = _align(body_file)
+        body_file.write(columns[name].tobytes())
+    sections['masks'] = _align(body_file)
+    body_file.write(bytes(masks))
+    sections['prefix'] = _align(body_file)
+    body_file.write(prefix_ids.tobytes())
+    sections['suffix'] = _align(body_file)
+    body_file.write(suffix_ids.tobytes())
+
+    header = json.dumps({
+        'version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'entries': len(patterns),
+        'prefix_entries': len(prefix_ids),
+        'suffix_entries': len(suffix_ids),
+        'langs': langs,
+        'mask_size': mask_size,
+        'stopwords': stopwords,
+        'heads': sorted(key_heads(key.decode() for key, _ in prefix_keys)),  # (see `Abbreviate._window()`)
+        'sources': sources or {},
+        'sections': sections
+    }).encode()
+
+    with compiled.replace_file(path) as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, 'big'))
+        f.write(header)
+        _align(f)
+        f.write(body_file.getvalue())
+
+
+def build(output: Path, ltwa_file: Path, stopwords: Optional[Path]) -> None:
+    """Create a memory-mappable file from a LTWA CSV file and a newline-separated list of stopwords"""
+
+    write(
+        output, read_ltwa(ltwa_file), read_stopwords(stopwords),
+        {'ltwa': compiled.checksum(ltwa_file), 'stopwords': compiled.checksum(stopwords)})
+
+
+class MappedLTWA:
+    """A LTWA, memory-mapped from a file created by ``write()`` or ``build()``.
+    Use ``prefix`` and ``suffix`` in place of the ``Trie`` of ``Abbreviate``.
+    """
+
+    def __init__(self, path: Path, cache_size: int = 4096):
+        self.path = path
+        self.cache_size = cache_size
+
+        with open(path, 'rb') as f:
+            self.header = compiled.parse_header(f, MAGIC, FORMAT_VERSION)
+            if self.header['byteorder'] != sys.byteorder:
+                raise compiled.IndexFormatError('{} was written with a different byte order'.format(path))
+
+            body_offset = f.tell()
+            body_offset += -body_offset % 8
+
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._view = memoryview(self._mmap)
+
+        sections = self.header['sections']
+        n = self.header['entries']
+
+        def section(name: str, typecode: Any, size: int) -> memoryview:
+            start = body_offset + sections[name]
+            return self._view[start:start + size * array.array(typecode).itemsize].cast(typecode)
+
+        self.langs: List[str] = self.header['langs']
+        self.lang_bits = dict((language, i) for i, language in enumerate(self.langs))
+        self.stopwords: List[str] = self.header['stopwords']
+        self.heads: FrozenSet[str] = frozenset(self.header['heads'])
+        self.mask_size: int = self.header['mask_size']
+
+        self._strings = self._view[body_offset + sections['strings']:]
+        self._columns = dict((name, section(name, typecode, n)) for name, typecode in COLUMNS)
+        self._masks = section('masks', 'B', n * self.mask_size)
+
+        self.prefix = MappedIndex(self, 'prefix', section('prefix', 'I', self.header['prefix_entries']))
+        self.suffix = MappedIndex(self, 'suffix', section('suffix', 'I', self.header['suffix_entries']))
+
+        # the last ``cache_size`` patterns that were returned
+        self._patterns = LRUCache(cache_size)
+
+    def __len__(self) -> int:
+        return int(self.header['entries'])
+
+    def __reduce__(self) -> Tuple[type, Tuple[Path, int]]:
+        # other processes map the same file
+        return self.__class__, (self.path, self.cache_size)
+
+    def _string(self, offset: int, length: int) -> str:
+        return bytes(self._strings[offset:offset + length]).decode()
+
+    def key(self, i: int) -> str:
+        """Get the key of entry ``i`` (reversed for the suffix entries), from the string table"""
+
+        return self._string(self._columns['key_offset'][i], self._columns['key_length'][i])
+
+    def key_length(self, i: int) -> int:
+        return int(self._columns['key_length'][i])
+
+    def key_byte(self, i: int, position: int) -> int:
+        return int(self._strings[self._columns['key_offset'][i] + position])
+
+    def lang_mask(self, i: int) -> int:
+        return int.from_bytes(self._masks[i * self.mask_size:(i + 1) * self.mask_size], 'little')
+
+    def languages_mask(self, langs: Iterable[str]) -> int:
+        """Get the mask corresponding to ``langs`` (plus ``mul``)"""
+
+        mask = 0
+        for language in itertools.chain(langs, ['mul']):
+            if language in self.lang_bits:
+                mask |= 1 << self.lang_bits[language]
+
+        return mask
+
+    def pattern(self, i: int) -> Pattern:
+        """Get entry ``i`` as a ``Pattern``"""
+
+        pattern = self._patterns.get(i)
+        if pattern is MISSING:
+            mask = self.lang_mask(i)
+            columns = self._columns
+            pattern = Pattern(
+                self._string(columns['pattern_offset'][i], columns['pattern_length'][i]),
+                self._string(columns['replacement_offset'][i], columns['replacement_length'][i]),
+                [language for j, language in enumerate(self.langs) if mask & (1 << j)]
+            )
+            self._patterns.put(i, pattern)
+
+        return pattern  # type: ignore
+
+    def patterns(self) -> Iterable[Pattern]:
+        """Iterate over all the patterns, in the order in which they were written"""
+
+        for i in range(len(self)):
+            yield self.pattern(i)
+
+    def close(self) -> None:
+        self.prefix.ids.release()
+        self.suffix.ids.release()
+        self._masks.release()
+        for column in self._columns.values():
+            column.release()
+        self._strings.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> 'MappedLTWA':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class MappedIndex:
+    """Sorted array of entry ids, with the same ``search()`` as ``Trie``
+    """
+
+    def __init__(self, ltwa: MappedLTWA, name: str, ids: memoryview):
+        self.ltwa = ltwa
+        self.name = name
+        self.ids = ids
+
+    def __reduce__(self) -> Tuple[Any, Tuple[MappedLTWA, str]]:
+        return getattr, (self.ltwa, self.name)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def items(self) -> Iterator[Tuple[str, Pattern]]:
+        """Iterate over all the ``(key, pattern)``, sorted by key"""
+
+        ltwa = self.ltwa
+        for i in self.ids:
+            yield ltwa.key(i), ltwa.pattern(i)
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over all the keys, sorted, without creating the patterns"""
+
+        ltwa = self.ltwa
+        for i in self.ids:
+            yield ltwa.key(i)
+
+    def heads(self, word: str) -> FrozenSet[str]:
+        """Get the first word of the keys that contain a boundary (see ``Abbreviate._window()``), which are stored
+        in the header of the file (``word`` is not used)
+        """
+
+        return self.ltwa.heads if self.name == 'prefix' else frozenset()
+
+    def _bisect(self, byte: int, position: int, lo: int, hi: int, strict: bool) -> int:
+        """Find the first id in ``[lo, hi)`` for which the byte of the key at ``position`` is larger
+        (or equal, if not ``strict``) than ``byte``"""
+
+        ltwa, ids = self.ltwa, self.ids
+        while lo < hi:
+            mid = (lo + hi) // 2
+            b = ltwa.key_byte(ids[mid], position)
+            if b < byte or (strict and b == byte):
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def search(self, word: str, langs: Optional[Iterable[str]] = None) -> List[Pattern]:
+        """Return the patterns for which the key is a prefix of ``word``, shortest first.
+        If ``langs`` is given, only the patterns in one of these languages (or ``mul``) are returned.
+        """
+
+        ltwa, ids = self.ltwa, self.ids
+        encoded = word.encode()
+        results = []
+        mask = ltwa.languages_mask(langs) if langs is not None else -1
+
+        lo, hi = 0, len(ids)
+        for length in range(len(encoded) + 1):
+            if length > 0:
+                # in [lo, hi), all keys start with `encoded[:length - 1]`, and the ones that are that long
+                # come first: skip them, then narrow to the ones that continue with the correct byte
+                while lo < hi and ltwa.key_length(ids[lo]) < length:
+                    lo += 1
+                byte = encoded[length - 1]
+                lo = self._bisect(byte, length - 1, lo, hi, False)
+                hi = self._bisect(byte, length - 1, lo, hi, True)
+
+            if lo >= hi:
+                break
+
+            i = lo
+            while i < hi and ltwa.key_length(ids[i]) == length:
+                if mask == -1 or ltwa.lang_mask(ids[i]) & mask:
+                    results.append(ltwa.pattern(ids[i]))
+                i += 1
+
+        return results
+
+    def search_longest_first(self, word: str, langs: Optional[Iterable[str]] = None) -> Iterator[Pattern]:
+        """Same patterns as ``search()``, longest key first (and in the same order for a given key)"""
+
+        return iter(sorted(self.search(word, langs), key=lambda pattern: len(pattern.to_key()), reverse=True))
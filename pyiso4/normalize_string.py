@@ -1,5 +1,6 @@
 from enum import Enum, unique
 import re
+from typing import Dict, List, Match, Sequence, Set
 from unicodedata import normalize as unicode_normalize
 from unidecode import unidecode
 
@@ -8,11 +9,64 @@ BOUNDARY = re.compile(r'[-\s\u2013\u2014_.,:;!|=+*\\/"()&#%@$?]')
 
 LIGATURES = 'ŒœÆæ'
 
+NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+# blocks of code points of which the transliteration is computed in advance: Latin-1 supplement, Latin extended A and B,
+# Greek, Cyrillic, Latin extended additional and general punctuation
+TRANSLITERATED_BLOCKS = [(0x80, 0x250), (0x370, 0x530), (0x1E00, 0x1F00), (0x2000, 0x2070)]
+
+# transliteration (by `unidecode`) of non-ASCII characters.
+# Characters that are not in there are added when first seen, see `transliterate_char()`
+TRANSLITERATIONS: Dict[str, str] = {}
+
+# characters of which the transliteration is not a single character
+_NOT_SINGLE: Set[str] = set()
+
+
+def _add_transliteration(c: str) -> str:
+    result = unidecode(c)
+    if len(result) != 1:
+        _NOT_SINGLE.add(c)
+    TRANSLITERATIONS[c] = result
+    return result
+
+
+def _fill_transliterations() -> None:
+    for first, last in TRANSLITERATED_BLOCKS:
+        for code in range(first, last):
+            _add_transliteration(chr(code))
+
+
+_fill_transliterations()
+
 
 def number_of_ligatures(word: str) -> int:
     return sum(1 for c in word if c in LIGATURES)
 
 
+def transliterate_char(c: str) -> str:
+    """Same as ``unidecode(c)``, for a single character"""
+
+    if c.isascii():
+        return c
+
+    result = TRANSLITERATIONS.get(c)
+    if result is None:
+        result = _add_transliteration(c)
+
+    return result
+
+
+def _transliterate_match(match: Match[str]) -> str:
+    return transliterate_char(match.group())
+
+
+def transliterate(inp: str) -> str:
+    """Same as ``unidecode(inp)``, but only the non-ASCII characters are looked up (in ``TRANSLITERATIONS``)"""
+
+    return inp if inp.isascii() else NON_ASCII.sub(_transliterate_match, inp)
+
+
 @unique
 class Level(Enum):
     SOFT = 1
@@ -30,11 +84,57 @@ def normalize(inp: str, level: Level = Level.SOFT) -> str:
 
     """
     if level == Level.SOFT:
-        return unicode_normalize('NFKC', inp)
+        return inp if inp.isascii() else unicode_normalize('NFKC', inp)
     else:
-        result = unidecode(inp)
+        result = transliterate(inp)
         if level == Level.HARD:
             result = BOUNDARY.sub(' ', result).lower()  # transform boundaries and lower
             result = re.sub(r'[^a-z ]', ' ', result)  # remove everything which is not [a-z ]
 
         return result
+
+
+class NormalizedString:
+    """A string in its ``Level.SOFT`` form (``soft``) and ``Level.NORMAL`` form, lowered (``normal``), the latter
+    being computed from the former.
+    ``offsets[i]`` is the position in ``normal`` of ``soft[i]`` (and ``offsets[len(soft)]`` is ``len(normal)``),
+    since a character may be transliterated into zero or more characters (e.g., ``œ`` into ``oe``).
+    """
+
+    __slots__ = ('soft', 'normal', 'offsets')
+
+    def __init__(self, inp: str):
+        self.offsets: Sequence[int]
+
+        if inp.isascii():
+            self.soft = inp
+            self.normal = inp.lower()
+            self.offsets = range(len(inp) + 1)
+        else:
+            self.soft = unicode_normalize('NFKC', inp)
+            self.normal = transliterate(self.soft).lower()
+
+            if _NOT_SINGLE.isdisjoint(self.soft):
+                self.offsets = range(len(self.soft) + 1)
+            else:
+                self.offsets = self._offsets(self.soft)
+
+    @staticmethod
+    def _offsets(soft: str) -> List[int]:
+        """Shift the positions that come after each character of which the transliteration is not a single one"""
+
+        offsets: List[int] = []
+        start = shift = 0
+        for match in NON_ASCII.finditer(soft):
+            extra = len(transliterate_char(match.group())) - 1
+            if extra != 0:
+                position = match.start()
+                offsets.extend(range(start + shift, position + shift + 1))
+                start = position + 1
+                shift += extra
+
+        offsets.extend(range(start + shift, len(soft) + shift + 1))
+        return offsets
+
+    def __repr__(self) -> str:
+        return 'NormalizedString({!r})'.format(self.soft)
@@ -1,4 +1,88 @@
-from typing import Dict, Tuple, List, Any
+from itertools import chain
+from threading import Lock
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple, List, Any, Protocol
+import sys
+
+# bit of each language code in `Pattern.langs_mask` (assigned when a code is first seen, `mul` being bit 0)
+LANGUAGES: Dict[str, int] = {'mul': 0}
+_languages_lock = Lock()
+
+
+def languages_mask(langs: Iterable[str], add: bool = False) -> int:
+    """Get the mask corresponding to ``langs`` (see ``LANGUAGES``).
+    If ``add``, unknown languages get a new bit, otherwise they are ignored.
+    """
+
+    mask = 0
+    for language in langs:
+        bit = LANGUAGES.get(language)
+        if bit is None:
+            if not add:
+                continue
+            with _languages_lock:
+                bit = LANGUAGES.setdefault(sys.intern(language), len(LANGUAGES))
+        mask |= 1 << bit
+
+    return mask
+
+
+def _mask_of(obj: Any) -> int:
+    """Get the ``langs_mask`` of an object of a ``Trie``, or -1 (any language) if it has none"""
+
+    return int(getattr(obj, 'langs_mask', -1))
+
+
+class SearchIndex(Protocol):
+    """Anything that can be searched like a ``PrefixTree``"""
+
+    def search(self, word: str, langs: Optional[Iterable[str]] = None) -> List[Any]:
+        ...
+
+    def search_longest_first(self, word: str, langs: Optional[Iterable[str]] = None) -> Iterator[Any]:
+        ...
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        ...
+
+    def keys(self) -> Iterator[str]:
+        ...
+
+
+class KeyFilter:
+    """Beginnings (the first ``length`` characters) of a set of keys, to tell that none of these keys is a prefix of
+    a word, so that searching the word in an index that contains them is not needed.
+    ``may_match()`` never gives ``False`` for a word that one of the keys starts, but may give ``True`` for a word
+    that none of them does (if it only shares its first ``length`` characters with a key).
+    Most words take one or two lookups in a set, since the keys shorter than ``length`` are only checked if the word
+    starts like one of them.
+    """
+
+    __slots__ = ('length', 'beginnings', 'short_heads', 'short_lengths')
+
+    def __init__(self, keys: Iterable[str], length: int = 6):
+        self.length = length
+        self.beginnings = frozenset(key[:length] for key in keys)
+
+        short_keys = [beginning for beginning in self.beginnings if len(beginning) < length]
+        self.short_lengths = tuple(sorted(set(len(key) for key in short_keys)))
+        head_length = self.short_lengths[0] if short_keys else 0
+        self.short_heads = frozenset(key[:head_length] for key in short_keys)
+
+    def __len__(self) -> int:
+        return len(self.beginnings)
+
+    def may_match(self, word: str, position: int = 0) -> bool:
+        """Check if one of the keys may be a prefix of ``word[position:]``"""
+
+        beginnings = self.beginnings
+        if word[position:position + self.length] in beginnings:
+            return True
+
+        # keys that are shorter than `length`
+        if not self.short_lengths or word[position:position + self.short_lengths[0]] not in self.short_heads:
+            return False
+
+        return any(word[position:position + length] in beginnings for length in self.short_lengths)
 
 
 class Node:
@@ -42,6 +126,12 @@ class Node:
 
             self.objs = []
 
+    def __getstate__(self) -> Tuple[str, bool, List[Tuple[str, Any]], Dict[str, 'Node']]:
+        return self.char, self.split, self.objs, self.children
+
+    def __setstate__(self, state: Tuple[str, bool, List[Tuple[str, Any]], Dict[str, 'Node']]) -> None:
+        self.char, self.split, self.objs, self.children = state
+
     def __str__(self) -> str:
         if not self.split:
             return '{}'.format(self.objs)
@@ -85,8 +175,306 @@ class PrefixTree:
 
         self.root.insert(key, obj)
 
-    def search(self, word: str) -> List[Any]:
-        """Return a list of objects that matches the prefix of `word`, including wildcard ones
+    def search(self, word: str, langs: Optional[Iterable[str]] = None) -> List[Any]:
+        """Return a list of objects that matches the prefix of `word`, including wildcard ones.
+        If ``langs`` is given, only return objects having one of these languages (or ``mul``) in their ``langs``.
+        """
+
+        results = self.root.search(word)
+        if langs is not None:
+            langs = set(langs)
+            results = [o for o in results if any(lg == 'mul' or lg in langs for lg in o.langs)]
+
+        return results
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over all the ``(key, object)``"""
+
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            yield from node.objs
+            nodes.extend(node.children.values())
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over the key of each object (see ``items()``)"""
+
+        for key, _ in self.items():
+            yield key
+
+
+class TrieNode:
+
+    __slots__ = ('label', 'objs', 'mask', 'children')
+
+    def __init__(self, label: str):
+        self.label = label  # part of the key between the parent and this node
+
+        self.objs: List[Any] = []
+        self.mask = 0  # union of the masks of all the objects of the subtree (see `_mask_of()`)
+        self.children: Dict[str, 'TrieNode'] = {}  # indexed by the first character of their label
+
+    def __getstate__(self) -> Tuple[str, List[Any], Dict[str, 'TrieNode']]:
+        # the bits of the languages may be different in another process, so the mask is computed again
+        return self.label, self.objs, self.children
+
+    def __setstate__(self, state: Tuple[str, List[Any], Dict[str, 'TrieNode']]) -> None:
+        self.label, self.objs, self.children = state
+        self._update_mask()  # (the children are complete at this point)
+
+    def copy(self) -> 'TrieNode':
+        """Shallow copy: the children are shared"""
+
+        node = TrieNode(self.label)
+        node.objs = list(self.objs)
+        node.mask = self.mask
+        node.children = dict(self.children)
+        return node
+
+    def _child(self, c: str, copied: Optional[Set[int]]) -> 'TrieNode':
+        """Get the child for ``c``. If ``copied`` is given, it contains the ``id()`` of the nodes that may be
+        modified, and the child is replaced by a copy if it is not one of them.
+        """
+
+        child = self.children[c]
+        if copied is not None and id(child) not in copied:
+            child = child.copy()
+            self.children[c] = child
+            copied.add(id(child))
+
+        return child
+
+    def _update_mask(self) -> None:
+        self.mask = 0
+        for obj in self.objs:
+            self.mask |= _mask_of(obj)
+        for child in self.children.values():
+            self.mask |= child.mask
+
+    def insert(self, key: str, obj: Any, position: int = 0, copied: Optional[Set[int]] = None) -> None:
+        """Insert a new object, ``key[:position]`` being the key of this node (see ``_child()`` for ``copied``)
+        """
+
+        self.mask |= _mask_of(obj)
+
+        if position == len(key):
+            self.objs.append(obj)
+            return
+
+        c = key[position]
+        if c not in self.children:
+            child = TrieNode(key[position:])
+            self.children[c] = child
+            if copied is not None:
+                copied.add(id(child))
+            child.insert(key, obj, len(key))
+            return
+
+        child = self._child(c, copied)
+        label = child.label
+
+        # length of the common part between the label and the rest of the key
+        common = 1
+        max_common = min(len(label), len(key) - position)
+        while common < max_common and label[common] == key[position + common]:
+            common += 1
+
+        if common < len(label):  # split the label: insert an intermediate node
+            intermediate = TrieNode(label[:common])
+            intermediate.mask = child.mask
+            child.label = label[common:]
+            intermediate.children[child.label[0]] = child
+            self.children[c] = intermediate
+            if copied is not None:
+                copied.add(id(intermediate))
+            child = intermediate
+
+        child.insert(key, obj, position + common, copied)
+
+    def remove(self, key: str, obj: Any, position: int = 0, copied: Optional[Set[int]] = None) -> bool:
+        """Remove the first object equal to ``obj`` for ``key`` (see ``_child()`` for ``copied``).
+        Empty nodes are removed as well. Return ``False`` if there is no such object.
+        """
+
+        if position == len(key):
+            for i, other in enumerate(self.objs):
+                if other == obj:
+                    del self.objs[i]
+                    self._update_mask()
+                    return True
+
+            return False
+
+        c = key[position]
+        if c not in self.children or not key.startswith(self.children[c].label, position):
+            return False
+
+        child = self._child(c, copied)
+        if not child.remove(key, obj, position + len(child.label), copied):
+            return False
+
+        if not child.objs and not child.children:
+            del self.children[c]
+
+        self._update_mask()
+        return True
+
+    def __str__(self) -> str:
+        return '{}{}{{{}}}'.format(
+            self.label, self.objs, ', '.join('{}'.format(v) for v in self.children.values()))
+
+
+class Trie:
+    """Compressed prefix tree (radix tree) whose search returns exactly the objects for which the key
+    is a prefix of the word.
+
+    Searches may be restricted to some languages, given by the ``langs_mask`` of the objects (see ``languages_mask()``,
+    e.g., ``Pattern``): each node keeps the union of the masks of the objects of its subtree, so that the subtrees
+    in other languages are skipped. Objects in ``mul`` (bit 0), or without ``langs_mask``, match any language.
+    """
+
+    def __init__(self) -> None:
+        self.root = TrieNode('')
+
+    def insert(self, key: str, obj: Any) -> None:
+        """Insert a new object. Multiple objects with the same `key` may be inserted.
+        """
+
+        self.root.insert(key, obj)
+
+    def remove(self, key: str, obj: Any) -> bool:
+        """Remove the first object equal to ``obj`` inserted with ``key``. Return ``False`` if there is none.
+        """
+
+        return self.root.remove(key, obj)
+
+    def updated(self, inserted: Iterable[Tuple[str, Any]] = (), removed: Iterable[Tuple[str, Any]] = ()) -> 'Trie':
+        """Get a new trie, in which the ``(key, object)`` of ``removed`` were removed (objects are compared with
+        ``==``), then the ``(key, object)`` of ``inserted`` were inserted.
+
+        Only the nodes that change are copied, the other ones are shared. This trie is not modified, so that
+        it can be searched in the meantime. Raise ``KeyError`` if an object to remove is not found.
+        """
+
+        trie = Trie()
+        trie.root = self.root.copy()
+        copied = {id(trie.root)}
+
+        for key, obj in removed:
+            if not trie.root.remove(key, obj, 0, copied):
+                raise KeyError('{!r} is not in the trie (for {!r})'.format(obj, key))
+
+        for key, obj in inserted:
+            trie.root.insert(key, obj, 0, copied)
+
+        return trie
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over all the ``(key, object)``"""
+
+        nodes = [('', self.root)]
+        while nodes:
+            prefix, node = nodes.pop()
+            key = prefix + node.label
+            for obj in node.objs:
+                yield key, obj
+            nodes.extend((key, child) for child in node.children.values())
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over the key of each object (see ``items()``)"""
+
+        for key, _ in self.items():
+            yield key
+
+    def search(self, word: str, langs: Optional[Iterable[str]] = None) -> List[Any]:
+        """Return the objects for which the key is a prefix of `word`, shortest key first
+        (and in order of insertion for a given key).
+        If ``langs`` is given, only return the objects in one of these languages (or in ``mul``).
         """
 
-        return self.root.search(word)
+        node = self.root
+        position = 0
+        length = len(word)
+
+        if langs is None:
+            results = list(node.objs)
+            while position < length:
+                child = node.children.get(word[position])
+                if child is None or not word.startswith(child.label, position):
+                    break
+
+                if child.objs:
+                    results.extend(child.objs)
+                position += len(child.label)
+                node = child
+        else:
+            mask = languages_mask(langs) | 1  # `mul` is bit 0
+            results = []
+            while True:
+                if node.objs:
+                    results.extend(obj for obj in node.objs if getattr(obj, 'langs_mask', -1) & mask)
+                if position >= length:
+                    break
+
+                child = node.children.get(word[position])
+                if child is None or not child.mask & mask or not word.startswith(child.label, position):
+                    break
+
+                position += len(child.label)
+                node = child
+
+        return results
+
+    def path(self, word: str, langs: Optional[Iterable[str]] = None) -> List[TrieNode]:
+        """Get the nodes of the keys that are prefixes of ``word`` (and that have objects in ``langs``, if given),
+        shortest key first. The objects of these nodes are the ones that ``search()`` returns.
+        """
+
+        nodes = []
+        node = self.root
+        position = 0
+        length = len(word)
+
+        if langs is None:
+            while True:
+                if node.objs:
+                    nodes.append(node)
+                if position >= length:
+                    break
+
+                child = node.children.get(word[position])
+                if child is None or not word.startswith(child.label, position):
+                    break
+
+                position += len(child.label)
+                node = child
+        else:
+            mask = languages_mask(langs) | 1  # `mul` is bit 0
+            while True:
+                if node.objs and any(getattr(obj, 'langs_mask', -1) & mask for obj in node.objs):
+                    nodes.append(node)
+                if position >= length:
+                    break
+
+                child = node.children.get(word[position])
+                if child is None or not child.mask & mask or not word.startswith(child.label, position):
+                    break
+
+                position += len(child.label)
+                node = child
+
+        return nodes
+
+    def search_longest_first(self, word: str, langs: Optional[Iterable[str]] = None) -> Iterator[Any]:
+        """Iterate over the objects that ``search()`` returns, but longest key first (and still in order of insertion
+        for a given key). The nodes are found at once, but their objects are only read when the iteration reaches them.
+        """
+
+        nodes = self.path(word, langs)
+        nodes.reverse()
+        if langs is None:
+            return chain.from_iterable(node.objs for node in nodes)
+
+        mask = languages_mask(langs) | 1
+        return chain.from_iterable(
+            (obj for obj in node.objs if getattr(obj, 'langs_mask', -1) & mask) for node in nodes)
@@ -0,0 +1,131 @@
+"""Match abbreviated titles (e.g., from citations) to the full titles of a catalogue, see ``TitleResolver``.
+"""
+
+import heapq
+import math
+import sys
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from pyiso4.ltwa import Abbreviate, abbreviation_key
+from pyiso4.normalize_string import BOUNDARY
+
+
+class Candidate(NamedTuple):
+    entry: int  # index in the catalogue
+    title: str
+    score: float  # between 0 and 1 (same words)
+
+
+class TitleResolver:
+    """Find the titles of a catalogue that an abbreviated title may stand for.
+
+    Each title of the catalogue is abbreviated once (with ``abbreviate``, see ``Abbreviate.iter_abbreviate_many()``
+    for ``remove_part``, ``langs``, ``workers`` and ``chunksize``), and its words (see ``words()``) are put in an
+    inverted index, which gives the titles that contain a given word.
+
+    Candidates are scored by comparing their words to the ones of the abbreviated title
+    (Dice coefficient, where each word is weighted by its inverse document frequency).
+    Only the titles that contain at least one of the rarest words of the abbreviated title are scored,
+    so that common words (such as ``J``) do not make the search slow with large catalogues.
+    """
+
+    def __init__(self,
+                 abbreviate: Abbreviate,
+                 titles: Iterable[str],
+                 remove_part: bool = True,
+                 langs: Optional[List[str]] = None,
+                 workers: int = 1,
+                 chunksize: int = 256,
+                 max_candidates: int = 1000):
+        self.abbreviate = abbreviate
+        self.langs = langs
+        self.max_candidates = max_candidates
+        self.stopwords = frozenset(abbreviation_key(stopword) for stopword in abbreviate.stopwords)
+
+        self.titles: List[str] = list(titles)
+        self._words: List[Tuple[str, ...]] = []  # (unique) words of each title
+        self._postings: Dict[str, 'array[int]'] = {}  # titles that contain a given word
+
+        for i, abbreviation in enumerate(
+                abbreviate.iter_abbreviate_many(self.titles, remove_part, langs, workers, chunksize)):
+            words = tuple(dict.fromkeys(sys.intern(word) for word in self.words(abbreviation)))
+            self._words.append(words)
+            for word in words:
+                posting = self._postings.get(word)
+                if posting is None:
+                    posting = self._postings[word] = array('L')
+                posting.append(i)
+
+        # sum of the weights of the words of each title
+        self._weights = array('d', (sum(self.weight(word) for word in words) for words in self._words))
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    @staticmethod
+    def words(abbreviation: str) -> List[str]:
+        """Words of an (abbreviated) title, normalized with ``abbreviation_key()``"""
+
+        return [key for key in (abbreviation_key(word) for word in BOUNDARY.split(abbreviation)) if key != '']
+
+    def weight(self, word: str) -> float:
+        """Inverse document frequency of ``word``, which is maximal for words that are not in the catalogue"""
+
+        return math.log(1 + len(self.titles) / (len(self._postings.get(word, ())) or 1))
+
+    def _query_words(self, abbreviation: str) -> List[str]:
+        """Words of ``abbreviation``, where those that are not in the catalogue are abbreviated (if possible),
+        in case the title is not (fully) abbreviated, or ignored if they are stopwords
+        """
+
+        words = []
+        for word in self.words(abbreviation):
+            if word not in self._postings:
+                if word in self.stopwords:
+                    continue
+
+                key = abbreviation_key(self.abbreviate.abbreviate_word(word, self.langs))
+                if key in self._postings:
+                    word = key
+
+            words.append(word)
+
+        return list(dict.fromkeys(words))
+
+    def resolve(self, abbreviation: str, limit: int = 5, min_score: float = .0) -> List[Candidate]:
+        """Get (at most) the ``limit`` titles that are the most likely to be abbreviated into ``abbreviation``,
+        best first, with a score of at least ``min_score``
+        """
+
+        words = self._query_words(abbreviation)
+        if not words:
+            return []
+
+        # gather candidates, starting with the rarest words: titles that contain one of them, or, if there are
+        # too many of them, titles that contain all of them
+        candidates: Set[int] = set()
+        for word in sorted((w for w in words if w in self._postings), key=lambda w: len(self._postings[w])):
+            posting = self._postings[word]
+            if not candidates:
+                candidates.update(posting)
+            elif len(candidates) > self.max_candidates:
+                candidates.intersection_update(posting)
+            elif len(candidates) + len(posting) <= self.max_candidates:
+                candidates.update(posting)
+            else:
+                break
+
+        weights = dict((word, self.weight(word)) for word in words)
+        total = sum(weights.values())
+
+        scored = []
+        for i in candidates:
+            common = sum(weights.get(word, .0) for word in self._words[i])
+            score = 2 * common / (total + self._weights[i])
+            if score >= min_score:
+                scored.append((score, -i))
+
+        return [
+            Candidate(-i, self.titles[-i], score) for score, i in heapq.nlargest(limit, scored)
+        ]
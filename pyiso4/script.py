@@ -1,9 +1,20 @@
 import argparse
+import csv
+import json
 import sys
 import pathlib
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TextIO
 
 import pyiso4
-from pyiso4.ltwa import Abbreviate
+from pyiso4.ltwa import Abbreviate, AbbreviationError
+
+FORMATS = ['lines', 'tsv', 'csv', 'jsonl']
+
+
+class ColumnError(ValueError):
+    """Raised when ``--column`` is neither a column of the header nor an index"""
 
 
 def get_arguments_parser() -> argparse.ArgumentParser:
@@ -27,18 +38,245 @@ def get_arguments_parser() -> argparse.ArgumentParser:
 
     parser.add_argument('-k', '--keep-parts', help='keeps PART', action='store_true')
 
+    parser.add_argument(
+        '-i', '--index',
+        help='Compiled index to load (it is (re)compiled from the LTWA and stopwords if needed)',
+        type=pathlib.Path)
+
+    parser.add_argument(
+        '-c', '--compile',
+        help='Compile the LTWA and stopwords into an index, then exit',
+        metavar='OUTPUT',
+        type=pathlib.Path)
+
+    parser.add_argument(
+        '--word-table',
+        help='With --compile, also precompute the patterns of the words of the LTWA (faster, but larger index)',
+        action='store_true')
+
+    pipeline = parser.add_argument_group(
+        'pipeline mode',
+        'Abbreviate the titles found in a file (or stdin), and write each record with its abbreviation '
+        '(the titles that cannot be abbreviated are reported on stderr, and get an empty abbreviation; '
+        'the JSONL lines that are not JSON objects are reported and skipped)')
+
+    pipeline.add_argument('-f', '--format', help='Format of the records', choices=FORMATS)
+    pipeline.add_argument('--input', help='Input file (default: stdin)', type=pathlib.Path)
+    pipeline.add_argument('-o', '--output', help='Output file (default: stdout)', type=pathlib.Path)
+    pipeline.add_argument(
+        '--column',
+        help='Column containing the title: index (from 0) or name (if --header) for CSV/TSV, key for JSONL',
+        default=None)
+    pipeline.add_argument('--header', help='First line of the CSV/TSV is a header', action='store_true')
+    pipeline.add_argument(
+        '--output-column', help='Name of the column (or key) of the abbreviation', default='abbreviation')
+    pipeline.add_argument('-j', '--workers', help='Number of processes', type=int, default=1)
+    pipeline.add_argument('--chunksize', help='Number of titles sent at once to a process', type=int, default=1000)
+    pipeline.add_argument('--stats', help='Print throughput and progress on stderr', action='store_true')
+
     return parser
 
 
-def main() -> None:
-    args = get_arguments_parser().parse_args()
+class Progress:
+    """Print the number of titles and throughput on ``stream``, at most every ``interval`` seconds"""
+
+    def __init__(self, stream: TextIO, interval: float = 2.0):
+        self.stream = stream
+        self.interval = interval
+        self.count = 0
+        self.start = self.last = time.perf_counter()
+
+    def _print(self, now: float, final: bool = False) -> None:
+        elapsed = now - self.start
+        self.stream.write('{}{} titles in {:.1f} s ({:.0f} titles/s){}'.format(
+            '' if final else '\r',
+            self.count, elapsed, self.count / elapsed if elapsed > 0 else 0, '\n' if final else ''))
+        self.stream.flush()
+
+    def update(self, n: int = 1) -> None:
+        self.count += n
+        now = time.perf_counter()
+        if now - self.last >= self.interval:
+            self.last = now
+            self._print(now)
+
+    def done(self) -> None:
+        self._print(time.perf_counter(), True)
+
+
+def _read_records(
+        args: argparse.Namespace, inp: TextIO, on_invalid: Callable[[int, str], None]) -> Iterator[Any]:
+    """Yield the records of ``inp``, as strings (lines), lists of fields (CSV/TSV) or dictionaries (JSONL).
+    If any, the header of a CSV/TSV is the first record.
+    A JSONL line that is not a JSON object is skipped, and given to ``on_invalid`` (with its line number).
+    """
+
+    if args.format == 'lines':
+        for line in inp:
+            yield line.rstrip('\r\n')
+    elif args.format == 'jsonl':
+        for number, line in enumerate(inp, 1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    on_invalid(number, 'invalid JSON ({})'.format(e))
+                    continue
+
+                if not isinstance(record, dict):
+                    on_invalid(number, 'not a JSON object')
+                    continue
+
+                yield record
+    else:
+        lines: Iterable[List[str]]
+        if args.format == 'tsv':
+            lines = (line.rstrip('\r\n').split('\t') for line in inp)
+        else:
+            lines = csv.reader(inp)
+
+        if args.header:
+            header = next(iter(lines), None)
+            if header is not None:
+                yield header
+
+        yield from lines
+
+
+def _get_title(args: argparse.Namespace, header: Optional[List[str]]) -> Callable[[Any], str]:
+    """Get the function that extract the title out of a record"""
+
+    if args.format == 'lines':
+        return lambda record: str(record)
+    elif args.format == 'jsonl':
+        key = args.column if args.column is not None else 'title'
+
+        def title(record: Dict[str, Any]) -> str:
+            value = record.get(key)
+            return str(value) if value is not None else ''
+
+        return title
+    else:
+        column = args.column if args.column is not None else '0'
+        if header is not None and column in header:
+            index = header.index(column)
+        else:
+            try:
+                index = int(column)
+            except ValueError:
+                raise ColumnError('unknown column {!r}{}'.format(
+                    column, ' (columns are: {})'.format(', '.join(header)) if header is not None else ''))
+
+        return lambda record: record[index] if index < len(record) else ''
+
+
+def pipeline(args: argparse.Namespace, abbreviate: Abbreviate, inp: TextIO, out: TextIO) -> None:
+    """Abbreviate the records of ``inp``, and write them (with the abbreviation) to ``out``"""
+
+    # a record that cannot be read is skipped, and the others go on
+    invalid = 0
+
+    def on_invalid(number: int, reason: str) -> None:
+        nonlocal invalid
+        invalid += 1
+        print('line {}: {}'.format(number, reason), file=sys.stderr)
+
+    records = _read_records(args, inp, on_invalid)
+
+    writer: Callable[[Any, str], None]
+    header = None
+
+    if args.format == 'lines':
+        def writer(record: Any, abbrv: str) -> None:
+            out.write('{}\t{}\n'.format(record, abbrv))
+    elif args.format == 'jsonl':
+        def writer(record: Any, abbrv: str) -> None:
+            record[args.output_column] = abbrv
+            out.write(json.dumps(record, ensure_ascii=False))
+            out.write('\n')
+    elif args.format == 'tsv':
+        def writer(record: Any, abbrv: str) -> None:
+            out.write('\t'.join(record + [abbrv]))
+            out.write('\n')
+    else:
+        csv_writer = csv.writer(out, lineterminator='\n')
+
+        def writer(record: Any, abbrv: str) -> None:
+            csv_writer.writerow(record + [abbrv])
+
+    if args.header and args.format in ['tsv', 'csv']:
+        header = next(records, None)
+        if header is None:
+            return
+        writer(header, args.output_column)
+
+    get_title = _get_title(args, header)
+    progress = Progress(sys.stderr) if args.stats else None
+
+    # keep the records until their abbreviation comes back
+    pending: Deque[Any] = deque()
+
+    def titles() -> Iterator[str]:
+        for record in records:
+            pending.append(record)
+            yield get_title(record)
+
+    # a title that cannot be abbreviated does not stop the others
+    errors = 0
+
+    def on_error(error: AbbreviationError) -> str:
+        nonlocal errors
+        errors += 1
+        print(error, file=sys.stderr)
+        return ''
+
+    for abbrv in abbreviate.iter_abbreviate_many(
+            titles(), remove_part=not args.keep_parts, workers=args.workers, chunksize=args.chunksize,
+            on_error=on_error):
+        writer(pending.popleft(), abbrv)
+        if progress is not None:
+            progress.update()
+
+    if progress is not None:
+        progress.done()
+
+    if errors > 0:
+        print('{} titles could not be abbreviated'.format(errors), file=sys.stderr)
+    if invalid > 0:
+        print('{} records were skipped'.format(invalid), file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = get_arguments_parser()
+    args = parser.parse_args(argv)
+
+    if args.format is not None and args.titles is not sys.stdin:
+        parser.error('titles cannot be given in pipeline mode, use --input')
+
+    if args.compile is not None:
+        Abbreviate.compile(args.compile, args.ltwa, args.stopwords, word_table=args.word_table)
+        return
+
+    # load LTWA (lazily, if only a few titles are abbreviated and there is no index)
+    abbreviate = Abbreviate.create(
+        args.ltwa, args.stopwords, cache_file=args.index, lazy=args.index is None and args.format is None)
 
-    # load LTWA
-    abbreviate = Abbreviate.create(args.ltwa, args.stopwords)
+    if args.format is None:
+        # abbreviate
+        for title in args.titles:
+            print(abbreviate(title, remove_part=not args.keep_parts))
+        return
 
-    # abbreviate
-    for title in args.titles:
-        print(abbreviate(title, remove_part=not args.keep_parts))
+    # pipeline mode, with large buffers both ways (stdin and stdout are not closed)
+    buffer_size = 1 << 20
+    with open(args.input if args.input is not None else sys.stdin.fileno(),
+              buffering=buffer_size, newline='', closefd=args.input is not None) as inp, \
+            open(args.output if args.output is not None else sys.stdout.fileno(), 'w',
+                 buffering=buffer_size, newline='', closefd=args.output is not None) as out:
+        try:
+            pipeline(args, abbreviate, inp, out)
+        except ColumnError as e:
+            parser.error(str(e))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,550 @@
+"""Long-running abbreviation service, which loads the LTWA once and answers over HTTP, on a local TCP port or a Unix
+socket (see ``main()``, or the ``iso4server`` command).
+
+Endpoints:
+
++ ``POST /abbreviate``, with a JSON object containing either ``title`` (gives ``{"abbreviation": ...}``) or
+  ``titles`` (gives ``{"abbreviations": [...]}``), and optionally ``remove_part`` (``true`` by default) and ``langs``,
++ ``GET /abbreviate?title=...`` (``remove_part`` and ``langs``, comma-separated, can be given as well),
++ ``GET /health``, which always answers ``{"status": "ok", ...}`` while the server runs,
++ ``GET /metrics``: number of requests and titles, throughput, latency histogram, batches and caches.
+
+Requests that arrive while a batch is being abbreviated are gathered into the next batch (see ``Batcher``),
+so that the event loop does not hand over each title separately to the thread that abbreviates them.
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import pathlib
+import stat
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+import pyiso4
+from pyiso4.ltwa import Abbreviate
+
+MAX_BODY_SIZE = 16 << 20
+
+# upper bounds (in seconds) of the buckets of the latency histogram
+LATENCY_BUCKETS = [.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5., 10.]
+
+# time span (in seconds) of the "recent" throughput
+THROUGHPUT_WINDOW = 60.
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+    417: 'Expectation Failed', 500: 'Internal Server Error', 501: 'Not Implemented'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyHistogram:
+    """Number of observations below each bound of ``buckets`` (and above the last one)"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = .0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket that contains the quantile ``q`` (``inf`` if it is above the last bound)"""
+
+        rank = q * self.count
+        cumulated = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulated += count
+            if cumulated >= rank:
+                return bound
+
+        return float('inf')
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Cumulative counts (as in Prometheus, ``le`` meaning "less or equal") and a few statistics"""
+
+        buckets = {}
+        cumulated = 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            cumulated += count
+            buckets['{:g}'.format(bound)] = cumulated
+
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count > 0 else .0,
+            'p50': self.quantile(.5) if self.count > 0 else .0,
+            'p99': self.quantile(.99) if self.count > 0 else .0,
+            'le': buckets
+        }
+
+
+# a request waiting for its batch: titles, remove_part, langs, and the future that gets the results
+Pending = Tuple[List[str], bool, Optional[List[str]], 'asyncio.Future[List[str]]']
+
+
+class Batcher:
+    """Gather the titles of concurrent requests, and abbreviate them together in a separate thread.
+
+    A batch starts with the oldest pending request, and takes the next ones (as long as the batch contains less than
+    ``max_batch`` titles) that are pending after ``max_delay`` seconds.
+    With ``max_delay=0``, the requests that arrived while the previous batch was abbreviated are taken.
+    Should be started (``start()``) and stopped (``stop()``) from the event loop.
+    """
+
+    def __init__(self, abbreviate: Abbreviate, max_batch: int = 256, max_delay: float = .0):
+        self.abbreviate = abbreviate
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self.batches = 0
+        self.titles = 0
+
+        self._pending: Deque[Pending] = deque()
+        self._event: Optional[asyncio.Event] = None
+        self._task: Optional['asyncio.Task[None]'] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        self._event = asyncio.Event()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='iso4server')
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        while self._pending:
+            self._pending.popleft()[3].cancel()
+
+    async def abbreviate_many(self,
+                              titles: List[str],
+                              remove_part: bool = True,
+                              langs: Optional[List[str]] = None) -> List[str]:
+        """Abbreviate ``titles`` as part of the next batch"""
+
+        if self._event is None:
+            raise RuntimeError('batcher is not started')
+
+        future: 'asyncio.Future[List[str]]' = asyncio.get_running_loop().create_future()
+        self._pending.append((titles, remove_part, langs, future))
+        self._event.set()
+        return await future
+
+    def _next_batch(self) -> List[Pending]:
+        batch = [self._pending.popleft()]
+        size = len(batch[0][0])
+        while self._pending and size + len(self._pending[0][0]) <= self.max_batch:
+            request = self._pending.popleft()
+            batch.append(request)
+            size += len(request[0])
+
+        return batch
+
+    def _abbreviate_group(self, batch: List[Pending], indices: List[int]) -> List[List[str]]:
+        """Abbreviate the titles of the requests ``indices`` of ``batch``, which have the same options"""
+
+        remove_part, langs = batch[indices[0]][1:3]
+        abbreviations = self.abbreviate.abbreviate_many(
+            [title for i in indices for title in batch[i][0]], remove_part, langs)
+
+        results = []
+        start = 0
+        for i in indices:
+            end = start + len(batch[i][0])
+            results.append(abbreviations[start:end])
+            start = end
+
+        return results
+
+    def _process(self, batch: List[Pending]) -> List[Union[List[str], Exception]]:
+        """Abbreviate the titles of ``batch``, with a call to ``abbreviate_many()`` for each set of options.
+        If it fails, the requests are abbreviated one by one, so that only the faulty ones get the exception.
+        """
+
+        groups: Dict[Tuple[bool, Optional[Tuple[str, ...]]], List[int]] = {}
+        for i, request in enumerate(batch):
+            groups.setdefault((request[1], None if request[2] is None else tuple(request[2])), []).append(i)
+
+        results: List[Union[List[str], Exception]] = [[] for _ in batch]
+        for indices in groups.values():
+            try:
+                for i, abbreviations in zip(indices, self._abbreviate_group(batch, indices)):
+                    results[i] = abbreviations
+            except Exception:
+                for i in indices:
+                    try:
+                        results[i] = self._abbreviate_group(batch, [i])[0]
+                    except Exception as e:
+                        results[i] = e
+
+        return results
+
+    async def _run(self) -> None:
+        assert self._event is not None
+
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._event.wait()
+            if self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+
+            while self._pending:
+                batch = self._next_batch()
+                results = await loop.run_in_executor(self._executor, self._process, batch)
+
+                self.batches += 1
+                for request, result in zip(batch, results):
+                    if request[3].done():  # (the client is gone)
+                        continue
+                    if isinstance(result, Exception):
+                        request[3].set_exception(result)
+                    else:
+                        self.titles += len(result)
+                        request[3].set_result(result)
+
+            self._event.clear()
+
+
+class Server:
+    """HTTP server (HTTP/1.1, with keep-alive and chunked bodies) that abbreviates titles with ``abbreviate``,
+    see the module docstring. ``max_batch`` and ``max_delay`` are passed to the ``Batcher``.
+    """
+
+    def __init__(self, abbreviate: Abbreviate, max_batch: int = 256, max_delay: float = .0):
+        self.abbreviate = abbreviate
+        self.batcher = Batcher(abbreviate, max_batch, max_delay)
+
+        self.start_time = time.time()
+        self.requests: Dict[int, int] = {}  # number of responses per status
+        self.latency = LatencyHistogram()
+        self._recent: Deque[Tuple[float, int]] = deque()  # (time, number of titles) of the recent requests
+
+        self._server: Optional[asyncio.Server] = None
+
+    async def start(self,
+                    host: str = '127.0.0.1',
+                    port: int = 8004,
+                    path: Optional[str] = None) -> asyncio.Server:
+        """Listen on ``host:port``, or on the Unix socket ``path`` if given (a previous socket is replaced).
+        Use port 0 to get any available port.
+        """
+
+        self.batcher.start()
+
+        if path is not None:
+            if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+            self._server = await asyncio.start_unix_server(self._handle, path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+
+        return self._server
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        await self.batcher.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            keep_alive = True
+            while keep_alive:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                start = time.perf_counter()
+                keep_alive = False  # (until the body is read, the next request cannot be found)
+                try:
+                    method, target, version, headers = await self._read_head(request_line, reader)
+                    body = await self._read_body(headers, reader, writer)
+                    keep_alive = _keep_alive(version, headers)
+
+                    response, titles = await self._dispatch(method, target, body)
+                    status = 200
+                except HTTPError as e:
+                    status, response, titles = e.status, {'error': str(e)}, 0
+                except ValueError as e:  # malformed request: the connection cannot be reused
+                    keep_alive = False
+                    status, response, titles = 400, {'error': str(e)}, 0
+
+                self._write(writer, status, response, keep_alive)
+                self._account(status, titles, time.perf_counter() - start)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_head(request_line: bytes, reader: asyncio.StreamReader) -> Tuple[str, str, str, Dict[str, str]]:
+        """Read the request line and the headers (with lowercase names)"""
+
+        fields = request_line.decode('latin-1').split()
+        if len(fields) != 3 or not fields[2].startswith('HTTP/'):
+            raise ValueError('malformed request line')
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+
+            name, sep, value = line.decode('latin-1').partition(':')
+            if not sep:
+                raise ValueError('malformed header')
+            headers[name.strip().lower()] = value.strip()
+
+        return fields[0], fields[1], fields[2], headers
+
+    @staticmethod
+    async def _read_body(headers: Dict[str, str], reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bytes:
+        """Read the body, given by ``Content-Length`` or in chunks (``Transfer-Encoding: chunked``).
+        If the client waits for it (``Expect: 100-continue``), ``100 Continue`` is sent first.
+        """
+
+        encoding = headers.get('transfer-encoding', 'identity').lower()
+        if encoding not in ['identity', 'chunked']:
+            raise HTTPError(501, 'unsupported transfer encoding {}'.format(encoding))
+
+        length = int(headers.get('content-length', '0')) if encoding == 'identity' else 0
+        if length < 0 or length > MAX_BODY_SIZE:
+            raise HTTPError(413, 'body is larger than {} bytes'.format(MAX_BODY_SIZE))
+
+        expect = headers.get('expect', '').lower()
+        if expect == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            await writer.drain()
+        elif expect:
+            raise HTTPError(417, 'unsupported expectation {}'.format(expect))
+
+        if encoding == 'identity':
+            return await reader.readexactly(length)
+
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)  # (chunk extensions are ignored)
+            if size == 0:
+                break
+            length += size
+            if size < 0 or length > MAX_BODY_SIZE:
+                raise HTTPError(413, 'body is larger than {} bytes'.format(MAX_BODY_SIZE))
+
+            chunks.append(await reader.readexactly(size))
+            if (await reader.readline()).strip():
+                raise ValueError('malformed chunk')
+
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):  # trailers
+            pass
+
+        return b''.join(chunks)
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[Dict[str, Any], int]:
+        """Get the response to a request, and the number of titles that were abbreviated"""
+
+        url = urlsplit(target)
+        if url.path == '/abbreviate':
+            if method == 'GET':
+                query = parse_qs(url.query)
+                if 'title' not in query:
+                    raise HTTPError(400, 'missing title')
+                options: Any = {'title': query['title'][-1]}
+                if 'remove_part' in query:
+                    options['remove_part'] = query['remove_part'][-1].lower() not in ['0', 'false', 'no']
+                if 'langs' in query:
+                    options['langs'] = [lang for lang in query['langs'][-1].split(',') if lang]
+            elif method == 'POST':
+                try:
+                    options = json.loads(body)
+                except ValueError:
+                    raise HTTPError(400, 'body is not valid JSON')
+            else:
+                raise HTTPError(405, 'use GET or POST')
+
+            return await self._abbreviate(options)
+        elif url.path in ['/health', '/metrics']:
+            if method != 'GET':
+                raise HTTPError(405, 'use GET')
+            return self.health() if url.path == '/health' else self.metrics(), 0
+        else:
+            raise HTTPError(404, 'unknown endpoint {}'.format(url.path))
+
+    async def _abbreviate(self, options: Any) -> Tuple[Dict[str, Any], int]:
+        if not isinstance(options, dict):
+            raise HTTPError(400, 'body should be a JSON object')
+
+        remove_part = options.get('remove_part', True)
+        if not isinstance(remove_part, bool):
+            raise HTTPError(400, '`remove_part` should be a boolean')
+
+        langs = options.get('langs')
+        if langs is not None and not (isinstance(langs, list) and all(isinstance(lang, str) for lang in langs)):
+            raise HTTPError(400, '`langs` should be a list of strings')
+
+        if 'titles' in options:
+            titles = options['titles']
+            if not (isinstance(titles, list) and all(isinstance(title, str) for title in titles)):
+                raise HTTPError(400, '`titles` should be a list of strings')
+
+            abbreviations = await self._submit(titles, remove_part, langs) if titles else []
+            return {'abbreviations': abbreviations}, len(titles)
+        elif 'title' in options:
+            if not isinstance(options['title'], str):
+                raise HTTPError(400, '`title` should be a string')
+
+            abbreviations = await self._submit([options['title']], remove_part, langs)
+            return {'abbreviation': abbreviations[0]}, 1
+        else:
+            raise HTTPError(400, 'missing `title` or `titles`')
+
+    async def _submit(self, titles: List[str], remove_part: bool, langs: Optional[List[str]]) -> List[str]:
+        try:
+            return await self.batcher.abbreviate_many(titles, remove_part, langs)
+        except Exception as e:
+            raise HTTPError(500, 'cannot abbreviate: {!r}'.format(e))
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, status: int, response: Dict[str, Any], keep_alive: bool) -> None:
+        body = json.dumps(response, ensure_ascii=False).encode()
+        writer.write(
+            'HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+                status, REASONS[status], len(body), 'keep-alive' if keep_alive else 'close').encode('latin-1'))
+        writer.write(body)
+
+    def _account(self, status: int, titles: int, latency: float) -> None:
+        self.requests[status] = self.requests.get(status, 0) + 1
+        self.latency.observe(latency)
+
+        if titles > 0:
+            now = time.time()
+            self._recent.append((now, titles))
+            while self._recent[0][0] < now - THROUGHPUT_WINDOW:
+                self._recent.popleft()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            'status': 'ok',
+            'version': pyiso4.__version__,
+            'uptime': time.time() - self.start_time,
+            'pending': self.batcher.pending,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.time()
+        uptime = now - self.start_time
+        recent = sum(n for t, n in self._recent if t >= now - THROUGHPUT_WINDOW)
+
+        return {
+            'uptime': uptime,
+            'requests': sum(self.requests.values()),
+            'responses': dict((str(status), count) for status, count in sorted(self.requests.items())),
+            'titles': self.batcher.titles,
+            'throughput': {
+                'mean': self.batcher.titles / uptime if uptime > 0 else .0,
+                'recent': recent / min(uptime, THROUGHPUT_WINDOW) if uptime > 0 else .0,
+            },
+            'latency': self.latency.to_dict(),
+            'batches': {
+                'count': self.batcher.batches,
+                'mean_size': self.batcher.titles / self.batcher.batches if self.batcher.batches > 0 else .0,
+                'pending': self.batcher.pending,
+            },
+            'caches': dict(
+                (name, dict(stats._asdict(), hit_rate=stats.hit_rate))
+                for name, stats in self.abbreviate.cache_stats().items()),
+        }
+
+
+def _keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+def get_arguments_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Abbreviation service: ' + (pyiso4.__doc__ or '').strip())
+    parser.add_argument('-v', '--version', action='version', version='%(prog)s ' + pyiso4.__version__)
+
+    here = pathlib.Path(__file__).parent
+
+    parser.add_argument('-l', '--ltwa', help='CSV of the LTWA', default=here / 'LTWA_20210702.csv')
+    parser.add_argument(
+        '-s', '--stopwords', help='List of stopwords (one per line)', default=here / 'stopwords.txt')
+    parser.add_argument(
+        '-i', '--index',
+        help='Compiled index to load (it is (re)compiled from the LTWA and stopwords if needed)',
+        type=pathlib.Path)
+
+    parser.add_argument('--host', help='Address to listen on', default='127.0.0.1')
+    parser.add_argument('-p', '--port', help='Port to listen on', type=int, default=8004)
+    parser.add_argument('-u', '--unix', help='Listen on this Unix socket instead', metavar='PATH')
+
+    parser.add_argument('--max-batch', help='Maximum number of titles in a batch', type=int, default=256)
+    parser.add_argument(
+        '--max-delay', help='Time (in seconds) to wait for more requests before a batch', type=float, default=.0)
+    parser.add_argument('--title-cache', help='Size of the cache of titles', type=int, default=4096)
+    parser.add_argument('--word-cache', help='Size of the cache of words', type=int, default=16384)
+
+    return parser
+
+
+async def serve(abbreviate: Abbreviate, args: argparse.Namespace) -> None:
+    server = Server(abbreviate, args.max_batch, args.max_delay)
+    listening = await server.start(args.host, args.port, args.unix)
+
+    address = args.unix if args.unix is not None else '{}:{}'.format(*listening.sockets[0].getsockname()[:2])
+    print('listening on {}'.format(address), file=sys.stderr, flush=True)
+
+    try:
+        await listening.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = get_arguments_parser().parse_args(argv)
+
+    abbreviate = Abbreviate.create(args.ltwa, args.stopwords, cache_file=args.index)
+    abbreviate.set_cache(args.title_cache, args.word_cache)
+
+    try:
+        asyncio.run(serve(abbreviate, args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""The previous implementation of the lexer (``ReferenceLexer``), which ``Lexer`` should give the same tokens as,
+and the inputs to compare them on. Used by the tests and by ``benchmarks/lexer.py``.
+"""
+
+from typing import Callable, Collection, Iterable, List, Optional, Tuple
+from unicodedata import normalize as unicode_normalize
+
+from pyiso4.lexer import Token, TokenType, EOS_TOKEN, SPACES, DOT, COMMON_ABBRV, PARTS, PARTS_ABBRV, IS_ORDINAL, \
+    ARTICLES
+from pyiso4.ltwa import read_ltwa
+from pyiso4.normalize_string import normalize, Level
+
+
+class ReferenceLexer:
+    """The previous lexer (which goes through the input character by character), to check that ``Lexer`` gives
+    the same tokens
+    """
+
+    def __init__(self, inp: str, stopwords: Collection[str]) -> None:
+        self.input = unicode_normalize('NFC', inp)
+        self.pos = 0
+        self.count = -1
+        self.start_word = 0
+        self.current_word: Optional[str] = None
+        self.stopwords = stopwords
+
+        self.next()
+
+    def _skip_space(self) -> None:
+        while self.pos < len(self.input) and self.input[self.pos] in SPACES:
+            self.pos += 1
+
+    def next(self) -> None:
+        """Get the next word"""
+
+        self._skip_space()
+        beg = self.pos
+        while self.pos < len(self.input) and self.input[self.pos] not in SPACES:
+            self.pos += 1
+
+        if beg != self.pos:
+            self.current_word = self.input[beg:self.pos]
+            self.start_word = beg
+        else:
+            self.current_word = None
+
+        self.count += 1
+
+    def tokenize(self) -> Iterable[Token]:
+        def yield_hyphenated(word: str, base_pos: int) -> Iterable[Token]:
+            is_first = True
+            len_ = 0
+            for w in word.split('-'):
+                if is_first:
+                    is_first = False
+                else:
+                    yield Token(TokenType.HYPHEN, '-', base_pos + len_)
+                    len_ += 1
+
+                yield Token(TokenType.WORD, w, base_pos + len_)
+                len_ += len(w)
+
+        was_part = -2
+
+        while self.current_word is not None:
+            word = self.current_word
+            lower_word = self.current_word.lower()
+
+            # remove symbols at the end
+            end_symbols = ''
+            while len(lower_word) > 0 and not lower_word[-1].isalnum():
+                end_symbols = lower_word[-1] + end_symbols
+                lower_word = lower_word[:-1]
+                word = word[:-1]
+
+            # if word ends with quote, put it back (plural possessive in english)
+            if len(end_symbols) > 0 and end_symbols[0] == "'":
+                word = word + "'"
+                lower_word = word + "'"
+                end_symbols = end_symbols[1:]
+
+            if len(word) > 0:
+                # check if abbreviation
+                ends_with_dot = len(end_symbols) > 0 and end_symbols[0] == DOT
+                if ends_with_dot and (word in COMMON_ABBRV or word.count(DOT) > 0):
+                    end_symbols = end_symbols[1:]
+                    yield Token(TokenType.ABBREVIATION, word + DOT, self.start_word)
+                # check if single letter abbreviation (surname)
+                elif ends_with_dot and len(word) == 1 and word.upper() == word:
+                    end_symbols = end_symbols[1:]
+                    yield Token(TokenType.ABBREVIATION, word + DOT, self.start_word)
+                # check if common abbreviation anyway (without dot)
+                elif word in COMMON_ABBRV:
+                    yield Token(TokenType.ABBREVIATION, word, self.start_word)
+                # check if part ending with dot
+                elif ends_with_dot and lower_word in PARTS_ABBRV:
+                    end_symbols = end_symbols[1:]
+                    yield Token(TokenType.PART, word + DOT, self.start_word)
+                    was_part = self.count
+                # check if part (without dot)
+                elif lower_word in PARTS:
+                    yield Token(TokenType.PART, word, self.start_word)
+                    was_part = self.count
+                # check if ordinal (preceded by PART)
+                elif IS_ORDINAL.match(word) and self.count == was_part + 1:
+                    yield Token(TokenType.ORDINAL, word, self.start_word)
+                # check if article (after ordinal, so "a" is detected as ordinal if preceded by PART)
+                elif lower_word in ARTICLES:
+                    yield Token(TokenType.ARTICLE, word, self.start_word)
+                # check if French "l'" or "d'"
+                elif lower_word[0:2] in ["l'", "d'", 'l’', 'd’']:
+                    yield Token(TokenType.ARTICLE, word[0:2], self.start_word)
+                    yield from yield_hyphenated(word[2:], self.start_word + 2)  # the rest is assumed to be a word
+                # check if Italian "dell'" or "nell'"
+                elif lower_word[0:5] in ["dell'", "nell'", 'dell’', 'nell’']:
+                    yield Token(TokenType.ARTICLE, word[0:5], self.start_word)
+                    yield from yield_hyphenated(word[5:], self.start_word + 5)  # the rest is assumed to be a word
+                # check if stopword
+                elif lower_word in self.stopwords:
+                    yield Token(TokenType.STOPWORD, word, self.start_word)
+                # otherwise ...
+                else:
+                    yield from yield_hyphenated(word, self.start_word)
+
+            # yield the remaining symbols, if any
+            if len(end_symbols) > 0:
+                yield Token(TokenType.SYMBOLS, end_symbols, self.pos - len(end_symbols))
+
+            self.next()
+
+        yield EOS_TOKEN
+
+
+def inputs(ltwa_file: str, titles_file: str) -> List[str]:
+    """Patterns of the LTWA (with their dashes, parentheses, etc) and titles (first column of a TSV file)"""
+
+    with open(titles_file) as f:
+        titles = [line.split('\t')[0].strip() for line in f.readlines() if line.strip()]
+
+    return [p.pattern for p in read_ltwa(ltwa_file)] + titles
+
+
+def tokens(lexer: Callable[[str, Collection[str]], Iterable[Token]], inp: str, stopwords: Collection[str]) \
+        -> List[Tuple[TokenType, str, int]]:
+    return [(t.type, t.value, t.position) for t in lexer(normalize(inp, Level.SOFT), stopwords)]
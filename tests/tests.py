@@ -1,9 +1,35 @@
+import asyncio
+import contextlib
+import importlib.util
+import io
+import itertools
+import json
+import pathlib
+import pickle
+import random
+import re
+import tempfile
 import unittest
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from unidecode import unidecode
 
 from pyiso4.lexer import Lexer, TokenType
-from pyiso4.ltwa import Pattern, Abbreviate
-from pyiso4.normalize_string import normalize, Level, number_of_ligatures
+import pyiso4
+from pyiso4 import compiled, mmap_store, script, server
+from pyiso4.automaton import Automaton
+from pyiso4.cache import LRUCache, MISSING
+from pyiso4.dedup import JournalIndex, similarity
+from pyiso4.instrument import CallStats, StatsAggregator
+from pyiso4.lazy import LazyIndex
+from pyiso4.ltwa import Pattern, Abbreviate, AbbreviationError, read_ltwa, read_stopwords
+from pyiso4.normalize_string import normalize, Level, NormalizedString, number_of_ligatures, transliterate, \
+    transliterate_char
+from pyiso4.prefix_tree import KeyFilter, Trie
+from pyiso4.resolve import TitleResolver
+
+from tests import reference_lexer
 
 
 class TestNormalize(unittest.TestCase):
@@ -36,6 +62,27 @@ class TestNormalize(unittest.TestCase):
         self.assertEqual(number_of_ligatures('coeur'), 0)
         self.assertEqual(number_of_ligatures('cœur'), 1)
 
+    def test_transliterate(self) -> None:
+        # same as unidecode, for characters that are in the table and others
+        for text in ['test', 'Straße für Œuvres', 'Ελληνικά', 'Русский', 'a̢b', '東京', 'ǅ ½']:
+            self.assertEqual(transliterate(text), unidecode(text))
+            for c in text:
+                self.assertEqual(transliterate_char(c), unidecode(c))
+
+    def test_normalized_string(self) -> None:
+        for text in ['journal of physics', 'Cœur et Straße', 'Rozporza̢dzeni', 'ﬁn ½', '']:
+            normalized = NormalizedString(text)
+            self.assertEqual(normalized.soft, normalize(text, Level.SOFT))
+            self.assertEqual(normalized.normal, normalize(normalized.soft, Level.NORMAL).lower())
+            self.assertEqual(len(normalized.offsets), len(normalized.soft) + 1)
+
+            # each character of `soft` is at its offset in `normal`
+            for i, c in enumerate(normalized.soft):
+                transliterated = unidecode(c).lower()
+                start = normalized.offsets[i]
+                self.assertEqual(normalized.normal[start:start + len(transliterated)], transliterated)
+                self.assertEqual(normalized.offsets[i + 1], start + len(transliterated))
+
 
 class TestLexer(unittest.TestCase):
     def test_stopword(self) -> None:
@@ -69,6 +116,20 @@ class TestLexer(unittest.TestCase):
         self.assertEqual(tokens[2].type, TokenType.WORD)
         self.assertEqual(tokens[2].value, cpd2)
 
+    def test_same_as_reference(self) -> None:
+        """The lexer gives the same tokens as the previous implementation"""
+
+        stopwords = read_stopwords(pathlib.Path(pyiso4.__file__).parent / 'stopwords.txt')
+        inputs = reference_lexer.inputs('pyiso4/LTWA_20210702.csv', 'tests/tests.tsv') + [
+            '', '  ', 'Journal...', "Physicists' Letters", "l'Institut", "Dell'Arte", 'A.B. Smith', 'Part B',
+            'Series II Mr. Prof', 'İİ.. X', 'Œuvres -- complètes', 'Ser. A: Science, Techno-logie']
+
+        for inp in inputs:
+            self.assertEqual(
+                reference_lexer.tokens(lambda i, s: Lexer(i, s).tokenize(), inp, frozenset(stopwords)),
+                reference_lexer.tokens(lambda i, s: reference_lexer.ReferenceLexer(i, s).tokenize(), inp, stopwords),
+                inp)
+
     def test_surname_as_abbreviation(self) -> None:
         abbrv = 'A.'
         text = 'Legacy of {} Einstein'.format(abbrv)
@@ -112,6 +173,28 @@ class TestPattern(unittest.TestCase):
         self.assertTrue(pattern.match(word + 's'))  # plural form
         self.assertFalse(pattern.match(word + 'x'))  # not an inflexion
 
+    def test_pattern_match_suffix(self) -> None:
+        pattern = Pattern.from_line('-book\t-b.\teng')
+        self.assertEqual(pattern.match_suffix('yearbook'), 4)
+        self.assertEqual(pattern.match_suffix('yearbooks'), 4)  # inflection
+        self.assertEqual(pattern.match_suffix('yearbookx'), -1)  # x is not an inflection!
+        self.assertEqual(pattern.match_suffix('book'), -1)  # not a compound word
+        self.assertEqual(pattern.match_suffix('bookmark'), -1)
+
+        # too short to be a compound word
+        self.assertEqual(Pattern.from_line('-ton\t-t.\teng').match_suffix('baton'), -1)
+        self.assertEqual(Pattern.from_line('-ton\t-t.\teng').match_suffix('newtons'), -1)
+
+        # only the word at `position` is matched
+        sentence = 'the yearbooks and the bookmarks'
+        self.assertTrue(pattern.match(sentence, position=4))
+        self.assertFalse(pattern.match(sentence, position=22))
+        self.assertTrue(pattern.match('yearbook-x'))
+        self.assertFalse(pattern.match('yearbookx yearbook'))
+
+        # a dash at both ends is not supported
+        self.assertEqual(Pattern.from_line('-graph-\t-gr.\teng').match_suffix('photographic'), -1)
+
     def test_patter_match_on_sentence(self) -> None:
         # no dash
         text = 'abc'
@@ -129,6 +212,196 @@ class TestPattern(unittest.TestCase):
         pattern_with_space = Pattern.from_line('{}\tu.k.\ten'.format(text))
         self.assertTrue(pattern_with_space.match('{} of of Great Britain and Northern Ireland'.format(text)))
 
+    def test_pattern_match_at_position(self) -> None:
+        pattern = Pattern.from_line('rabbit\tx\tmul')
+        sentence = 'the rabbits and the rabbitx'
+        for position in range(len(sentence)):
+            self.assertEqual(pattern.match(sentence, position=position), pattern.match(sentence[position:]))
+
+        self.assertTrue(pattern.match(sentence, position=4))
+        self.assertFalse(pattern.match(sentence, position=20))
+
+    def test_pattern_languages(self) -> None:
+        pattern = Pattern('rabbit', 'rab.', ['eng', 'fre'])
+        self.assertEqual(pattern.langs, ['eng', 'fre'])
+        self.assertTrue(pattern.match_languages(['fre']))
+        self.assertFalse(pattern.match_languages(['ger']))
+        self.assertFalse(pattern.match_languages([]))
+
+        self.assertTrue(Pattern('rabbit', 'rab.', ['mul']).match_languages(['ger']))
+        self.assertFalse(Pattern('rabbit', 'rab.', ['ger']).match_languages(['mul']))
+
+        # patterns are small
+        self.assertFalse(hasattr(pattern, '__dict__'))
+        self.assertEqual(pickle.loads(pickle.dumps(pattern)), pattern)
+
+
+class TestTrie(unittest.TestCase):
+    def test_search(self) -> None:
+        random.seed(42)
+        keys = [''.join(random.choice('abc') for _ in range(random.randint(1, 6))) for _ in range(200)]
+
+        trie = Trie()
+        for i, key in enumerate(keys):
+            trie.insert(key, (key, i))
+
+        for _ in range(100):
+            word = ''.join(random.choice('abc') for _ in range(random.randint(0, 8)))
+
+            # exactly the keys that are prefix of `word`, shortest first then in order of insertion
+            expected = sorted(((k, i) for i, k in enumerate(keys) if word.startswith(k)), key=lambda x: len(x[0]))
+            self.assertEqual(trie.search(word), expected)
+
+            # ... or longest first, still in order of insertion
+            self.assertEqual(
+                list(trie.search_longest_first(word)), sorted(expected, key=lambda x: len(x[0]), reverse=True))
+
+    def test_search_languages(self) -> None:
+        # (languages come from the `langs_mask` of the objects)
+        trie = Trie()
+        for pattern, replacement, langs in [
+                ('ab', 'ab (eng)', ['eng']), ('ab', 'ab (mul)', ['mul']), ('abc', 'abc (fre, ger)', ['fre', 'ger']),
+                ('abcd', 'abcd (mul)', ['mul'])]:
+            trie.insert(pattern, Pattern(pattern, replacement, langs))
+
+        def replacements(patterns: Iterable[Pattern]) -> List[str]:
+            return [p.replacement for p in patterns]
+
+        self.assertEqual(replacements(trie.search('abcde', ['eng'])), ['ab (eng)', 'ab (mul)', 'abcd (mul)'])
+        self.assertEqual(
+            replacements(trie.search('abcde', ['ger', 'xxx'])), ['ab (mul)', 'abc (fre, ger)', 'abcd (mul)'])
+        self.assertEqual(replacements(trie.search('abcde', [])), ['ab (mul)', 'abcd (mul)'])
+        self.assertEqual(
+            replacements(trie.search('abcde')), ['ab (eng)', 'ab (mul)', 'abc (fre, ger)', 'abcd (mul)'])
+
+        self.assertEqual(
+            replacements(trie.search_longest_first('abcde', ['eng'])), ['abcd (mul)', 'ab (eng)', 'ab (mul)'])
+        self.assertEqual(replacements(trie.search_longest_first('abcde', [])), ['abcd (mul)', 'ab (mul)'])
+
+        # nodes of the keys with objects in these languages
+        self.assertEqual([replacements(node.objs) for node in trie.path('abcde', ['eng'])], [
+            ['ab (eng)', 'ab (mul)'], ['abcd (mul)']])
+        self.assertEqual(len(trie.path('abcde')), 3)
+        self.assertEqual(trie.path('b'), [])
+
+    def test_updated(self) -> None:
+        random.seed(42)
+        keys = [''.join(random.choice('abc') for _ in range(random.randint(1, 6))) for _ in range(200)]
+        langs = [random.choice([['eng'], ['fre'], ['mul']]) for _ in keys]
+        words = [''.join(random.choice('abc') for _ in range(random.randint(0, 8))) for _ in range(100)]
+
+        trie = Trie()
+        for i, (key, lgs) in enumerate(zip(keys, langs)):
+            trie.insert(key, Pattern(key, str(i), lgs))
+
+        before = [trie.search(word, ['eng']) for word in words]
+
+        # remove half of the objects, and add some others
+        removed = list(range(0, 200, 2))
+        added = [(''.join(random.choice('abcd') for _ in range(random.randint(1, 6))), i) for i in range(200, 250)]
+        updated = trie.updated(
+            [(key, Pattern(key, str(i), ['ger'])) for key, i in added],
+            [(keys[i], Pattern(keys[i], str(i), langs[i])) for i in removed])
+
+        expected = Trie()
+        for i, (key, lgs) in enumerate(zip(keys, langs)):
+            if i % 2 == 1:
+                expected.insert(key, Pattern(key, str(i), lgs))
+        for key, i in added:
+            expected.insert(key, Pattern(key, str(i), ['ger']))
+
+        for word in words + [key for key, _ in added]:
+            self.assertEqual(updated.search(word), expected.search(word))
+            for search_langs in [['eng'], ['ger'], ['fre', 'ger']]:
+                self.assertEqual(updated.search(word, search_langs), expected.search(word, search_langs))
+
+        self.assertEqual(
+            sorted((key, p.replacement) for key, p in updated.items()),
+            sorted((key, p.replacement) for key, p in expected.items()))
+
+        # the original trie is left untouched
+        self.assertEqual([trie.search(word, ['eng']) for word in words], before)
+
+        with self.assertRaises(KeyError):
+            trie.updated(removed=[('abc', 'not there')])
+
+    def test_pickle(self) -> None:
+        trie = Trie()
+        for key in ['abc', 'abd', 'ab', 'x']:
+            trie.insert(key, key)
+
+        unpickled = pickle.loads(pickle.dumps(trie))
+        self.assertEqual(unpickled.search('abcd'), ['ab', 'abc'])
+
+        # masks are computed again from the objects (since the bits of the languages depend on the process)
+        trie.insert('abcd', Pattern('abcd', 'x', ['eng']))
+        unpickled = pickle.loads(pickle.dumps(trie))
+        self.assertEqual(unpickled.root.mask, trie.root.mask)
+        self.assertEqual([p.replacement for p in unpickled.search('abcde', ['eng'])[2:]], ['x'])
+        self.assertEqual(unpickled.search('abcde', ['fre']), ['ab', 'abc'])
+
+    def test_key_filter(self) -> None:
+        random.seed(42)
+        keys = [''.join(random.choice('abcd') for _ in range(random.randint(2, 6))) for _ in range(100)]
+        key_filter = KeyFilter(keys, length=4)
+
+        rejected = 0
+        for _ in range(1000):
+            word = ''.join(random.choice('abcde') for _ in range(random.randint(0, 8)))
+
+            # never rejects a word that a key starts
+            if any(word.startswith(key) for key in keys):
+                self.assertTrue(key_filter.may_match(word))
+                self.assertTrue(key_filter.may_match('x' + word, 1))
+            elif not key_filter.may_match(word):
+                rejected += 1
+
+        self.assertGreater(rejected, 100)
+        self.assertFalse(KeyFilter([]).may_match('abc'))
+
+
+class TestAutomaton(unittest.TestCase):
+    def test_scan(self) -> None:
+        random.seed(42)
+        keys = [''.join(random.choice('abc') for _ in range(random.randint(1, 5))) for _ in range(100)]
+        automaton = Automaton((key, i) for i, key in enumerate(keys))
+
+        for _ in range(50):
+            text = ''.join(random.choice('abcd') for _ in range(random.randint(0, 20)))
+
+            expected = []
+            for end in range(len(text) + 1):
+                for start in range(end):  # longest first
+                    objs = [i for i, key in enumerate(keys) if key == text[start:end]]
+                    if objs:
+                        expected.append((start, end, objs))
+
+            self.assertEqual(list(automaton.scan(text)), expected)
+
+    def test_empty_key(self) -> None:
+        with self.assertRaises(ValueError):
+            Automaton([('a', 1), ('', 2)])
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_cache(self) -> None:
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'b' is now the least recently used
+
+        cache.put('c', 3)
+        self.assertIs(cache.get('b'), MISSING)
+        self.assertEqual(cache.get('c'), 3)
+
+        stats = cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.evictions, stats.size), (2, 1, 1, 2))
+
+        # disabled
+        cache = LRUCache(0)
+        cache.put('a', 1)
+        self.assertIs(cache.get('a'), MISSING)
+
 
 class TestAbbreviate(unittest.TestCase):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
@@ -140,3 +413,1020 @@ class TestAbbreviate(unittest.TestCase):
             for line in f.readlines():
                 fields = line.split('\t')
                 self.assertEqual(fields[1].strip(), self.abbreviate(fields[0].strip(), remove_part=True))
+
+    def test_transliterated_characters(self) -> None:
+        # words that come after a character which is transliterated into zero or more characters are found
+        self.assertEqual(self.abbreviate('Straßenbau Journal of Physics'), 'Straßenbau J. Phys.')
+        self.assertEqual(self.abbreviate('Rozporza\u0322dzeni Esōterikos'), 'Rozporza\u0322dz. Esōter.')
+        self.assertEqual(self.abbreviate('Cœur et Vaisseaux'), 'Cœur Vaiss.')
+
+    def test_expand(self) -> None:
+        self.assertEqual([p.pattern for p in self.abbreviate.expand('Polym.')], ['polymer-'])
+        self.assertEqual(self.abbreviate.expand('POLYM'), self.abbreviate.expand('polym.'))
+        self.assertEqual([p.pattern for p in self.abbreviate.expand('U. K.')], ['united kingdom'])
+        self.assertEqual(self.abbreviate.expand('Physics'), [])
+
+        # every pattern is found back from its replacement
+        patterns = self.abbreviate.expand('Sci.')
+        self.assertEqual(set(p.replacement.lower() for p in patterns), {'sci.'})
+        self.assertEqual(
+            [p for p in patterns if p.match_languages(['eng'])], self.abbreviate.expand('Sci.', langs=['eng']))
+        for pattern in patterns:
+            self.assertEqual(self.abbreviate.abbreviate_word(pattern.to_key()).lower(), 'sci.')
+
+        self.assertEqual(self.abbreviate.abbreviate_word('Physics'), 'phys.')
+        self.assertEqual(self.abbreviate.abbreviate_word('of'), 'of')
+
+    def test_suffixes(self) -> None:
+        # every pattern of the LTWA that starts with a dash abbreviates the end of compound words
+        suffix_patterns = [
+            p for p in read_ltwa(pathlib.Path(pyiso4.__file__).parent / 'LTWA_20210702.csv')
+            if p.start_with_dash and not p.end_with_dash]
+        self.assertGreater(len(suffix_patterns), 150)
+
+        for pattern in suffix_patterns:
+            key = pattern.to_key()
+            langs = pattern.langs or None  # (some patterns have no language)
+            replacements = [
+                p.replacement for p in suffix_patterns
+                if p.to_key() == key and (langs is None or p.match_languages(langs))]
+            for word in ['qqqq' + key, 'Qqqq' + key + 's']:
+                found = self.abbreviate._search_matches(Pattern.normalize(word), langs)
+                self.assertIn(pattern.replacement, [p.replacement for p in found if p.to_key() == key], word)
+
+                abbreviation = self.abbreviate.abbreviate_word(word, langs)
+                self.assertIn(abbreviation, [
+                    word if r == '-' else word[:4] + r.lstrip('-') for r in replacements], word)
+
+            # not after a short word
+            for word in [key, 'q' + key, 'qqq' + key + 's']:
+                self.assertNotIn(pattern, self.abbreviate._search_matches(word, langs), word)
+
+        # in titles, the beginning of the word keeps its case, and the end is capitalized as the word was
+        self.assertEqual(self.abbreviate('Nordic Yearbooks of Physics'), 'Nord. Yearb. Phys.')
+        self.assertEqual(self.abbreviate('NORDIC YEARBOOK OF PHYSICS'), 'NORD. YEARB. PHYS.')
+        self.assertEqual(self.abbreviate('Forschungsbetrieb und Praxis'), 'Forschungsbetr. Prax.')
+        self.assertEqual(self.abbreviate('Kinderbuch-Forschung'), 'Kinderb.-Forsch.')
+        self.assertEqual(self.abbreviate('Straßenbestand und Praxis'), 'Straßenbestand Prax.')  # n.a.
+
+        # short words and place names are not taken for compound words
+        for title, abbreviated in [
+                ('Journal of Baton', 'J. Baton'), ('Boston Studies', 'Boston Stud.'),
+                ('Newtons Letters', 'Newtons Lett.'), ('Eton Journal', 'Eton J.'), ('Galway Archive', 'Galway Arch.')]:
+            self.assertEqual(self.abbreviate(title), abbreviated)
+
+        # patterns that start with the word come first
+        self.assertEqual(self.abbreviate.abbreviate_word('Flensburg'), 'Flensbg.')
+
+        # same results with the automaton
+        titles = ['Nordic Yearbooks of Physics', 'Forschungsbetrieb und Praxis', 'Kinderbuch-Forschung']
+        expected = [self.abbreviate(title, langs=['eng', 'ger']) for title in titles]
+        self.abbreviate.use_automaton()
+        self.assertEqual([self.abbreviate(title, langs=['eng', 'ger']) for title in titles], expected)
+        self.abbreviate.use_automaton(False)
+
+    def test_cache(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles, expected = zip(*(line.strip().split('\t') for line in f.readlines()))
+
+        self.abbreviate.set_cache(title_cache_size=10, word_cache_size=20)
+        for _ in range(2):
+            self.assertEqual([self.abbreviate(title) for title in titles], list(expected))
+
+        stats = self.abbreviate.cache_stats()
+        self.assertEqual(stats['title'].size, 10)
+        self.assertGreater(stats['word'].hits, 0)
+        self.assertGreater(stats['word'].evictions, 0)
+
+        # first word is the only one that matters (except if a pattern contains a space)
+        self.assertEqual(self.abbreviate._window('journal of physics'), 'journal ')
+        self.assertEqual(self.abbreviate._window('united kingdom'), 'united kingdom')
+
+    def test_abbreviate_array(self) -> None:
+        titles = ['Journal of Physics', None, 'Acta Crystallographica', 'Journal of Physics']
+        expected = ['J. Phys.', None, 'Acta Crystallogr.', 'J. Phys.']
+
+        calls: List[CallStats] = []
+        self.abbreviate.add_observer(calls.append)
+        self.assertEqual(self.abbreviate.abbreviate_array(titles), expected)
+        self.assertEqual(len(calls), 2)  # each title once
+        self.abbreviate.remove_observer(calls.append)
+
+        self.assertEqual(self.abbreviate.abbreviate_array(iter(titles)), expected)
+        self.assertEqual(self.abbreviate.abbreviate_array([]), [])
+
+    @unittest.skipUnless(importlib.util.find_spec('pandas'), 'requires pandas')
+    def test_abbreviate_array_pandas(self) -> None:
+        import pandas
+
+        titles = ['Journal of Physics', None, 'Acta Crystallographica', 'Journal of Physics']
+        expected = ['J. Phys.', None, 'Acta Crystallogr.', 'J. Phys.']
+
+        series = pandas.Series(titles, index=[4, 3, 2, 1], name='title', dtype=object)
+        result = self.abbreviate.abbreviate_array(series)
+        self.assertEqual(result.to_list(), expected)
+        self.assertEqual(result.index.to_list(), [4, 3, 2, 1])
+        self.assertEqual(result.name, 'title')
+
+        result = self.abbreviate.abbreviate_array(pandas.Series(titles, dtype='string'))
+        self.assertEqual(result.dtype, 'string')
+        self.assertTrue(result.isna()[1])
+        self.assertEqual(result[2], 'Acta Crystallogr.')
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'requires pyarrow')
+    def test_abbreviate_array_arrow(self) -> None:
+        import pyarrow
+
+        titles = ['Journal of Physics', None, 'Acta Crystallographica', 'Journal of Physics']
+        expected = ['J. Phys.', None, 'Acta Crystallogr.', 'J. Phys.']
+
+        result = self.abbreviate.abbreviate_array(pyarrow.array(titles))
+        self.assertEqual(result.to_pylist(), expected)
+        self.assertEqual(result.type, pyarrow.string())
+
+        chunked = pyarrow.chunked_array([titles[:2], titles[2:]], pyarrow.large_string())
+        result = self.abbreviate.abbreviate_array(chunked)
+        self.assertEqual(result.to_pylist(), expected)
+        self.assertEqual(result.type, pyarrow.large_string())
+
+    def test_update(self) -> None:
+        physics = Pattern.from_line('physics\tphys.\teng')
+        new_physics = Pattern.from_line('physics\tphysx.\teng')
+
+        self.abbreviate.set_cache()
+        self.assertEqual(self.abbreviate('Journal of Physics'), 'J. Phys.')
+        previous_prefix = self.abbreviate.ltwa_prefix
+
+        self.abbreviate.update([new_physics], [physics])  # replace
+        self.assertEqual(self.abbreviate('Journal of Physics'), 'J. Physx.')  # (not from the cache)
+        self.assertEqual([p.replacement for p in previous_prefix.search('physics')], ['phys.'])  # not modified
+
+        self.abbreviate.update(removed=[new_physics])
+        self.assertEqual(self.abbreviate('Journal of Physics'), 'J. Physics')
+
+        self.abbreviate.update(added=[physics])
+        self.assertEqual(self.abbreviate('Journal of Physics'), 'J. Phys.')
+
+        # nothing changes if a pattern is not found
+        with self.assertRaises(KeyError):
+            self.abbreviate.update([new_physics], [Pattern.from_line('physics\tphys.\tfre')])
+        self.assertEqual(self.abbreviate('Journal of Physics'), 'J. Phys.')
+
+        # with the automaton
+        self.abbreviate.use_automaton()
+        self.abbreviate.update([new_physics], [physics])
+        self.assertEqual(self.abbreviate('Journal of Physics'), 'J. Physx.')
+
+    def test_word_table(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles = [line.split('\t')[0].strip() for line in f.readlines()]
+
+        titles.extend(['Nordic Yearbooks of Physics', 'United Kingdom Journal', 'Yearbook of the United Kingdom'])
+        all_langs = [None, ['eng'], ['fre', 'ger'], [], ['xyz']]
+        expected = [[self.abbreviate(title, langs=langs) for title in titles] for langs in all_langs]
+
+        # words of the titles, and keys without inflection (faster to build than the default)
+        words = [word for title in titles for word in title.split()]
+        self.assertGreater(self.abbreviate.build_word_table(inflections=[''], words=words), 50000)
+        self.assertEqual([[self.abbreviate(title, langs=langs) for title in titles] for langs in all_langs], expected)
+
+        table = self.abbreviate._word_table
+        assert table is not None
+        for word in ['physics', 'yearbooks']:
+            for langs in all_langs:
+                matches = self.abbreviate._search_matches(word, langs)
+                self.assertEqual(self.abbreviate._best_pattern(word, langs), matches[0] if matches else None)
+        self.assertNotIn('united', table[1])  # (start of `united kingdom`)
+
+        stats = StatsAggregator()
+        self.abbreviate.add_observer(stats)
+        self.abbreviate('Journal of Physics')
+        self.abbreviate.remove_observer(stats)
+        self.assertEqual(stats.word_table_hits, 2)
+
+        # saved with the index
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'ltwa.idx'
+            self.abbreviate.save(path)
+            loaded = Abbreviate.load(path)
+            self.assertEqual(loaded._word_table, table)
+            self.assertEqual([loaded(title) for title in titles], expected[0])
+
+        # updated with the patterns
+        physics = Pattern.from_line('physics\tphys.\teng')
+        new_physics = Pattern.from_line('physics\tphysx.\teng')
+        self.abbreviate.update([new_physics], [physics])
+        self.assertEqual(self.abbreviate('Journal of Physics'), 'J. Physx.')
+        self.assertEqual(self.abbreviate('Journal of Physicsen'), 'J. Physx.')  # new word
+
+        self.abbreviate.update([Pattern.from_line('physics letters\tphys. lett.\teng')])
+        self.assertNotIn('physics', self.abbreviate._word_table[1])  # type: ignore
+        with_table = [self.abbreviate(title) for title in ['Journal of Physics', 'Journal of Physics Letters']]
+
+        self.abbreviate.drop_word_table()
+        self.assertIsNone(self.abbreviate._word_table)
+        self.assertEqual([self.abbreviate(title) for title in ['Journal of Physics', 'Journal of Physics Letters']],
+                         with_table)
+
+    def test_key_filters(self) -> None:
+        titles = ['Journal of Physics', 'Zhang Wiley Letters', 'Kyoto IEEE Transactions', 'Psychologies Smith-Jones',
+                  'Annals of the Nakamura Institute', 'Tetrahydrofuran Reports']
+        with open('tests/tests.tsv') as f:
+            titles.extend(line.split('\t')[0].strip() for line in f.readlines())
+
+        words = ['zhang', 'kyoto', 'ieee', 'physics', 'psychologies', 'tetrahydrofuran', 'united kingdom', 'a', '']
+        all_langs = [None, ['eng'], ['fre', 'ger']]
+
+        # only built when enabled
+        self.assertIsNone(Abbreviate.create()._filters)
+
+        self.abbreviate.use_key_filters(False)
+        expected = [self.abbreviate(title) for title in titles]
+        expected_matches = [[self.abbreviate._search_matches(word, langs) for word in words] for langs in all_langs]
+
+        self.abbreviate.use_key_filters()
+        self.assertEqual([self.abbreviate(title) for title in titles], expected)
+        self.assertEqual(
+            [[self.abbreviate._search_matches(word, langs) for word in words] for langs in all_langs], expected_matches)
+
+        stats = StatsAggregator()
+        self.abbreviate.add_observer(stats)
+        self.abbreviate('Zhang Wiley Letters')
+        self.abbreviate.remove_observer(stats)
+        self.assertGreater(stats.filtered, 0)
+        self.assertGreaterEqual(stats.filter_checks, stats.filtered)
+
+        # rebuilt by updates
+        self.abbreviate.update([Pattern.from_line('zhang\tzh.\tmul')])
+        self.assertEqual(self.abbreviate('Zhang Wiley Letters'), 'Zh. Wiley Lett.')
+
+        # saved with the index
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'ltwa.idx'
+            self.abbreviate.save(path)
+            loaded = Abbreviate.load(path)
+            assert loaded._filters is not None
+            self.assertIs(loaded._filters[0], loaded._indexes)
+            self.assertEqual(loaded('Zhang Wiley Letters'), 'Zh. Wiley Lett.')
+
+    def test_search_best(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles = [line.split('\t')[0].strip() for line in f.readlines()]
+
+        # the beginning of each word of the titles, and words with (or without) an ending dash pattern
+        sentences = ['physics', 'physical chemistry', 'polymer', 'polymerization', 'united kingdom', 'zhang', '']
+        for title in titles:
+            normalized = NormalizedString(title).normal
+            sentences.extend(normalized[m.end():] for m in re.finditer(r'(^|\s)', normalized))
+
+        for langs in [None, ['eng'], ['fre', 'ger'], []]:
+            for sentence in sentences:
+                matches = self.abbreviate._search_matches(sentence, langs)
+                self.assertEqual(self.abbreviate._search_best(sentence, langs), matches[0] if matches else None)
+
+    def test_regexes(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles = [line.split('\t')[0].strip() for line in f.readlines()]
+
+        # inflections, boundaries, and the end of the sentence after a key, or a dash pattern in a longer word
+        sentences = ['physics', 'physics.', 'physicses', "physic'", 'physics\u2014letters', 'physicsx', 'polymer-based',
+                     'polymerization', 'united kingdom', 'united kingdoms', 'zhang', '']
+        for title in titles:
+            normalized = NormalizedString(title).normal
+            sentences.extend(normalized[m.end():] for m in re.finditer(r'(^|\s)', normalized))
+
+        # each candidate alone matches like `Pattern.match()`
+        for sentence in sentences:
+            for pattern in self.abbreviate.ltwa_prefix.search(sentence):
+                regex, _ = Abbreviate._compile_regex([pattern])
+                self.assertEqual(regex.match(sentence) is not None, pattern.match(sentence), (pattern, sentence))
+
+        # ... and all of them give the best one
+        self.abbreviate.use_regexes()
+        for langs in [None, ['eng'], ['fre', 'ger'], []]:
+            for sentence in sentences:
+                matches = self.abbreviate._search_matches(sentence, langs)
+                self.assertEqual(self.abbreviate._search_best(sentence, langs), matches[0] if matches else None)
+
+        self.assertGreater(self.abbreviate.cache_stats()['regex'].hits, 0)
+
+        # recompiled after updates
+        self.abbreviate.update([Pattern.from_line('physics\tphysx.\tmul')], [Pattern.from_line('physics\tphys.\teng')])
+        self.assertEqual(self.abbreviate('Journal of Physics'), 'J. Physx.')
+        self.assertIs(self.abbreviate._regexes[0], self.abbreviate.ltwa_prefix)  # type: ignore
+
+        self.abbreviate.use_regexes(False)
+        self.assertNotIn('regex', self.abbreviate.cache_stats())
+
+    def test_update_concurrent(self) -> None:
+        physics = Pattern.from_line('physics\tphys.\teng')
+        new_physics = Pattern.from_line('physics\tphysx.\teng')
+        self.abbreviate.set_cache()
+
+        def abbreviate(_: int) -> str:
+            return self.abbreviate('Journal of Physics')
+
+        with ThreadPoolExecutor(4) as executor:
+            results = executor.map(abbreviate, range(2000))
+            for _ in range(20):
+                self.abbreviate.update([new_physics], [physics])
+                physics, new_physics = new_physics, physics
+
+            self.assertEqual(set(results) - {'J. Phys.', 'J. Physx.'}, set())
+
+    def test_update_from_ltwa(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles = [line.split('\t')[0].strip() for line in f.readlines()]
+
+        with tempfile.TemporaryDirectory() as directory:
+            old_file = pathlib.Path(directory) / 'old.csv'
+            new_file = pathlib.Path(directory) / 'new.csv'
+
+            with (pathlib.Path(pyiso4.__file__).parent / 'LTWA_20210702.csv').open() as f:
+                lines = f.readlines()
+
+            old_file.write_text(''.join(lines))
+
+            changed = [line for line in lines if not line.startswith(('journal\t', 'physics\t'))]
+            changed.append('physics\tphysx.\teng\n')
+            changed.append('-logy\t-log.\teng\n')
+            new_file.write_text(''.join(changed))
+
+            abbreviate = Abbreviate.create(old_file)
+            added, removed = abbreviate.update_from_ltwa(old_file, new_file)
+            self.assertEqual([p.pattern for p in added], ['physics', '-logy'])
+            self.assertEqual([p.pattern for p in removed], ['journal', 'physics'])
+
+            expected = Abbreviate.create(new_file)
+            self.assertEqual([abbreviate(title) for title in titles], [expected(title) for title in titles])
+            self.assertEqual(abbreviate('Journal of Physics'), 'Journal Physx.')
+
+    def test_automaton(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles = [line.split('\t')[0].strip() for line in f.readlines()]
+
+        titles.append('Œuvres complètes de Lavoisier')  # ligature
+        titles.append(' '.join(titles))  # long title
+
+        for langs in [None, ['eng'], ['fre', 'ger']]:
+            self.abbreviate.use_automaton(False)
+            expected = [self.abbreviate(title, langs=langs) for title in titles]
+            self.abbreviate.use_automaton()
+            self.assertEqual([self.abbreviate(title, langs=langs) for title in titles], expected)
+
+        # same stats as well
+        for enabled in [False, True]:
+            self.abbreviate.use_automaton(enabled)
+            calls: List[CallStats] = []
+            self.abbreviate.add_observer(calls.append)
+            self.abbreviate('Journal of Polymer Science')
+            self.abbreviate.remove_observer(calls.append)
+            self.assertEqual((calls[0].lookups, calls[0].accepted), (3, 3))
+            self.assertEqual([p.replacement for p in calls[0].patterns], ['j.', 'polym.', 'sci.'])
+
+    def test_languages(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles = [line.split('\t')[0] for line in f.readlines()]
+
+        # only load some languages
+        langs = ['eng', 'fre']
+        abbreviate = Abbreviate.create(langs=langs)
+        for title in titles:
+            self.assertEqual(abbreviate(title, langs=langs), self.abbreviate(title, langs=langs))
+
+        self.assertEqual(abbreviate('Journal für Geschichte', langs=langs), 'J. Geschichte')
+        self.assertEqual(self.abbreviate('Journal für Geschichte', langs=['eng', 'ger']), 'J. Gesch.')
+
+    def test_observers(self) -> None:
+        calls: List[CallStats] = []
+        aggregator = StatsAggregator()
+        self.abbreviate.add_observer(calls.append)
+        self.abbreviate.add_observer(aggregator)
+
+        self.assertEqual(self.abbreviate('Journal of Polymer Science'), 'J. Polym. Sci.')
+        self.assertEqual(len(calls), 1)
+
+        stats = calls[0]
+        self.assertEqual(stats.tokens, 5)  # including EOS
+        self.assertEqual(stats.lookups, 3)
+        self.assertGreaterEqual(stats.candidates, stats.accepted)
+        self.assertEqual([p.replacement for p in stats.patterns], ['j.', 'polym.', 'sci.'])
+        self.assertGreater(stats.total, 0)
+        self.assertLessEqual(sum(stats.timings.values()), stats.total)
+
+        # cache
+        self.abbreviate.set_cache()
+        self.abbreviate('Journal of Polymer Science')
+        self.abbreviate('Journal of Polymer Science')
+        self.assertTrue(calls[-1].title_cache_hit)
+
+        summary = aggregator.summary()
+        self.assertEqual(summary['calls'], 3)
+        self.assertEqual(summary['title_cache_hits'], 1)
+        self.assertEqual(summary['lookups'], 6)
+
+        # observers are not pickled
+        self.assertEqual(pickle.loads(pickle.dumps(self.abbreviate))('Journal of Physics'), 'J. Phys.')
+        self.assertEqual(len(calls), 3)
+
+        # no more calls
+        self.abbreviate.remove_observer(calls.append)
+        self.abbreviate.remove_observer(aggregator)
+        self.abbreviate('Journal of Physics')
+        self.assertEqual(len(calls), 3)
+
+    def test_threads(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles, expected = zip(*(line.strip().split('\t') for line in f.readlines()))
+
+        # small caches, so that there are a lot of evictions
+        self.abbreviate.set_cache(title_cache_size=5, word_cache_size=10)
+
+        def work(seed: int) -> List[Tuple[str, str]]:
+            r = random.Random(seed)
+            indices = [r.randrange(len(titles)) for _ in range(500)]
+            return [(expected[i], self.abbreviate(titles[i])) for i in indices]
+
+        with ThreadPoolExecutor(8) as executor:
+            for results in executor.map(work, range(16)):
+                for exp, result in results:
+                    self.assertEqual(exp, result)
+
+    def test_async(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles, expected = zip(*(line.strip().split('\t') for line in f.readlines()))
+
+        async def work() -> List[List[str]]:
+            return await asyncio.gather(*(self.abbreviate.abbreviate_many_async(titles) for _ in range(4)))
+
+        for results in asyncio.run(work()):
+            self.assertEqual(results, list(expected))
+
+    def test_abbreviate_many(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles, expected = zip(*(line.strip().split('\t') for line in f.readlines()))
+
+        # sequential
+        self.assertEqual(self.abbreviate.abbreviate_many(titles), list(expected))
+
+        # with workers, from a generator: results come in the same order
+        results = self.abbreviate.iter_abbreviate_many((t for t in titles), workers=2, chunksize=7)
+        self.assertEqual(list(results), list(expected))
+
+    def test_abbreviate_many_errors(self) -> None:
+        abbreviate = FailingAbbreviate(self.abbreviate.ltwa_prefix, self.abbreviate.ltwa_suffix, ['of'])
+        titles = ['Journal of Physics', 'Failing Journal', 'Journal of Chemistry']
+
+        for workers in [1, 2]:
+            # the error gives the title
+            with self.assertRaisesRegex(AbbreviationError, 'Failing Journal') as context:
+                abbreviate.abbreviate_many(titles, workers=workers)
+            self.assertEqual(context.exception.title, 'Failing Journal')
+
+            # ... or the batch goes on
+            errors: List[AbbreviationError] = []
+
+            def on_error(error: AbbreviationError) -> str:
+                errors.append(error)
+                return error.title
+
+            results = abbreviate.abbreviate_many(titles, workers=workers, chunksize=1, on_error=on_error)
+            self.assertEqual(results, ['J. Phys.', 'Failing Journal', 'J. Chem.'])
+            self.assertEqual([e.title for e in errors], ['Failing Journal'])
+
+    def test_replacement_longer_than_title(self) -> None:
+        # the period of `stress.` goes past the end of the title
+        self.assertEqual(self.abbreviate('Nyckeltalal of stress'), 'Nyckeltalal stress.')
+        self.assertEqual(self.abbreviate('Journal of Stress'), 'J. Stress.')
+
+
+class FailingAbbreviate(Abbreviate):
+    """Fails on the titles that start with ``Failing``"""
+
+    def __call__(self, title: str, remove_part: bool = True, langs: Optional[List[str]] = None) -> str:
+        if title.startswith('Failing'):
+            raise RuntimeError('failed')
+
+        return super().__call__(title, remove_part, langs)
+
+
+class TestResolve(unittest.TestCase):
+    def test_resolve(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles, abbreviations = zip(*(line.strip().split('\t') for line in f.readlines()))
+
+        abbreviate = Abbreviate.create()
+        resolver = TitleResolver(abbreviate, titles)
+        self.assertEqual(len(resolver), len(titles))
+
+        for title, abbreviation in zip(titles, abbreviations):
+            candidates = resolver.resolve(abbreviation)
+            self.assertEqual(candidates[0].title, title)
+            self.assertAlmostEqual(candidates[0].score, 1.)
+            self.assertEqual(candidates, sorted(candidates, key=lambda c: -c.score))
+
+        # without periods, with stopwords, or (partly) not abbreviated
+        for query in ['J Chem Phys A', 'J. of Chem. Phys. A', 'Journal of Chem. Physics A']:
+            self.assertEqual(resolver.resolve(query, 1), [(23, 'Journal of Chemical Physics A', 1.)])
+
+        # partial matches get lower scores
+        candidates = resolver.resolve('J. Chem. Phys.', min_score=.5)
+        self.assertEqual(candidates[0].title, 'Journal of Chemical Physics A')
+        self.assertTrue(all(.5 <= c.score < 1. for c in candidates))
+
+        self.assertEqual(resolver.resolve(''), [])
+        self.assertEqual(resolver.resolve('Unrelated'), [])
+
+        # with few candidates, the titles that contain all the (rarest) words are kept
+        resolver.max_candidates = 1
+        self.assertEqual(resolver.resolve('J. Chem. Phys. A', 1)[0].title, 'Journal of Chemical Physics A')
+
+
+class TestDedup(unittest.TestCase):
+    def test_index(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles, abbreviations = zip(*(line.strip().split('\t') for line in f.readlines()))
+
+        abbreviate = Abbreviate.create()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'journals.db'
+            with open(pathlib.Path(directory) / 'titles.txt', 'w') as f:
+                f.write('\n'.join(titles) + '\n\n')
+
+            with JournalIndex(abbreviate, path) as index:
+                self.assertEqual(index.add_file(pathlib.Path(directory) / 'titles.txt'), len(titles))
+
+            # reopen the database
+            with JournalIndex(abbreviate, path) as index:
+                self.assertEqual(len(index), len(titles))
+
+                # a title, its abbreviation, or something close enough is found
+                for title, abbreviation in zip(titles, abbreviations):
+                    for query in [title, abbreviation, abbreviation.replace('.', ' ').upper()]:
+                        self.assertIn(title, [journal.title for journal in index.lookup(query)])
+
+                self.assertEqual(index.lookup('Unrelated'), [])
+
+                results = index.similar('Journal of Chemical Physics', .8)
+                self.assertIn('Journal of Chemical Physics A', [journal.title for journal, _ in results])
+                self.assertEqual(results, sorted(results, key=lambda r: -r[1]))
+                self.assertTrue(all(.8 <= score < 1. for _, score in results))
+
+                # no duplicates yet, then a near-duplicate and an exact one
+                self.assertEqual(list(index.duplicates(.9)), [])
+
+                index.add('Journal of Chemical Physic A')
+                index.add('J. Chem. Phys. A')
+                duplicates = list(index.duplicates(.6))
+                self.assertIn(('j chem phys a', 'j chem physic a', similarity('j chem phys a', 'j chem physic a')),
+                              duplicates)
+                self.assertIn(('j chem phys a', 'j chem phys a', 1.), duplicates)
+                self.assertEqual(len(index.lookup('j chem phys a')), 2)
+
+            # other parameters
+            with self.assertRaises(ValueError):
+                JournalIndex(abbreviate, path, bands=4)
+
+            # titles are inserted while they are read
+            with JournalIndex(abbreviate, pathlib.Path(directory) / 'streamed.db') as streamed:
+                def stream() -> Iterator[str]:
+                    for i, title in enumerate(titles * 4):
+                        self.assertGreaterEqual(len(streamed), i - 1)
+                        yield title
+
+                self.assertEqual(streamed.add_many(stream()), 4 * len(titles))
+                self.assertEqual(len(streamed), 4 * len(titles))
+
+
+class TestLazy(unittest.TestCase):
+    def test_lazy(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles, expected = zip(*(line.strip().split('\t') for line in f.readlines()))
+
+        abbreviate = Abbreviate.create(lazy=True)
+        index = abbreviate.ltwa_prefix
+        assert isinstance(index, LazyIndex)
+
+        self.assertEqual(abbreviate('Journal of Physics'), 'J. Phys.')
+        self.assertEqual(index.loaded_shards, ['j', 'p'])  # ("of" is a stopword)
+
+        self.assertEqual([abbreviate(title) for title in titles], list(expected))
+
+        # pickled with what is loaded
+        unpickled = pickle.loads(pickle.dumps(index))
+        self.assertEqual(unpickled.loaded_shards, index.loaded_shards)
+        self.assertEqual(unpickled.search('acta'), index.search('acta'))
+
+        with self.assertRaises(ValueError):
+            Abbreviate.create(lazy=True, cache_file='ltwa.idx')
+
+    def test_word_cache(self) -> None:
+        abbreviate = Abbreviate.create(lazy=True)
+        abbreviate.set_cache()
+        index = abbreviate.ltwa_prefix
+        assert isinstance(index, LazyIndex)
+
+        # the word cache only loads the shards of the words (the heads of the keys come with each shard)
+        self.assertEqual(abbreviate('Journal of Physics'), 'J. Phys.')
+        self.assertEqual(index.loaded_shards, ['j', 'p'])
+
+        self.assertEqual(abbreviate('United Kingdom Journal of Physics'), 'U. K. J. Phys.')
+        self.assertEqual(abbreviate('United Nations Journal of Physics'), Abbreviate.create()(
+            'United Nations Journal of Physics'))
+        self.assertIn('united', index.heads('united'))
+        self.assertEqual(index.loaded_shards, ['j', 'p', 'u'])
+
+    def test_shards(self) -> None:
+        eager = Abbreviate.create(langs=['eng', 'ger'])
+        lazy = Abbreviate.create(langs=['eng', 'ger'], lazy=True)
+
+        for index, lazy_index in [(eager.ltwa_prefix, lazy.ltwa_prefix), (eager.ltwa_suffix, lazy.ltwa_suffix)]:
+            self.assertEqual(
+                sorted((key, p.pattern, p.replacement) for key, p in lazy_index.items()),
+                sorted((key, p.pattern, p.replacement) for key, p in index.items()))
+
+            for key, _ in itertools.islice(index.items(), 0, None, 97):
+                self.assertEqual(lazy_index.search(key), index.search(key))
+                self.assertEqual(list(lazy_index.search_longest_first(key)), list(index.search_longest_first(key)))
+
+
+class TestCompiled(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name)
+
+        self.ltwa_file = self.path / 'ltwa.csv'
+        with self.ltwa_file.open('w') as f:
+            f.write('WORD\tABBREVIATIONS\tLANGUAGE CODES\njournal\tj.\tmul\nphysics\tphys.\teng\n')
+
+        self.stopwords_file = self.path / 'stopwords.txt'
+        with self.stopwords_file.open('w') as f:
+            f.write('of\n')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_compile_and_load(self) -> None:
+        index = self.path / 'index.bin'
+        Abbreviate.compile(index, self.ltwa_file, self.stopwords_file)
+
+        loaded = Abbreviate.load(index)
+        self.assertEqual(loaded.stopwords, ['of'])
+        self.assertEqual(loaded('Journal of Physics'), 'J. Phys.')
+
+    def test_cache_file(self) -> None:
+        index = self.path / 'index.bin'
+
+        Abbreviate.create(self.ltwa_file, self.stopwords_file, cache_file=index)
+        self.assertTrue(index.exists())
+        self.assertTrue(compiled.is_up_to_date(index, Abbreviate._sources(self.ltwa_file, self.stopwords_file)))
+
+        # the index is rebuilt if the LTWA changes
+        with self.ltwa_file.open('a') as f:
+            f.write('chemistry\tchem.\teng\n')
+
+        self.assertFalse(compiled.is_up_to_date(index, Abbreviate._sources(self.ltwa_file, self.stopwords_file)))
+        abbreviate = Abbreviate.create(self.ltwa_file, self.stopwords_file, cache_file=index)
+        self.assertEqual(abbreviate('Journal of Chemistry'), 'J. Chem.')
+        self.assertTrue(compiled.is_up_to_date(index, Abbreviate._sources(self.ltwa_file, self.stopwords_file)))
+
+    def test_cache_file_replaced(self) -> None:
+        index = self.path / 'index.bin'
+        sources = Abbreviate._sources(self.ltwa_file, self.stopwords_file)
+        Abbreviate.create(self.ltwa_file, self.stopwords_file, cache_file=index)
+
+        # a cache file that cannot be read (e.g., truncated) is rebuilt
+        data = index.read_bytes()
+        index.write_bytes(data[:len(data) // 2])
+        self.assertTrue(compiled.is_up_to_date(index, sources))  # (only the header is read)
+        abbreviate = Abbreviate.create(self.ltwa_file, self.stopwords_file, cache_file=index)
+        self.assertEqual(abbreviate('Journal of Physics'), 'J. Phys.')
+        self.assertEqual(index.read_bytes(), data)
+
+        # the file is written next to the target, then moved onto it
+        with self.assertRaises(RuntimeError):
+            with compiled.replace_file(index) as f:
+                f.write(b'partial')
+                raise RuntimeError()
+
+        self.assertEqual(index.read_bytes(), data)
+        self.assertEqual([p.name for p in self.path.iterdir() if p.name.startswith('index')], ['index.bin'])
+
+    def test_bad_file(self) -> None:
+        index = self.path / 'index.bin'
+        with index.open('wb') as f:
+            f.write(b'not an index')
+
+        self.assertFalse(compiled.is_up_to_date(index, {}))
+        with self.assertRaises(compiled.IndexFormatError):
+            Abbreviate.load(index)
+
+    def test_same_as_create(self) -> None:
+        index = self.path / 'index.bin'
+        Abbreviate.compile(index)
+        abbreviate = Abbreviate.load(index)
+
+        with open('tests/tests.tsv') as f:
+            for line in f.readlines():
+                fields = line.split('\t')
+                self.assertEqual(fields[1].strip(), abbreviate(fields[0].strip(), remove_part=True))
+
+
+class TestMappedLTWA(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name) / 'ltwa.mm'
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_search(self) -> None:
+        patterns = [
+            Pattern.from_line('{}\tx\t{}'.format(p, lg)) for p, lg in [
+                ('ab-', 'eng'), ('abc', 'fre ger'), ('abc', 'eng'), ('abd', 'mul'), ('-bc', 'eng'), ('xyz', 'eng')]
+        ]
+
+        mmap_store.write(self.path, patterns, ['of'])
+        with mmap_store.MappedLTWA(self.path) as ltwa:
+            self.assertEqual(len(ltwa), len(patterns))
+            self.assertEqual(ltwa.stopwords, ['of'])
+            self.assertEqual(ltwa.pattern(1).langs, ['fre', 'ger'])
+
+            # only true prefixes, shortest first, then in insertion order
+            self.assertEqual(
+                [(p.pattern, p.langs) for p in ltwa.prefix.search('abcd')],
+                [('ab-', ['eng']), ('abc', ['fre', 'ger']), ('abc', ['eng'])])
+            self.assertEqual(ltwa.prefix.search('a'), [])
+            self.assertEqual(ltwa.prefix.search('xy'), [])
+            self.assertEqual(
+                [(p.pattern, p.langs) for p in ltwa.prefix.search_longest_first('abcd')],
+                [('abc', ['fre', 'ger']), ('abc', ['eng']), ('ab-', ['eng'])])
+            self.assertEqual([p.pattern for p in ltwa.suffix.search('cbx')], ['-bc'])
+
+            # languages
+            self.assertEqual([p.pattern for p in ltwa.prefix.search('abcd', ['ger'])], ['abc'])
+            self.assertEqual([p.pattern for p in ltwa.prefix.search('abd', ['xxx'])], ['abd'])
+
+    def test_same_as_create(self) -> None:
+        mmap_store.build(self.path, 'pyiso4/LTWA_20210702.csv', 'pyiso4/stopwords.txt')
+        abbreviate = Abbreviate.load_mapped(self.path)
+
+        # pickling maps the file again
+        unpickled = pickle.loads(pickle.dumps(abbreviate))
+        self.assertIs(unpickled.ltwa_prefix.ltwa, unpickled.ltwa_suffix.ltwa)
+        self.assertEqual(unpickled('Journal of Physics'), 'J. Phys.')
+
+        with open('tests/tests.tsv') as f:
+            for line in f.readlines():
+                fields = line.split('\t')
+                self.assertEqual(fields[1].strip(), abbreviate(fields[0].strip(), remove_part=True))
+
+    def test_patterns_not_kept(self) -> None:
+        mmap_store.build(self.path, 'pyiso4/LTWA_20210702.csv', 'pyiso4/stopwords.txt')
+        with mmap_store.MappedLTWA(self.path, cache_size=16) as ltwa:
+            # keys are read from the string table, and only the last patterns are kept
+            keys = list(ltwa.prefix.keys())
+            self.assertEqual(keys, [key for key, _ in ltwa.prefix.items()])
+            self.assertEqual(len(ltwa._patterns), 16)
+            self.assertEqual(keys, sorted(keys, key=str.encode))
+            self.assertIn('united', ltwa.prefix.heads('united'))
+
+        # the word cache does not need all the patterns
+        abbreviate = Abbreviate.load_mapped(self.path)
+        abbreviate.set_cache()
+        self.assertEqual(abbreviate('United Kingdom Journal of Physics'), 'U. K. J. Phys.')
+        self.assertLess(len(abbreviate.ltwa_prefix.ltwa._patterns), 100)  # type: ignore
+
+
+class TestScript(unittest.TestCase):
+    directory: 'tempfile.TemporaryDirectory[str]'
+    path: pathlib.Path
+    index: pathlib.Path
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = pathlib.Path(cls.directory.name)
+
+        # compile once for all tests
+        cls.index = cls.path / 'index.bin'
+        Abbreviate.compile(cls.index)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.directory.cleanup()
+
+    def run_pipeline(self, content: str, *args: str) -> List[str]:
+        inp, out = self.path / 'input', self.path / 'output'
+        with inp.open('w') as f:
+            f.write(content)
+
+        script.main(['-i', str(self.index), '--input', str(inp), '-o', str(out)] + list(args))
+
+        with out.open() as f:
+            return f.read().splitlines()
+
+    def test_tsv(self) -> None:
+        self.assertEqual(
+            self.run_pipeline('id\ttitle\n1\tJournal of Physics\n2\n', '-f', 'tsv', '--header', '--column', 'title'),
+            ['id\ttitle\tabbreviation', '1\tJournal of Physics\tJ. Phys.', '2\t'])
+
+    def test_csv(self) -> None:
+        self.assertEqual(
+            self.run_pipeline('1,"Journal of Physics, Letters"\n', '-f', 'csv', '--column', '1', '-j', '2'),
+            ['1,"Journal of Physics, Letters",J. Phys. Lett.'])
+
+    def test_jsonl(self) -> None:
+        self.assertEqual(
+            self.run_pipeline('{"name": "Journal of Physics"}\n', '-f', 'jsonl', '--column', 'name'),
+            ['{"name": "Journal of Physics", "abbreviation": "J. Phys."}'])
+
+    def test_jsonl_invalid(self) -> None:
+        # invalid records are reported with their line number and skipped, falsy titles are kept
+        with contextlib.redirect_stderr(io.StringIO()) as err:
+            output = self.run_pipeline(
+                '{"title": "Journal of Physics"}\n{bad\n[1, 2]\n"a string"\n{"title": 0}\n{"title": null}\n',
+                '-f', 'jsonl')
+
+        self.assertEqual(output, [
+            '{"title": "Journal of Physics", "abbreviation": "J. Phys."}',
+            '{"title": 0, "abbreviation": "0"}',
+            '{"title": null, "abbreviation": ""}'])
+        self.assertIn('line 2: invalid JSON', err.getvalue())
+        self.assertIn('line 3: not a JSON object', err.getvalue())
+        self.assertIn('line 4: not a JSON object', err.getvalue())
+        self.assertIn('3 records were skipped', err.getvalue())
+
+    def test_unknown_column(self) -> None:
+        for args in [('-f', 'tsv', '--header', '--column', 'name'), ('-f', 'csv', '--column', 'name')]:
+            with contextlib.redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit) as context:
+                self.run_pipeline('title\tissn\nJournal of Physics\t1\n', *args)
+
+            self.assertEqual(context.exception.code, 2)
+            self.assertIn("unknown column 'name'", err.getvalue())
+
+    def test_errors(self) -> None:
+        # a title that cannot be abbreviated gets an empty abbreviation, and the others go on
+        loaded = Abbreviate.load(self.index)
+        abbreviate = FailingAbbreviate(loaded.ltwa_prefix, loaded.ltwa_suffix, loaded.stopwords)
+        args = script.get_arguments_parser().parse_args(['-f', 'lines'])
+        out = io.StringIO()
+        with contextlib.redirect_stderr(io.StringIO()) as err:
+            inp = io.StringIO('Journal of Physics\nFailing Journal\nJournal of Chemistry\n')
+            script.pipeline(args, abbreviate, inp, out)
+
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ['Journal of Physics\tJ. Phys.', 'Failing Journal\t', 'Journal of Chemistry\tJ. Chem.'])
+        self.assertIn("'Failing Journal'", err.getvalue())
+
+
+class TestServer(unittest.TestCase):
+    abbreviate: Abbreviate
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.abbreviate = Abbreviate.create()
+
+    @staticmethod
+    async def request(
+            reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, target: str,
+            body: Any = None) -> Tuple[int, Any]:
+        data = b'' if body is None else json.dumps(body).encode()
+        writer.write('{} {} HTTP/1.1\r\nContent-Length: {}\r\n\r\n'.format(method, target, len(data)).encode())
+        writer.write(data)
+        return await TestServer.response(reader)
+
+    @staticmethod
+    async def response(reader: asyncio.StreamReader) -> Tuple[int, Any]:
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode()
+            if line == '\r\n':
+                break
+            name, _, value = line.partition(':')
+            headers[name.lower()] = value.strip()
+
+        return status, json.loads(await reader.readexactly(int(headers['content-length'])))
+
+    def test_server(self) -> None:
+        with open('tests/tests.tsv') as f:
+            titles, expected = zip(*(line.strip().split('\t') for line in f.readlines()))
+
+        async def work() -> None:
+            srv = server.Server(
+                FailingAbbreviate(self.abbreviate.ltwa_prefix, self.abbreviate.ltwa_suffix, self.abbreviate.stopwords))
+            listening = await srv.start(port=0)
+            port = listening.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+            # single title, batch, query
+            self.assertEqual(
+                await self.request(reader, writer, 'POST', '/abbreviate', {'title': 'Journal of Physics'}),
+                (200, {'abbreviation': 'J. Phys.'}))
+            self.assertEqual(
+                await self.request(reader, writer, 'POST', '/abbreviate', {'titles': list(titles)}),
+                (200, {'abbreviations': list(expected)}))
+            self.assertEqual(
+                await self.request(reader, writer, 'GET', '/abbreviate?title=Journal+of+Physics&langs=eng,fre'),
+                (200, {'abbreviation': 'J. Phys.'}))
+
+            # errors
+            for method, target, body, status in [
+                    ('POST', '/abbreviate', {'titles': 'x'}, 400),
+                    ('POST', '/abbreviate', {'title': 'x', 'langs': 'eng'}, 400),
+                    ('POST', '/abbreviate', {}, 400),
+                    ('PUT', '/abbreviate', {'title': 'x'}, 405),
+                    ('GET', '/nothing', None, 404)]:
+                self.assertEqual((await self.request(reader, writer, method, target, body))[0], status)
+
+            # concurrent requests are batched, and get their own results
+            async def one(title: str) -> str:
+                r, w = await asyncio.open_connection('127.0.0.1', port)
+                response = await self.request(r, w, 'POST', '/abbreviate', {'title': title})
+                w.close()
+                return str(response[1]['abbreviation'])
+
+            batches = srv.batcher.batches
+            self.assertEqual(list(await asyncio.gather(*(one(title) for title in titles))), list(expected))
+            self.assertLess(srv.batcher.batches - batches, len(titles))
+
+            # a title that cannot be abbreviated only fails its own request
+            async def failing() -> int:
+                r, w = await asyncio.open_connection('127.0.0.1', port)
+                response = await self.request(r, w, 'POST', '/abbreviate', {'title': 'Failing Journal'})
+                w.close()
+                return response[0]
+
+            statuses = await asyncio.gather(failing(), *(one(title) for title in titles))
+            self.assertEqual(statuses[0], 500)
+            self.assertEqual(list(statuses[1:]), list(expected))
+
+            status, health = await self.request(reader, writer, 'GET', '/health')
+            self.assertEqual((status, health['status']), (200, 'ok'))
+
+            status, metrics = await self.request(reader, writer, 'GET', '/metrics')
+            self.assertEqual(metrics['titles'], 2 + 3 * len(titles))
+            self.assertEqual(metrics['responses']['400'], 3)
+            self.assertEqual(metrics['latency']['count'], metrics['requests'])
+            self.assertEqual(metrics['latency']['le']['inf'], metrics['requests'])
+
+            writer.close()
+            await srv.stop()
+
+        asyncio.run(work())
+
+    def test_body(self) -> None:
+        async def work() -> None:
+            srv = server.Server(self.abbreviate)
+            listening = await srv.start(port=0)
+            reader, writer = await asyncio.open_connection('127.0.0.1', listening.sockets[0].getsockname()[1])
+
+            # chunked body, then another request on the same connection
+            writer.write(
+                b'POST /abbreviate HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'
+                b'b\r\n{"title": "\r\n14;ext=1\r\nJournal of Physics"}\r\n0\r\n\r\n')
+            self.assertEqual(await self.response(reader), (200, {'abbreviation': 'J. Phys.'}))
+            self.assertEqual(
+                await self.request(reader, writer, 'GET', '/abbreviate?title=Journal+of+Physics'),
+                (200, {'abbreviation': 'J. Phys.'}))
+
+            # the body is sent after "100 Continue"
+            data = json.dumps({'title': 'Journal of Physics'}).encode()
+            writer.write(
+                'POST /abbreviate HTTP/1.1\r\nContent-Length: {}\r\nExpect: 100-continue\r\n\r\n'.format(
+                    len(data)).encode())
+            self.assertEqual(await reader.readline(), b'HTTP/1.1 100 Continue\r\n')
+            self.assertEqual(await reader.readline(), b'\r\n')
+            writer.write(data)
+            self.assertEqual(await self.response(reader), (200, {'abbreviation': 'J. Phys.'}))
+
+            # unknown transfer encoding: the body cannot be skipped, so the connection is closed
+            writer.write(b'POST /abbreviate HTTP/1.1\r\nTransfer-Encoding: gzip\r\n\r\nxxxx')
+            self.assertEqual((await self.response(reader))[0], 501)
+            self.assertEqual(await reader.read(), b'')
+
+            writer.close()
+            await srv.stop()
+
+        asyncio.run(work())
+
+    @unittest.skipUnless(hasattr(asyncio, 'start_unix_server'), 'requires Unix sockets')
+    def test_unix_socket(self) -> None:
+        async def work() -> None:
+            with tempfile.TemporaryDirectory() as directory:
+                path = str(pathlib.Path(directory) / 'iso4.sock')
+                srv = server.Server(self.abbreviate)
+                await srv.start(path=path)
+
+                reader, writer = await asyncio.open_unix_connection(path)
+                self.assertEqual(
+                    await self.request(reader, writer, 'POST', '/abbreviate', {'titles': ['Journal of Physics']}),
+                    (200, {'abbreviations': ['J. Phys.']}))
+
+                writer.close()
+                await srv.stop()
+
+        asyncio.run(work())